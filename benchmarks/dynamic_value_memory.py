@@ -0,0 +1,142 @@
+"""
+Benchmark of the peak memory usage of deserializing large states.
+
+Run with `python benchmarks/dynamic_value_memory.py [SIZE_MB]` (default 50).
+Each way of deserializing the same serialized state runs in a fresh process,
+whose peak RSS is compared to what it was before deserializing: passing a
+copy as `bytes` (which is what the old implementation amounted to), passing
+a memoryview of the received buffer, and streaming the data from a file.
+The deserialized value itself is included in all of these. Linux only, as
+the peak RSS is reset and read via `/proc`.
+"""
+import json
+import subprocess
+import sys
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import msgpack
+
+from tfprovider.level2.dynamic_value import (
+    deserialize_json,
+    deserialize_msgpack,
+    deserialize_msgpack_stream,
+)
+from tfprovider.level2.json_backend import (
+    JsonBackend,
+    OrjsonJsonBackend,
+    StdlibJsonBackend,
+    set_json_backend,
+)
+
+
+def state(size_mb: int) -> dict[str, Any]:
+    """
+    State of roughly `size_mb` MB made up of many medium-sized strings.
+    """
+    n = size_mb * 1000
+    return {
+        "items": [
+            {"name": f"item{i}", "data": "x" * 1000, "size": i}
+            for i in range(n)
+        ]
+    }
+
+
+def _read(path: Path) -> bytearray:
+    # like a buffer the data was received into
+    buf = bytearray(path.stat().st_size)
+    with path.open("rb") as f:
+        f.readinto(buf)
+    return buf
+
+
+def msgpack_bytes_copy(path: Path) -> Callable[[], Any]:
+    buf = _read(path)
+    return lambda: deserialize_msgpack(bytes(buf))
+
+
+def msgpack_memoryview(path: Path) -> Callable[[], Any]:
+    buf = _read(path)
+    return lambda: deserialize_msgpack(memoryview(buf))
+
+
+def msgpack_stream(path: Path) -> Callable[[], Any]:
+    return lambda: deserialize_msgpack_stream(path.open("rb"))
+
+
+def json_decoded_str(path: Path) -> Callable[[], Any]:
+    buf = _read(path)
+    return lambda: json.loads(bytes(buf).decode("utf-8"))
+
+
+def json_memoryview(backend: JsonBackend) -> Callable[[Path], Any]:
+    def setup(path: Path) -> Callable[[], Any]:
+        buf = _read(path)
+        set_json_backend(backend)
+        return lambda: deserialize_json(memoryview(buf))
+
+    return setup
+
+
+CASES: dict[str, Callable[[Path], Callable[[], Any]]] = {
+    "msgpack, bytes copy": msgpack_bytes_copy,
+    "msgpack, memoryview": msgpack_memoryview,
+    "msgpack, stream": msgpack_stream,
+    "JSON, decoded str": json_decoded_str,
+    "JSON, memoryview (stdlib)": json_memoryview(StdlibJsonBackend()),
+}
+try:
+    CASES["JSON, memoryview (orjson)"] = json_memoryview(OrjsonJsonBackend())
+except ImportError:
+    pass
+
+
+def _rss_mb(field: str) -> float:
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith(f"{field}:"):
+            return int(line.split()[1]) / 1024
+    raise RuntimeError(f"{field} not found")
+
+
+def run_case(case: str, path: Path) -> None:
+    deserialize = CASES[case](path)
+    # reset the peak RSS (VmHWM) to the current RSS
+    Path("/proc/self/clear_refs").write_text("5")
+    before = _rss_mb("VmRSS")
+    value = deserialize()
+    peak = _rss_mb("VmHWM")
+    print(f"+{peak - before:.0f} MB (total {peak:.0f} MB)")
+    del value
+
+
+def main(size_mb: int) -> None:
+    value = state(size_mb)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        msgpack_path = Path(tmp_dir) / "state.msgpack"
+        msgpack_path.write_bytes(msgpack.packb(value))
+        json_path = Path(tmp_dir) / "state.json"
+        json_path.write_text(json.dumps(value))
+        del value
+        print(
+            f"msgpack: {msgpack_path.stat().st_size / 1e6:.0f} MB, "
+            f"JSON: {json_path.stat().st_size / 1e6:.0f} MB"
+        )
+        for case in CASES:
+            path = json_path if case.startswith("JSON") else msgpack_path
+            peak_rss = subprocess.run(
+                [sys.executable, __file__, "--case", case, str(path)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout.strip()
+            print(f"{case}: peak RSS {peak_rss}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--case"]:
+        run_case(sys.argv[2], Path(sys.argv[3]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,88 @@
+"""
+Benchmark of (un)marshaling very deeply nested and very large values.
+
+Run with `python benchmarks/nesting.py`. Both kinds of values are
+(un)marshaled iteratively, so neither hits Python's recursion limit.
+"""
+import sys
+import time
+from collections.abc import Callable
+from typing import Any
+
+from tfprovider.level2.wire_format import (
+    AttributeWireType,
+    DynamicWireType,
+    ListWireType,
+    MapWireType,
+    NumberWireType,
+    ObjectWireType,
+    StringWireType,
+)
+from tfprovider.level2.wire_marshaling import (
+    marshaler_for_wire_type,
+    unmarshaler_for_wire_type,
+)
+
+
+def deep_value(depth: int) -> tuple[AttributeWireType[Any], Any]:
+    """
+    Map nested `depth` levels deep, as found in e.g. policy documents.
+    """
+    wire_type: AttributeWireType[Any] = StringWireType()
+    value: Any = "x"
+    for _ in range(depth):
+        wire_type = MapWireType(wire_type)
+        value = {"a": value, "b": None}
+    return wire_type, value
+
+
+def large_value(n: int) -> tuple[AttributeWireType[Any], Any]:
+    """
+    List of `n` objects holding `n` numbers each, i.e. ~`n**2` nodes.
+    """
+    element_type = ObjectWireType(
+        {"name": StringWireType(), "values": ListWireType(NumberWireType())}
+    )
+    wire_type = ListWireType(element_type)
+    value = [{"name": f"item{i}", "values": list(range(n))} for i in range(n)]
+    return wire_type, value
+
+
+def dynamic_large_value(n: int) -> tuple[AttributeWireType[Any], Any]:
+    """
+    Like `large_value`, but as a value of the dynamic pseudo-type.
+    """
+    wire_type, value = large_value(n)
+    return DynamicWireType(), [wire_type.serialize_type(), value]
+
+
+def best_of(f: Callable[[], Any], repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    print(f"recursion limit: {sys.getrecursionlimit()}")
+    cases = {
+        "1,000 levels deep": deep_value(1000),
+        "1M nodes": large_value(1000),
+        "1M nodes (dynamic)": dynamic_large_value(1000),
+    }
+    for name, (wire_type, marshaled) in cases.items():
+        unmarshal = unmarshaler_for_wire_type(wire_type).unmarshal_msgpack
+        marshal = marshaler_for_wire_type(wire_type).marshal_msgpack
+        unmarshaled = unmarshal(marshaled)
+        unmarshal_time = best_of(lambda: unmarshal(marshaled))
+        marshal_time = best_of(lambda: marshal(unmarshaled))
+        print(
+            f"{name}: unmarshal {unmarshal_time * 1000:.1f} ms, "
+            f"marshal {marshal_time * 1000:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
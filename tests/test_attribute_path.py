@@ -0,0 +1,110 @@
+import msgpack
+import pytest
+from tfplugin_proto import tfplugin6_4_pb2 as pb
+
+from tfprovider.level2.attribute_path import (
+    ROOT,
+    AttributeName,
+    AttributePath,
+    AttributePathResolutionError,
+    ElementKey,
+    resolve_many,
+)
+from tfprovider.level3.statically_typed_schema import attributes_class
+
+
+@attributes_class()
+class Inner:
+    tags: dict[str, str]
+
+
+def test_construction_and_extension_are_equivalent() -> None:
+    path = ROOT.attribute_name("foo").element_key(3).element_key("k")
+    constructed = AttributePath(
+        [AttributeName("foo"), ElementKey(3), ElementKey("k")]
+    )
+    assert path == constructed
+    assert hash(path) == hash(constructed)
+    assert path.elements == constructed.elements
+    assert len(path) == 3
+    assert str(path) == ".foo[3]['k']"
+    assert path != ROOT.attribute_name("foo").element_key(3)
+    assert path != ROOT.attribute_name("foo").element_key(3).element_key(4)
+
+
+def test_attribute_names_are_interned() -> None:
+    parent = ROOT.attribute_name("foo").element_key(0)
+    assert parent.attribute_name("bar") is parent.attribute_name("bar")
+    assert parent.attribute_name("bar").parent is parent
+
+
+def test_to_protobuf() -> None:
+    path = ROOT.attribute_name("foo").element_key(3).element_key("k")
+    expected = pb.AttributePath(
+        steps=[
+            pb.AttributePath.Step(attribute_name="foo"),
+            pb.AttributePath.Step(element_key_int=3),
+            pb.AttributePath.Step(element_key_string="k"),
+        ]
+    )
+    assert path.to_protobuf() == expected
+    assert path.to_protobuf() is path.to_protobuf()
+    assert ROOT.to_protobuf() == pb.AttributePath(steps=[])
+
+
+def test_deep_paths() -> None:
+    path = ROOT
+    for i in range(10_000):
+        path = path.element_key(i)
+    assert len(path.to_protobuf().steps) == 10_000
+    assert hash(path) == hash(AttributePath(path.elements))
+
+
+def test_from_protobuf_roundtrip() -> None:
+    path = ROOT.attribute_name("foo").element_key(3).element_key("k")
+    converted = AttributePath.from_protobuf(path.to_protobuf())
+    assert converted == path
+    # attribute name prefixes are shared with paths built directly
+    assert converted.parent is not None
+    assert converted.parent.parent is ROOT.attribute_name("foo")
+
+
+def test_resolve() -> None:
+    value = {
+        "foo": [{"tags": {"a": "b"}}, Inner(tags={"c": "d"})],
+        "bar": msgpack.ExtType(0, b""),
+    }
+    foo = ROOT.attribute_name("foo")
+    assert foo.element_key(0).attribute_name("tags").resolve(value) == {
+        "a": "b"
+    }
+    path = foo.element_key(1).attribute_name("tags").element_key("c")
+    assert path.resolve(value) == "d"
+    unknown = ROOT.attribute_name("bar").element_key(2).attribute_name("x")
+    assert unknown.resolve(value) == msgpack.ExtType(0, b"")
+    for missing in [
+        foo.element_key(2),
+        foo.element_key(1).attribute_name("__init__"),
+        foo.attribute_name("tags"),
+    ]:
+        with pytest.raises(AttributePathResolutionError):
+            missing.resolve(value)
+
+
+def test_resolve_many() -> None:
+    value = {"foo": [{"a": 1, "b": 2}, {"a": 3}]}
+    foo = ROOT.attribute_name("foo")
+    paths = [
+        foo.element_key(i).attribute_name(name)
+        for i in range(2)
+        for name in ["a", "b"]
+    ]
+    assert resolve_many(paths, value, default=None) == {
+        paths[0]: 1,
+        paths[1]: 2,
+        paths[2]: 3,
+        paths[3]: None,
+    }
+    assert resolve_many(paths[:2], value) == {paths[0]: 1, paths[1]: 2}
+    with pytest.raises(AttributePathResolutionError):
+        resolve_many(paths, value)
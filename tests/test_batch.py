@@ -0,0 +1,57 @@
+import pytest
+from tfplugin_proto import tfplugin6_4_pb2 as pb
+
+from tfprovider.level2.dynamic_value import pack_msgpack
+from tfprovider.level2.wire_format import Unknown, UnrefinedUnknown
+from tfprovider.level3.batch import attributes_class_batch_decoder
+from tfprovider.level3.statically_typed_schema import (
+    attributes_class,
+    attributes_class_codec,
+)
+
+
+@attributes_class()
+class Item:
+    name: str
+    size: int | None | Unknown
+    tags: set[str] | None
+
+
+def test_batch_decoding() -> None:
+    decoder = attributes_class_batch_decoder(Item)
+    assert attributes_class_batch_decoder(Item) is decoder
+    marshaled = [
+        {"name": "a", "size": 1, "tags": ["x"]},
+        {"name": "b", "size": None, "tags": None},
+    ]
+    expected = [Item("a", 1, {"x"}), Item("b", None, None)]
+    assert decoder.unmarshal(marshaled) == expected
+
+    columns = decoder.decode_msgpack_columns(
+        pack_msgpack(x) for x in marshaled
+    )
+    assert len(columns) == 2
+    assert columns["name"] == ["a", "b"]
+    assert columns["size"] == [1, None]
+    assert columns["tags"] == [{"x"}, None]
+    assert columns.row(1) == expected[1]
+    assert list(columns) == expected
+
+    assert decoder.decode_dynamic_values(
+        [pb.DynamicValue(json=b'{"name": "a", "size": 1, "tags": ["x"]}')]
+    ) == [expected[0]]
+    unknown_size = Item("a", UnrefinedUnknown(), {"x"})
+    assert decoder.decode_msgpack(
+        [attributes_class_codec(Item).encode_msgpack(unknown_size)]
+    ) == [unknown_size]
+    assert len(decoder.unmarshal_columns([])) == 0
+
+
+def test_batch_decoding_errors() -> None:
+    decoder = attributes_class_batch_decoder(Item)
+    good = {"name": "a", "size": 1, "tags": None}
+    with pytest.raises(TypeError, match="at index 1"):
+        decoder.unmarshal([good, None])
+    with pytest.raises(ValueError, match="'size' at index 2") as exc_info:
+        decoder.unmarshal([good, good, {**good, "size": "big"}])
+    assert exc_info.value.__cause__ is not None
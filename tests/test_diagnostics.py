@@ -0,0 +1,57 @@
+from tfplugin_proto.tfplugin6_4_pb2 import Diagnostic
+
+from tfprovider.level2.attribute_path import ROOT
+from tfprovider.level2.diagnostics import Diagnostics
+
+
+def test_errors_and_warnings() -> None:
+    diagnostics = Diagnostics()
+    diagnostics.add_error("e", attribute=ROOT.attribute_name("foo"))
+    diagnostics.add_warning("w")
+    assert [d.summary for d in diagnostics.errors()] == ["e"]
+    assert [d.summary for d in diagnostics.warnings()] == ["w"]
+    assert diagnostics.has_errors()
+    [error, warning] = diagnostics.to_protobuf()
+    assert error.attribute == ROOT.attribute_name("foo").to_protobuf()
+    assert not warning.HasField("attribute")
+
+
+def test_max_per_severity() -> None:
+    diagnostics = Diagnostics(max_per_severity=2)
+    for i in range(5):
+        diagnostics.add_error(f"e{i}")
+    diagnostics.add_warning("w")
+    assert [(d.severity, d.summary) for d in diagnostics.to_protobuf()] == [
+        (Diagnostic.Severity.ERROR, "e0"),
+        (Diagnostic.Severity.ERROR, "e1"),
+        (Diagnostic.Severity.WARNING, "w"),
+        (Diagnostic.Severity.ERROR, "... and 3 more errors"),
+    ]
+
+
+def test_deduplicate() -> None:
+    diagnostics = Diagnostics(deduplicate=True)
+    for i in range(3):
+        diagnostics.add_error("bad", "value", ROOT.element_key(i))
+    diagnostics.add_error("bad", "other value")
+    assert [(d.summary, d.detail) for d in diagnostics.to_protobuf()] == [
+        ("bad (and 2 more like this)", "value"),
+        ("bad", "other value"),
+    ]
+
+
+def test_omitted_diagnostics_count() -> None:
+    diagnostics = Diagnostics(max_per_severity=0)
+    assert not diagnostics
+    diagnostics.add_error("x")
+    assert diagnostics.has_errors()
+    assert diagnostics
+    assert len(diagnostics) == 1
+
+
+def test_indexing() -> None:
+    diagnostics = Diagnostics()
+    diagnostics.add_error("e")
+    diagnostics.add_warning("w")
+    assert diagnostics[0].summary == "e"
+    assert [d.summary for d in diagnostics[1:]] == ["w"]
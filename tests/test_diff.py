@@ -0,0 +1,77 @@
+from tfprovider.level2.attribute_path import ROOT
+from tfprovider.level2.wire_format import (
+    ListWireType,
+    MapWireType,
+    NumberWireType,
+    ObjectWireType,
+    OptionalWireType,
+    StringWireType,
+    UnrefinedUnknown,
+)
+from tfprovider.level3.diff import (
+    attributes_class_differ,
+    compile_value_differ,
+    diff_attributes_class_instances,
+    diff_values,
+)
+from tfprovider.level3.statically_typed_schema import attributes_class
+
+
+@attributes_class()
+class Config:
+    foo: str
+    bar: str | None
+    tags: set[str] | None
+
+
+def test_diff_instances() -> None:
+    old = Config(foo="a", bar=None, tags={"x"})
+    assert diff_attributes_class_instances(old, old) == []
+    assert diff_attributes_class_instances(old, Config("a", None, {"x"})) == []
+    assert diff_attributes_class_instances(
+        old, Config(foo="b", bar=None, tags={"x", "y"})
+    ) == [ROOT.attribute_name("foo"), ROOT.attribute_name("tags")]
+    assert diff_attributes_class_instances(None, old) == [ROOT]
+    assert diff_attributes_class_instances(None, None, Config) == []
+
+
+def test_diff_marshaled() -> None:
+    differ = attributes_class_differ(Config)
+    old = {"foo": "a", "bar": None, "tags": ["x"]}
+    assert differ.diff_marshaled(old, {"foo": "a", "tags": ["x"]}) == []
+    assert differ.diff_marshaled(old, {**old, "bar": UnrefinedUnknown()}) == [
+        ROOT.attribute_name("bar")
+    ]
+
+
+def test_diff_nested_values() -> None:
+    wire_type = OptionalWireType(
+        ListWireType(MapWireType(ListWireType(StringWireType())))
+    )
+    old = [{"a": ["x"], "b": ["y"]}, {"c": ["z"]}]
+    new = [{"a": ["x", "w"], "d": []}, {"c": ["z"]}]
+    path = ROOT.attribute_name("foo")
+    assert diff_values(old, new, wire_type, path) == [
+        path.element_key(0).element_key("a"),
+        path.element_key(0).element_key("b"),
+        path.element_key(0).element_key("d"),
+    ]
+    assert diff_values(old, old[:1], wire_type, path) == [path]
+    assert diff_values(old, None, wire_type, path) == [path]
+
+
+def test_diff_objects() -> None:
+    wire_type = ListWireType(
+        ObjectWireType({"a": StringWireType(), "b": NumberWireType()})
+    )
+    old = [{"a": "x", "b": 1}, {"a": "y", "b": 2}]
+    new = [{"a": "x", "b": 1}, {"a": "y", "b": 3}]
+    assert diff_values(old, new, wire_type) == [
+        ROOT.element_key(1).attribute_name("b")
+    ]
+    assert diff_values(old, [None, old[1]], wire_type) == [ROOT.element_key(0)]
+
+
+def test_value_differs_are_compiled_once() -> None:
+    wire_type = MapWireType(ListWireType(StringWireType()))
+    assert compile_value_differ(wire_type) is compile_value_differ(wire_type)
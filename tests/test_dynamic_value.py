@@ -0,0 +1,122 @@
+import tracemalloc
+from collections.abc import Iterator
+from decimal import Decimal
+from io import BytesIO
+
+import msgpack
+import pytest
+from tfplugin_proto.tfplugin6_4_pb2 import DynamicValue
+
+from tfprovider.level2.dynamic_value import (
+    deserialize_dynamic_value,
+    deserialize_json,
+    deserialize_msgpack,
+    deserialize_msgpack_stream,
+    pack_msgpack,
+)
+from tfprovider.level2.json_backend import (
+    JsonBackend,
+    OrjsonJsonBackend,
+    StdlibJsonBackend,
+    set_json_backend,
+)
+
+VALUE = {"foo": "bar", "baz": ["a" * 100] * 100}
+
+
+def test_deserialize_msgpack_memoryview() -> None:
+    buf = bytearray(b"\x00" * 3 + msgpack.packb(VALUE))
+    assert deserialize_msgpack(memoryview(buf)[3:]) == VALUE
+
+
+def test_deserialize_msgpack_stream_small_chunks() -> None:
+    stream = BytesIO(msgpack.packb(VALUE))
+    assert deserialize_msgpack_stream(stream, read_size=16) == VALUE
+
+
+def test_deserialize_json_buffers() -> None:
+    b = b'{"foo": "b\\u00e4r", "baz": [1, 2.5, null]}'
+    expected = {"foo": "bär", "baz": [1, 2.5, None]}
+    assert deserialize_json(b) == expected
+    assert deserialize_json(bytearray(b)) == expected
+    assert deserialize_json(memoryview(b)) == expected
+
+
+@pytest.fixture(params=[StdlibJsonBackend, OrjsonJsonBackend])
+def json_backend(request: pytest.FixtureRequest) -> Iterator[JsonBackend]:
+    if request.param is OrjsonJsonBackend:
+        pytest.importorskip("orjson")
+    backend = request.param()
+    set_json_backend(backend)
+    yield backend
+    set_json_backend(None)
+
+
+def test_json_backend_keeps_large_integers(json_backend: JsonBackend) -> None:
+    b = b"[12345678901234567890123, -9223372036854775809, 1.5]"
+    expected = [12345678901234567890123, -9223372036854775809, 1.5]
+    assert deserialize_json(b) == expected
+    assert json_backend.loads(json_backend.dumps(expected)) == expected
+
+
+def test_json_backend_keeps_non_integers_exact(
+    json_backend: JsonBackend,
+) -> None:
+    b = b'{"a": 0.1, "b": [1e400, -2.5E-3, 3], "c": "x:1.5"}'
+    assert deserialize_json(b) == {
+        "a": Decimal("0.1"),
+        "b": [Decimal("1e400"), Decimal("-0.0025"), 3],
+        "c": "x:1.5",
+    }
+    assert deserialize_json(b"0.1") == Decimal("0.1")
+
+
+def test_json_backend_roundtrips_decimals(json_backend: JsonBackend) -> None:
+    b = b'{"a":0.1,"b":[1E+400,-0.0025,{"c":"decimal"}]}'
+    value = json_backend.loads(b)
+    assert json_backend.dumps(value) == b
+    assert json_backend.loads(json_backend.dumps(value)) == value
+    with pytest.raises(ValueError):
+        json_backend.dumps([Decimal("NaN")])
+
+
+def test_stdlib_json_backend_doesnt_copy_memoryviews() -> None:
+    n = 1_000_000
+    payload = memoryview(b'"' + b"x" * n + b'"')
+    tracemalloc.start()
+    try:
+        value = StdlibJsonBackend().loads(payload)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert value == "x" * n
+    # decoded str + parsed value; a copy of the payload would add another n
+    assert peak < 2.5 * n
+
+
+def test_deserialize_dynamic_value_json() -> None:
+    value = DynamicValue(json=b'{"foo": "bar"}')
+    assert deserialize_dynamic_value(value) == {"foo": "bar"}
+
+
+def test_deserialize_dynamic_value_empty() -> None:
+    with pytest.raises(ValueError):
+        deserialize_dynamic_value(DynamicValue())
+
+
+def test_pack_msgpack_stringifies_large_integers() -> None:
+    value = {"ids": [1, 2**64 - 1, 2**64], "n": -(2**63) - 1}
+    assert msgpack.unpackb(pack_msgpack(value)) == {
+        "ids": [1, 2**64 - 1, str(2**64)],
+        "n": str(-(2**63) - 1),
+    }
+
+
+def test_pack_msgpack_packs_decimals_like_numbers() -> None:
+    value = [Decimal("0.5"), Decimal("0.1"), Decimal("2.0"), Decimal("1e20")]
+    assert msgpack.unpackb(pack_msgpack(value)) == [
+        0.5,
+        "0.1",
+        2,
+        str(10**20),
+    ]
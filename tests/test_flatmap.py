@@ -0,0 +1,105 @@
+import msgpack
+
+from tfprovider.level2.flatmap import unflatten_flatmap
+from tfprovider.level2.wire_format import (
+    BoolWireType,
+    ListWireType,
+    MapWireType,
+    NumberWireType,
+    ObjectWireType,
+    OptionalWireType,
+    SetWireType,
+    StringWireType,
+    TupleWireType,
+)
+
+ATTRIBUTE_TYPES = {
+    "name": StringWireType(),
+    "count": NumberWireType(),
+    "enabled": OptionalWireType(BoolWireType()),
+    "missing": StringWireType(),
+    "ports": ListWireType(NumberWireType()),
+    "tags": MapWireType(StringWireType()),
+    "ids": SetWireType(StringWireType()),
+    "nested": ListWireType(MapWireType(ListWireType(StringWireType()))),
+}
+
+
+def test_unflatten_flatmap() -> None:
+    flatmap = {
+        "name": "x",
+        "count": "1.5",
+        "enabled": "true",
+        "ports.#": "2",
+        "ports.1": "443",
+        "ports.0": "80",
+        "tags.%": "2",
+        "tags.env": "prod",
+        "tags.a.b": "dotted",
+        "ids.#": "2",
+        "ids.1234": "foo",
+        "ids.5678": "bar",
+        "nested.#": "1",
+        "nested.0.%": "1",
+        "nested.0.k.#": "1",
+        "nested.0.k.0": "v",
+        "not_in_schema": "ignored",
+    }
+    assert unflatten_flatmap(flatmap, ATTRIBUTE_TYPES) == {
+        "name": "x",
+        "count": 1.5,
+        "enabled": True,
+        "missing": None,
+        "ports": [80, 443],
+        "tags": {"env": "prod", "a.b": "dotted"},
+        "ids": ["foo", "bar"],
+        "nested": [{"k": ["v"]}],
+    }
+
+
+def test_unflatten_flatmap_empty_and_unknown() -> None:
+    flatmap = {
+        "name": "74D93920-ED26-11E3-AC10-0800200C9A66",
+        "ports.#": "0",
+        "ids.#": "74D93920-ED26-11E3-AC10-0800200C9A66",
+    }
+    result = unflatten_flatmap(flatmap, ATTRIBUTE_TYPES)
+    assert result["name"] == msgpack.ExtType(0, b"")
+    assert result["ports"] == []
+    assert result["ids"] == msgpack.ExtType(0, b"")
+    assert result["tags"] is None
+
+
+def test_unflatten_large_flatmap() -> None:
+    n = 100_000
+    flatmap = {"tags.%": str(n)}
+    flatmap.update({f"tags.key{i}": f"value{i}" for i in range(n)})
+    result = unflatten_flatmap(
+        flatmap, {"tags": MapWireType(StringWireType())}
+    )
+    tags = result["tags"]
+    assert isinstance(tags, dict)
+    assert len(tags) == n
+
+
+def test_unflatten_objects_and_tuples() -> None:
+    attribute_types = {
+        "obj": ObjectWireType({"a": StringWireType(), "b": NumberWireType()}),
+        "block": ObjectWireType({"a": StringWireType()}),
+        "tup": TupleWireType([StringWireType(), BoolWireType()]),
+    }
+    flatmap = {
+        "obj.a": "x",
+        "obj.b": "2",
+        # single nested blocks used to be stored as lists of one element
+        "block.#": "1",
+        "block.0.a": "y",
+        "tup.#": "2",
+        "tup.0": "z",
+        "tup.1": "false",
+    }
+    assert unflatten_flatmap(flatmap, attribute_types) == {
+        "obj": {"a": "x", "b": 2},
+        "block": {"a": "y"},
+        "tup": ["z", False],
+    }
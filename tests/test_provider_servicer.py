@@ -0,0 +1,258 @@
+from typing import Any
+
+import msgpack
+from tfplugin_proto import tfplugin6_4_pb2 as pb
+
+from tfprovider.level2.attribute_path import ROOT, AttributePath
+from tfprovider.level2.diagnostics import Diagnostics
+from tfprovider.level2.wire_format import Unknown
+from tfprovider.level3.statically_typed_schema import (
+    attribute,
+    attributes_class,
+)
+from tfprovider.level4.provider_servicer import Provider, Resource
+
+
+@attributes_class()
+class ProviderConfig:
+    pass
+
+
+@attributes_class()
+class ResConfig:
+    foo: str = attribute(required=True)
+    bar: str | None = attribute(optional=True)
+
+
+class Res(Resource[None, ResConfig]):
+    type_name = "test_res"
+    config_type = ResConfig
+    schema_version = 2
+    block_version = 1
+
+    def apply_resource_change(
+        self,
+        prior_state: ResConfig | None,
+        config: ResConfig | None,
+        proposed_new_state: ResConfig | None,
+        diagnostics: Diagnostics,
+    ) -> ResConfig | None:
+        return proposed_new_state
+
+    def upgrade_resource_state(
+        self, state: ResConfig, version: int, diagnostics: Diagnostics
+    ) -> ResConfig:
+        return ResConfig(foo=state.foo, bar=f"upgraded from {version}")
+
+    def read_resource(
+        self, current_state: ResConfig, diagnostics: Diagnostics
+    ) -> ResConfig:
+        return current_state
+
+    def import_resource(self, id: str, diagnostics: Diagnostics) -> ResConfig:
+        return ResConfig(foo=id, bar=None)
+
+
+class ExampleProvider(Provider[None, ProviderConfig]):
+    provider_state = None
+    resource_factories = [Res]
+    config_type = ProviderConfig
+    schema_version = 1
+    block_version = 1
+
+
+def test_validate_resource_config_reports_type_errors() -> None:
+    servicer = ExampleProvider().adapt()
+    response = servicer.ValidateResourceConfig(
+        pb.ValidateResourceConfig.Request(
+            type_name="test_res",
+            config=pb.DynamicValue(msgpack=msgpack.packb({"foo": 1})),
+        ),
+        None,
+    )
+    assert [
+        (d.detail, AttributePath.from_protobuf(d.attribute))
+        for d in response.diagnostics
+    ] == [
+        ("missing attribute", ROOT.attribute_name("bar")),
+        ("expected string but got int", ROOT.attribute_name("foo")),
+    ]
+
+
+def test_upgrade_resource_state_current_version() -> None:
+    servicer = ExampleProvider().adapt()
+    response = servicer.UpgradeResourceState(
+        pb.UpgradeResourceState.Request(
+            type_name="test_res",
+            version=2,
+            raw_state=pb.RawState(json=b'{"foo": "a", "extra": 1}'),
+        ),
+        None,
+    )
+    assert not response.diagnostics
+    assert msgpack.unpackb(response.upgraded_state.msgpack) == {
+        "foo": "a",
+        "bar": None,
+    }
+
+
+def test_upgrade_resource_state_old_version() -> None:
+    servicer = ExampleProvider().adapt()
+    response = servicer.UpgradeResourceState(
+        pb.UpgradeResourceState.Request(
+            type_name="test_res",
+            version=1,
+            raw_state=pb.RawState(json=b'{"foo": "a", "bar": null}'),
+        ),
+        None,
+    )
+    assert not response.diagnostics
+    assert msgpack.unpackb(response.upgraded_state.msgpack) == {
+        "foo": "a",
+        "bar": "upgraded from 1",
+    }
+
+
+def test_upgrade_resource_state_flatmap() -> None:
+    servicer = ExampleProvider().adapt()
+    response = servicer.UpgradeResourceState(
+        pb.UpgradeResourceState.Request(
+            type_name="test_res",
+            version=2,
+            raw_state=pb.RawState(flatmap={"foo": "a", "id": "x"}),
+        ),
+        None,
+    )
+    assert not response.diagnostics
+    assert msgpack.unpackb(response.upgraded_state.msgpack) == {
+        "foo": "a",
+        "bar": None,
+    }
+
+
+class UpgradingRes(Res):
+    type_name = "test_upgrading_res"
+    schema_version = 3
+    state_upgraders = {
+        0: lambda state: {"foo": state["old_foo"]},
+        1: lambda state: {**state, "bar": None},
+        2: lambda state: {**state, "bar": state["bar"] or "default"},
+    }
+
+    def upgrade_resource_state(
+        self, state: ResConfig, version: int, diagnostics: Diagnostics
+    ) -> ResConfig:
+        return state
+
+
+class UpgradingProvider(ExampleProvider):
+    resource_factories = [UpgradingRes]
+
+
+def test_upgrade_resource_state_chain() -> None:
+    servicer = UpgradingProvider().adapt()
+    for version, raw_state in [
+        (0, pb.RawState(json=b'{"old_foo": "a"}')),
+        (0, pb.RawState(flatmap={"old_foo": "a"})),
+        (1, pb.RawState(json=b'{"foo": "a"}')),
+    ]:
+        response = servicer.UpgradeResourceState(
+            pb.UpgradeResourceState.Request(
+                type_name="test_upgrading_res",
+                version=version,
+                raw_state=raw_state,
+            ),
+            None,
+        )
+        assert not response.diagnostics
+        assert msgpack.unpackb(response.upgraded_state.msgpack) == {
+            "foo": "a",
+            "bar": "default",
+        }
+
+
+@attributes_class()
+class PlanConfig:
+    name: str = attribute(required=True, requires_replace=True)
+    id: str | None | Unknown = attribute(
+        computed=True, use_state_for_unknown=True
+    )
+
+
+class PlanningRes(Res):
+    type_name = "test_planning_res"
+    config_type = PlanConfig  # type: ignore[assignment]
+
+
+class ReplacingRes(PlanningRes):
+    type_name = "test_replacing_res"
+
+    def plan_resource_change(  # type: ignore[override]
+        self,
+        prior_state: PlanConfig | None,
+        config: PlanConfig,
+        proposed_new_state: PlanConfig | None,
+        diagnostics: Diagnostics,
+    ) -> tuple[PlanConfig | None, list[AttributePath]]:
+        return proposed_new_state, [
+            ROOT.attribute_name("name"),
+            ROOT.attribute_name("id"),
+        ]
+
+
+class PlanningProvider(ExampleProvider):
+    resource_factories = [PlanningRes, ReplacingRes]
+
+
+def _plan(
+    type_name: str, prior: dict[str, Any], proposed: dict[str, Any]
+) -> pb.PlanResourceChange.Response:
+    servicer = PlanningProvider().adapt()
+    return servicer.PlanResourceChange(
+        pb.PlanResourceChange.Request(
+            type_name=type_name,
+            prior_state=pb.DynamicValue(msgpack=msgpack.packb(prior)),
+            config=pb.DynamicValue(
+                msgpack=msgpack.packb({**proposed, "id": None})
+            ),
+            proposed_new_state=pb.DynamicValue(
+                msgpack=msgpack.packb(proposed)
+            ),
+        ),
+        None,
+    )
+
+
+def test_plan_resource_change_applies_plan_modifiers() -> None:
+    unknown = msgpack.ExtType(0, b"")
+    response = _plan(
+        "test_planning_res",
+        {"name": "a", "id": "x"},
+        {"name": "b", "id": unknown},
+    )
+    assert not response.diagnostics
+    assert msgpack.unpackb(response.planned_state.msgpack) == {
+        "name": "b",
+        "id": "x",
+    }
+    assert [
+        AttributePath.from_protobuf(p) for p in response.requires_replace
+    ] == [ROOT.attribute_name("name")]
+    response = _plan(
+        "test_planning_res",
+        {"name": "a", "id": "x"},
+        {"name": "a", "id": "x"},
+    )
+    assert not response.requires_replace
+
+
+def test_plan_resource_change_merges_requires_replace() -> None:
+    response = _plan(
+        "test_replacing_res",
+        {"name": "a", "id": "x"},
+        {"name": "b", "id": "x"},
+    )
+    assert not response.diagnostics
+    assert [
+        AttributePath.from_protobuf(p) for p in response.requires_replace
+    ] == [ROOT.attribute_name("name"), ROOT.attribute_name("id")]
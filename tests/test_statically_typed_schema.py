@@ -0,0 +1,569 @@
+from array import array
+from decimal import Decimal
+from typing import Any
+
+import msgpack
+import pytest
+from tfplugin_proto import tfplugin6_4_pb2 as pb
+
+from tfprovider.level2.diagnostics import Diagnostics
+from tfprovider.level2.wire_format import (
+    AttributeWireType,
+    Dynamic,
+    ListWireType,
+    MapWireType,
+    ObjectWireType,
+    SetWireType,
+    StringWireType,
+    Unknown,
+    UnrefinedUnknown,
+)
+from tfprovider.level2.wire_marshaling import (
+    NumberArrayWireTypeUnmarshaler,
+    _marshaling_node,
+    _unmarshaling_node,
+    marshaler_for_wire_type,
+    unmarshaler_for_wire_type,
+)
+from tfprovider.level2.wire_representation import NumberArrayWireRepresentation
+from tfprovider.level3.statically_typed_schema import (
+    attribute,
+    attributes_class,
+    attributes_class_codec,
+    attributes_class_to_usable_block,
+    deserialize_dynamic_value_into_attribute_class_instance,
+    deserialize_dynamic_value_into_optional_attribute_class_instance,
+    replace_attributes_class_instance,
+    serialize_attribute_class_instance_to_dynamic_value,
+)
+
+
+@attributes_class()
+class Config:
+    foo: str = attribute(required=True)
+    bar: str | None | Unknown = attribute(optional=True, computed=True)
+    tags: set[str] | None = attribute(optional=True)
+
+
+def test_roundtrip() -> None:
+    instance = Config(foo="a", bar=None, tags={"x", "y"})
+    serialized = serialize_attribute_class_instance_to_dynamic_value(instance)
+    assert (
+        deserialize_dynamic_value_into_attribute_class_instance(
+            serialized, Config
+        )
+        == instance
+    )
+
+
+def test_decode_unknown_and_extra_attributes() -> None:
+    value = pb.DynamicValue(
+        msgpack=msgpack.packb(
+            {
+                "foo": "a",
+                "bar": msgpack.ExtType(0, b""),
+                "tags": None,
+                "not_in_schema": [1, 2, 3],
+            }
+        )
+    )
+    instance = deserialize_dynamic_value_into_attribute_class_instance(
+        value, Config
+    )
+    assert instance == Config(foo="a", bar=UnrefinedUnknown(), tags=None)
+
+
+def test_decode_null() -> None:
+    value = pb.DynamicValue(msgpack=msgpack.packb(None))
+    assert (
+        deserialize_dynamic_value_into_optional_attribute_class_instance(
+            value, Config
+        )
+        is None
+    )
+    with pytest.raises(TypeError):
+        deserialize_dynamic_value_into_attribute_class_instance(value, Config)
+
+
+def test_decode_errors_name_attribute() -> None:
+    codec = attributes_class_codec(Config)
+    with pytest.raises(ValueError, match="'foo'"):
+        codec.decode_msgpack(msgpack.packb({"foo": 1}))
+    with pytest.raises(ValueError, match="'bar'"):
+        codec.decode_msgpack(msgpack.packb({"foo": "a"}))
+
+
+def test_encode_uses_declaration_order() -> None:
+    codec = attributes_class_codec(Config)
+    encoded = codec.encode_msgpack(
+        Config(foo="a", bar=UnrefinedUnknown(), tags=None)
+    )
+    assert encoded == msgpack.packb(
+        {"foo": "a", "bar": msgpack.ExtType(0, b""), "tags": None}
+    )
+
+
+def test_decode_json() -> None:
+    value = pb.DynamicValue(json=b'{"foo": "a", "bar": null, "tags": ["x"]}')
+    instance = deserialize_dynamic_value_into_attribute_class_instance(
+        value, Config
+    )
+    assert instance == Config(foo="a", bar=None, tags={"x"})
+    assert (
+        deserialize_dynamic_value_into_optional_attribute_class_instance(
+            pb.DynamicValue(json=b"null"), Config
+        )
+        is None
+    )
+
+
+@attributes_class()
+class Collections:
+    ports: list[int]
+    labels: dict[str, str] | None
+    enabled: bool
+    ratio: float | None
+    names: list[str | None]
+
+
+def test_collections_roundtrip_and_wire_types() -> None:
+    codec = attributes_class_codec(Collections)
+    assert {
+        name: wire_type.marshal_type()
+        for name, wire_type in codec.attribute_wire_types.items()
+    } == {
+        "ports": ["list", "number"],
+        "labels": ["map", "string"],
+        "enabled": "bool",
+        "ratio": "number",
+        "names": ["list", "string"],
+    }
+    marshaled = {
+        "ports": [80, 443],
+        "labels": {"a": "b"},
+        "enabled": True,
+        "ratio": 0.5,
+        "names": ["x", None],
+    }
+    instance = codec.unmarshal(marshaled)
+    assert instance == Collections(
+        [80, 443], {"a": "b"}, True, 0.5, ["x", None]
+    )
+    # homogeneous primitive containers are passed through as-is
+    assert instance.ports is marshaled["ports"]
+    assert instance.labels is marshaled["labels"]
+    assert codec.marshal(instance) == marshaled
+
+
+def test_collections_are_validated() -> None:
+    codec = attributes_class_codec(Collections)
+    valid = {
+        "ports": [80],
+        "labels": None,
+        "enabled": False,
+        "ratio": None,
+        "names": [],
+    }
+    for name, bad_value in [
+        ("ports", [80, "x"]),
+        ("ports", [True]),
+        ("labels", {"a": 1}),
+        ("enabled", 1),
+    ]:
+        with pytest.raises(ValueError, match=repr(name)):
+            codec.unmarshal({**valid, name: bad_value})
+
+
+@attributes_class()
+class Rule:
+    port: int
+    cidrs: list[str]
+
+
+@attributes_class()
+class Firewall:
+    name: str
+    default_rule: Rule | None
+    rules: list[Rule] = attribute(block=True, min_items=1)
+    labels: dict[str, Rule] | None = attribute(nested_attributes=True)
+    pair: tuple[str, int] | None = None
+
+
+def test_nested_attributes_classes_roundtrip() -> None:
+    codec = attributes_class_codec(Firewall)
+    assert codec.attribute_wire_types["default_rule"].marshal_type() == [
+        "object",
+        {"cidrs": ["list", "string"], "port": "number"},
+    ]
+    assert codec.attribute_wire_types["pair"].marshal_type() == [
+        "tuple",
+        ["string", "number"],
+    ]
+    marshaled = {
+        "name": "fw",
+        "default_rule": {"port": 22, "cidrs": ["10.0.0.0/8"]},
+        "rules": [{"port": 80, "cidrs": []}],
+        "labels": None,
+        "pair": ["a", 1],
+    }
+    instance = codec.unmarshal(marshaled)
+    assert instance == Firewall(
+        name="fw",
+        default_rule=Rule(22, ["10.0.0.0/8"]),
+        rules=[Rule(80, [])],
+        labels=None,
+        pair=("a", 1),
+    )
+    assert codec.marshal(instance) == marshaled
+    with pytest.raises(ValueError, match="'rules'") as exc_info:
+        codec.unmarshal({**marshaled, "rules": [{"port": "x", "cidrs": []}]})
+    assert "'port'" in str(exc_info.value.__cause__)
+
+
+def test_nested_blocks_and_attributes_schema() -> None:
+    block = attributes_class_to_usable_block(Firewall).to_protobuf()
+    assert [a.name for a in block.attributes] == [
+        "name",
+        "default_rule",
+        "labels",
+        "pair",
+    ]
+    (rules,) = block.block_types
+    assert rules.type_name == "rules"
+    assert rules.nesting == pb.Schema.NestedBlock.NestingMode.LIST
+    assert rules.min_items == 1
+    assert [a.name for a in rules.block.attributes] == ["port", "cidrs"]
+    labels = block.attributes[2]
+    assert labels.type == b""
+    assert labels.nested_type.nesting == pb.Schema.Object.NestingMode.MAP
+    assert [a.name for a in labels.nested_type.attributes] == [
+        "port",
+        "cidrs",
+    ]
+
+
+@attributes_class(frozen=True)
+class Port:
+    number: int
+    protocol: str | None
+
+
+@attributes_class()
+class Listeners:
+    ports: set[Port]
+    blocks: set[Port] = attribute(block=True)
+    nested: set[Port] | None = attribute(nested_attributes=True)
+
+
+def test_set_nesting_roundtrip() -> None:
+    codec = attributes_class_codec(Listeners)
+    assert codec.attribute_wire_types["ports"].marshal_type() == [
+        "set",
+        ["object", {"number": "number", "protocol": "string"}],
+    ]
+    marshaled = {
+        "ports": [{"number": 80, "protocol": "tcp"}],
+        "blocks": [{"number": 53, "protocol": None}],
+        "nested": None,
+    }
+    instance = codec.unmarshal(marshaled)
+    assert instance == Listeners(
+        ports={Port(80, "tcp")}, blocks={Port(53, None)}, nested=None
+    )
+    assert codec.marshal(instance) == marshaled
+    block = attributes_class_to_usable_block(Listeners).to_protobuf()
+    (blocks,) = block.block_types
+    assert blocks.nesting == pb.Schema.NestedBlock.NestingMode.SET
+    nested = block.attributes[1]
+    assert nested.nested_type.nesting == pb.Schema.Object.NestingMode.SET
+
+
+def test_sets_of_unhashable_classes_are_rejected() -> None:
+    @attributes_class()
+    class Unhashable:
+        ports: set[Rule] = attribute(block=True)
+
+    with pytest.raises(TypeError, match="must be hashable"):
+        attributes_class_codec(Unhashable)
+
+    @attributes_class(frozen=True)
+    class FrozenWithList:
+        cidrs: list[str]
+
+    @attributes_class()
+    class AlsoUnhashable:
+        rules: set[FrozenWithList]
+
+    with pytest.raises(TypeError, match="must be hashable"):
+        attributes_class_codec(AlsoUnhashable)
+
+
+@attributes_class()
+class Arrays:
+    ports: array = attribute(
+        representation=NumberArrayWireRepresentation("H", min=1)
+    )
+    thresholds: array = attribute(
+        representation=NumberArrayWireRepresentation("d", as_set=True)
+    )
+
+
+def test_number_arrays() -> None:
+    codec = attributes_class_codec(Arrays)
+    assert codec.attribute_wire_types["ports"].marshal_type() == [
+        "list",
+        "number",
+    ]
+    assert codec.attribute_wire_types["thresholds"].marshal_type() == [
+        "set",
+        "number",
+    ]
+    instance = codec.unmarshal(
+        {"ports": list(range(1, 10_001)), "thresholds": [0.5, 1]}
+    )
+    assert instance.ports == array("H", range(1, 10_001))
+    assert instance.thresholds == array("d", [0.5, 1.0])
+    assert codec.marshal(instance) == {
+        "ports": list(range(1, 10_001)),
+        "thresholds": [0.5, 1.0],
+    }
+    # plain collections are accepted as well and checked the same way
+    plain = Arrays(ports=[80], thresholds={2.0})  # type: ignore[arg-type]
+    assert codec.marshal(plain) == {"ports": [80], "thresholds": [2.0]}
+    for bad_ports in [[0], [70_000], [1.5], ["x"], [True]]:
+        with pytest.raises(ValueError, match="'ports'"):
+            codec.unmarshal({"ports": bad_ports, "thresholds": []})
+
+
+@pytest.mark.parametrize("numbers", [[1.5], [2**40], ["0.1"]])
+def test_number_arrays_reject_unrepresentable_numbers(
+    numbers: list[Any],
+) -> None:
+    unmarshaler = NumberArrayWireTypeUnmarshaler("i")
+    with pytest.raises(ValueError, match="typecode 'i'"):
+        unmarshaler.unmarshal_msgpack(numbers)
+
+
+@attributes_class()
+class Numbers:
+    id: int
+    amount: Decimal | None
+    ratio: float | None
+
+
+def test_numbers_keep_precision() -> None:
+    codec = attributes_class_codec(Numbers)
+    instance = codec.unmarshal(
+        {
+            "id": "123456789012345678901234567890",
+            "amount": "0.1",
+            "ratio": "0.1",
+        }
+    )
+    assert instance == Numbers(
+        id=123456789012345678901234567890, amount=Decimal("0.1"), ratio=0.1
+    )
+    assert type(instance.ratio) is float
+    assert codec.unmarshal({"id": "1e3", "amount": 0.5, "ratio": None}) == (
+        Numbers(id=1000, amount=0.5, ratio=None)  # type: ignore[arg-type]
+    )
+    assert codec.marshal(instance) == {
+        "id": "123456789012345678901234567890",
+        "amount": "0.1",
+        "ratio": 0.1,
+    }
+    assert codec.marshal(
+        Numbers(id=2**63, amount=Decimal("2.5"), ratio=None)
+    ) == {
+        "id": 2**63,
+        "amount": 2.5,
+        "ratio": None,
+    }
+
+
+def test_json_numbers_are_unmarshaled_like_msgpack_numbers() -> None:
+    codec = attributes_class_codec(Numbers)
+    b = b'{"id": 1.0, "amount": 0.1, "ratio": 0.1}'
+    expected = Numbers(id=1, amount=Decimal("0.1"), ratio=0.1)
+    # how Terraform would send the same numbers as msgpack
+    from_msgpack = codec.decode_msgpack(
+        msgpack.packb({"id": 1, "amount": "0.1", "ratio": "0.1"})
+    )
+    assert from_msgpack == expected
+    assert codec.decode_json(b) == expected
+    assert type(codec.decode_json(b).amount) is Decimal
+    assert codec.decode_msgpack(codec.transcode_json_to_msgpack(b)) == expected
+    diagnostics = Diagnostics()
+    assert (
+        codec.decode_checked_dynamic_value(
+            pb.DynamicValue(json=b), diagnostics
+        )
+        == expected
+    )
+    assert not diagnostics
+    # exactly representable ones would have been sent as floats
+    exact = codec.decode_json(b'{"id": 2, "amount": 0.5, "ratio": null}')
+    assert type(exact.amount) is float
+
+
+@attributes_class()
+class WithDynamic:
+    value: Dynamic | None
+
+
+def test_dynamic_values() -> None:
+    codec = attributes_class_codec(WithDynamic)
+    assert codec.attribute_wire_types["value"].marshal_type() == "dynamic"
+    wire_type = ListWireType(ObjectWireType({"a": StringWireType()}))
+    marshaled = {
+        "value": [
+            b'["list", ["object", {"a": "string"}]]',
+            [{"a": "x"}, {"a": None}, msgpack.ExtType(0, b"")],
+        ]
+    }
+    instance = codec.unmarshal(marshaled)
+    assert instance == WithDynamic(
+        Dynamic(wire_type, [{"a": "x"}, {"a": None}, UnrefinedUnknown()])
+    )
+    assert codec.marshal(instance) == marshaled
+    assert codec.unmarshal({"value": None}) == WithDynamic(None)
+
+
+def test_dynamic_values_json_roundtrip() -> None:
+    codec = attributes_class_codec(WithDynamic)
+    # raw states represent dynamic values differently than msgpack does
+    b = b'{"value": {"value": ["a", null], "type": ["list", "string"]}}'
+    expected = WithDynamic(
+        Dynamic(ListWireType(StringWireType()), ["a", None])
+    )
+    assert codec.decode_json(b) == expected
+    transcoded = codec.transcode_json_to_msgpack(b)
+    assert msgpack.unpackb(transcoded) == {
+        "value": [b'["list", "string"]', ["a", None]]
+    }
+    assert codec.decode_msgpack(transcoded) == expected
+    assert codec.decode_json(b'{"value": null}') == WithDynamic(None)
+
+
+def test_caches_for_types_of_dynamic_values_are_bounded() -> None:
+    codec = attributes_class_codec(WithDynamic)
+    # the types of dynamic values come from the (untrusted) payload
+    for i in range(1500):
+        b = msgpack.packb(
+            {"value": [f'["object", {{"k{i}": "string"}}]'.encode(), {}]}
+        )
+        codec.decode_msgpack(b)
+        marshaler_for_wire_type(ObjectWireType({f"k{i}": StringWireType()}))
+    for cached in [
+        unmarshaler_for_wire_type,
+        marshaler_for_wire_type,
+        _unmarshaling_node,
+        _marshaling_node,
+    ]:
+        assert cached.cache_info().currsize <= 1024
+
+
+@pytest.mark.parametrize(
+    "element_type,elements",
+    [
+        (ObjectWireType({"a": StringWireType()}), [{"a": "x"}, {"a": "y"}]),
+        (ListWireType(StringWireType()), [["x"], ["y", None]]),
+    ],
+)
+def test_dynamic_sets_of_unhashable_values(
+    element_type: AttributeWireType[Any], elements: list[Any]
+) -> None:
+    _assert_dynamic_set_roundtrips(element_type, elements)
+
+
+def _assert_dynamic_set_roundtrips(
+    element_type: AttributeWireType[Any], elements: list[Any]
+) -> None:
+    codec = attributes_class_codec(WithDynamic)
+    wire_type = SetWireType(element_type)
+    marshaled = {"value": [wire_type.serialize_type(), elements]}
+    # unhashable elements can't be put in a set
+    instance = codec.unmarshal(marshaled)
+    assert instance == WithDynamic(Dynamic(wire_type, elements))
+    assert codec.marshal(instance) == marshaled
+
+
+def test_dynamic_sets_of_deeply_nested_values() -> None:
+    # deep enough to go through the explicit stack instead of the compiled
+    # functions for flat values
+    element_type: AttributeWireType[Any] = StringWireType()
+    element: Any = "x"
+    for _ in range(10):
+        element_type, element = ListWireType(element_type), [element]
+    _assert_dynamic_set_roundtrips(element_type, [element, []])
+
+
+def test_deeply_nested_dynamic_values() -> None:
+    depth = 1000
+    wire_type: AttributeWireType[Any] = StringWireType()
+    marshaled: Any = "x"
+    for _ in range(depth):
+        wire_type = MapWireType(wire_type)
+        marshaled = {"a": marshaled, "b": None}
+    unmarshaled = unmarshaler_for_wire_type(wire_type).unmarshal_msgpack(
+        marshaled
+    )
+    # comparing such values directly would hit the recursion limit
+    packed = msgpack.packb(marshaled)
+    assert msgpack.packb(unmarshaled) == packed
+    marshaler = marshaler_for_wire_type(wire_type)
+    assert msgpack.packb(marshaler.marshal_msgpack(unmarshaled)) == packed
+    limited_unmarshaler = unmarshaler_for_wire_type(wire_type, depth - 1)
+    with pytest.raises(ValueError, match="nested more than 999"):
+        limited_unmarshaler.unmarshal_msgpack(marshaled)
+    limited_marshaler = marshaler_for_wire_type(wire_type, depth - 1)
+    with pytest.raises(ValueError, match="nested more than 999"):
+        limited_marshaler.marshal_msgpack(unmarshaled)
+
+
+def test_max_nesting_depth_of_codecs() -> None:
+    wire_type = ListWireType(ListWireType(StringWireType()))
+    marshaled = {"value": [wire_type.serialize_type(), [["x"]]]}
+    instance = WithDynamic(Dynamic(wire_type, [["x"]]))
+    assert attributes_class_codec(WithDynamic).unmarshal(marshaled) == instance
+    codec = attributes_class_codec(WithDynamic, max_nesting_depth=1)
+    with pytest.raises(ValueError, match="'value'") as exc_info:
+        codec.unmarshal(marshaled)
+    assert "nested more than 1" in str(exc_info.value.__cause__)
+    with pytest.raises(ValueError):
+        codec.marshal(instance)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"frozen": True}, {"slots": True}, {"frozen": True, "slots": True}],
+)
+def test_frozen_and_slots_classes(options: dict[str, bool]) -> None:
+    @attributes_class(**options)
+    class State:
+        id: str
+        size: int | None = attribute(optional=True)
+
+    codec = attributes_class_codec(State)
+    instance = codec.unmarshal({"id": "a", "size": 1})
+    assert instance == State(id="a", size=1)
+    assert codec.marshal(instance) == {"id": "a", "size": 1}
+    assert hasattr(instance, "__dict__") is not options.get("slots", False)
+    replaced = replace_attributes_class_instance(instance, size=None)
+    assert replaced == State(id="a", size=None)
+    assert instance.size == 1
+    with pytest.raises(TypeError, match="nope"):
+        replace_attributes_class_instance(instance, nope=1)
+
+
+def test_post_init_is_run() -> None:
+    @attributes_class(frozen=True)
+    class Normalized:
+        name: str
+
+        def __post_init__(self) -> None:
+            object.__setattr__(self, "name", self.name.lower())
+
+    codec = attributes_class_codec(Normalized)
+    assert codec.unmarshal({"name": "A"}).name == "a"
+    assert codec.replace(Normalized("x"), name="B").name == "b"
@@ -0,0 +1,31 @@
+from typing import Any
+
+from tfprovider.level2.attribute_path import ROOT
+from tfprovider.level2.diagnostics import Diagnostics, NotFoundError
+from tfprovider.level4.utils import TracebackPolicy, exception_to_diagnostics
+
+
+def _raise(e: Exception, **kwargs: Any) -> Diagnostics:
+    diagnostics = Diagnostics()
+    with exception_to_diagnostics(diagnostics, "testing", **kwargs):
+        raise e
+    return diagnostics
+
+
+def test_traceback_policies() -> None:
+    [full] = _raise(ValueError("x"))
+    assert full.summary == "error while testing: x"
+    assert full.detail.startswith("Traceback")
+    [short] = _raise(ValueError("x"), traceback_policy=TracebackPolicy.SHORT)
+    assert short.detail.startswith("ValueError: x\n  raised in _raise")
+    [none] = _raise(
+        KeyError("x"), traceback_policies={LookupError: TracebackPolicy.NONE}
+    )
+    assert none.detail == ""
+
+
+def test_diagnostic_error() -> None:
+    path = ROOT.attribute_name("id")
+    [d] = _raise(NotFoundError("gone", attribute=path))
+    assert (d.summary, d.detail) == ("gone", "")
+    assert d.attribute == path.to_protobuf()
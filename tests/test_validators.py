@@ -0,0 +1,72 @@
+from tfprovider.level2.attribute_path import ROOT, AttributePath
+from tfprovider.level2.diagnostics import Diagnostics
+from tfprovider.level2.wire_format import Unknown, UnrefinedUnknown
+from tfprovider.level3.statically_typed_schema import (
+    attribute,
+    attributes_class,
+)
+from tfprovider.level3.validators import (
+    Cidr,
+    ConflictsWith,
+    Each,
+    LengthBetween,
+    OneOf,
+    Regex,
+    RequiredWith,
+    validate_attributes_class_instance,
+)
+
+
+@attributes_class()
+class Config:
+    name: str = attribute(validators=[Regex(r"[a-z]+"), LengthBetween(2, 4)])
+    network: str | None | Unknown = attribute(
+        validators=[Cidr(version=4), ConflictsWith("zone")]
+    )
+    zone: str | None = attribute(validators=[OneOf(["a", "b"])])
+    tags: set[str] | None = attribute(
+        validators=[Each(Regex(r"\w+=\w+")), RequiredWith("zone")]
+    )
+
+
+def _errors(config: Config) -> list[tuple[AttributePath, str]]:
+    diagnostics = Diagnostics()
+    validate_attributes_class_instance(config, diagnostics)
+    return [
+        (AttributePath.from_protobuf(d.attribute), d.detail)
+        for d in diagnostics
+    ]
+
+
+def test_valid_config() -> None:
+    assert _errors(Config("abc", "10.0.0.0/8", None, None)) == []
+    assert _errors(Config("abc", None, "a", {"k=v"})) == []
+
+
+def test_unknown_and_null_values_are_skipped() -> None:
+    assert _errors(Config("abc", UnrefinedUnknown(), None, None)) == []
+
+
+def test_invalid_values() -> None:
+    errors = _errors(Config("A", "10.0.0.1/8", "c", {"k=v", "nope"}))
+    assert [path for path, _ in errors] == [
+        ROOT.attribute_name("name"),
+        ROOT.attribute_name("name"),
+        ROOT.attribute_name("network"),
+        ROOT.attribute_name("network"),
+        ROOT.attribute_name("zone"),
+        ROOT.attribute_name("tags"),
+    ]
+    assert "'nope'" in errors[-1][1]
+
+
+def test_each_reports_list_element_paths() -> None:
+    diagnostics = Diagnostics()
+    path = ROOT.attribute_name("ports")
+    Each(OneOf(["80", "443"])).validate(
+        ["80", None, "22", "443", "8080"], path, None, diagnostics
+    )
+    assert [AttributePath.from_protobuf(d.attribute) for d in diagnostics] == [
+        path.element_key(2),
+        path.element_key(4),
+    ]
@@ -0,0 +1,151 @@
+import copy
+import gc
+import pickle
+import weakref
+from decimal import Decimal
+
+import msgpack
+import pytest
+
+from tfprovider.level2.wire_format import (
+    REFINED_UNKNOWN_EXT_CODE,
+    UNKNOWN_EXT_CODE,
+    BoolWireType,
+    DynamicWireType,
+    ListWireType,
+    MapWireType,
+    NumberWireType,
+    ObjectWireType,
+    OptionalWireType,
+    RefinedUnknown,
+    SetWireType,
+    StringWireType,
+    TupleWireType,
+    UnrefinedUnknown,
+    _interned_wire_types,
+    deserialize_type,
+    ext_to_unknown,
+)
+from tfprovider.level2.wire_marshaling import (
+    DynamicWireTypeMarshaler,
+    DynamicWireTypeUnmarshaler,
+)
+from tfprovider.level2.wire_representation import (
+    MaybeUnknownWireRepresentation,
+    StringWireRepresentation,
+)
+
+
+def test_wire_types_are_interned() -> None:
+    assert StringWireType() is StringWireType()
+    assert ListWireType(StringWireType()) is ListWireType(
+        inner_attribute_type=StringWireType()
+    )
+    assert ListWireType(StringWireType()) is not SetWireType(StringWireType())
+    cache = {MapWireType(StringWireType()): 1}
+    assert cache[MapWireType(StringWireType())] == 1
+
+
+def test_unused_wire_types_are_not_kept_interned() -> None:
+    wire_type = TupleWireType([BoolWireType()] * 7)
+    interned_count = len(_interned_wire_types)
+    wire_type_ref = weakref.ref(wire_type)
+    del wire_type
+    gc.collect()
+    assert wire_type_ref() is None
+    assert len(_interned_wire_types) == interned_count - 1
+
+
+def test_wire_types_of_dynamic_values_are_not_kept_interned() -> None:
+    unmarshaler = DynamicWireTypeUnmarshaler()
+    marshaler = DynamicWireTypeMarshaler()
+    gc.collect()
+    interned_count = len(_interned_wire_types)
+    n = 3000
+    for i in range(n):
+        serialized_type = f'["object", {{"k{i}": "string"}}]'.encode()
+        value = unmarshaler.unmarshal_msgpack([serialized_type, {}])
+        marshaler.marshal_msgpack(value)
+    del value
+    gc.collect()
+    # only those still in the (bounded) caches keyed by wire types remain
+    assert len(_interned_wire_types) - interned_count < n // 2
+
+
+def test_interned_wire_types_are_initialized_once() -> None:
+    wire_type = ObjectWireType({"a": StringWireType()})
+    attribute_types = wire_type.attribute_types
+    assert ObjectWireType({"a": StringWireType()}) is wire_type
+    assert wire_type.attribute_types is attribute_types
+
+
+def test_wire_types_survive_copying_and_pickling() -> None:
+    wire_type = OptionalWireType(ListWireType(StringWireType()))
+    assert copy.deepcopy(wire_type) is wire_type
+    assert pickle.loads(pickle.dumps(wire_type)) is wire_type
+    assert (
+        repr(wire_type) == "OptionalWireType(ListWireType(StringWireType()))"
+    )
+
+
+def test_serialized_type_is_memoized() -> None:
+    wire_type = MapWireType(ListWireType(StringWireType()))
+    assert wire_type.marshal_type() == ["map", ["list", "string"]]
+    assert wire_type.serialize_type() == b'["map", ["list", "string"]]'
+    assert wire_type.serialize_type() is wire_type.serialize_type()
+
+
+def test_refined_unknowns() -> None:
+    unknown = RefinedUnknown.from_refinements(
+        not_null=True,
+        string_prefix="ami-",
+        number_lower_bound=(0, True),
+        number_upper_bound=(
+            Decimal("1000000000000000000000000000000.5"),
+            False,
+        ),
+        length_upper_bound=3,
+    )
+    decoded = ext_to_unknown(REFINED_UNKNOWN_EXT_CODE, unknown.data)
+    assert decoded == unknown
+    assert decoded.not_null
+    assert decoded.string_prefix == "ami-"
+    assert decoded.number_lower_bound == (0, True)
+    assert decoded.number_upper_bound == (
+        Decimal("1000000000000000000000000000000.5"),
+        False,
+    )
+    assert decoded.length_lower_bound is None
+    assert decoded.length_upper_bound == 3
+    assert not RefinedUnknown().not_null
+
+
+def test_refined_unknowns_roundtrip() -> None:
+    representation = MaybeUnknownWireRepresentation(StringWireRepresentation())
+    unknown = RefinedUnknown.from_refinements(string_prefix="x")
+    marshaled = representation.marshal_value_msgpack(unknown)
+    assert marshaled == msgpack.ExtType(REFINED_UNKNOWN_EXT_CODE, unknown.data)
+    assert representation.unmarshal_value_msgpack(marshaled) == unknown
+    assert (
+        representation.unmarshal_value_msgpack(
+            msgpack.ExtType(UNKNOWN_EXT_CODE, b"")
+        )
+        == UnrefinedUnknown()
+    )
+
+
+def test_deserialize_type() -> None:
+    wire_type = ObjectWireType(
+        {
+            "a": ListWireType(NumberWireType()),
+            "b": TupleWireType([BoolWireType(), DynamicWireType()]),
+            "c": MapWireType(SetWireType(StringWireType())),
+        },
+        optional_attributes=frozenset({"c"}),
+    )
+    assert deserialize_type(wire_type.serialize_type()) is wire_type
+    assert deserialize_type(b'["list", "string"]') is ListWireType(
+        StringWireType()
+    )
+    with pytest.raises(ValueError):
+        deserialize_type(b'["list"]')
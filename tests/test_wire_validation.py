@@ -0,0 +1,171 @@
+import sys
+from typing import Any
+
+import msgpack
+
+from tfprovider.level2.attribute_path import ROOT
+from tfprovider.level2.diagnostics import Diagnostics
+from tfprovider.level2.wire_format import (
+    AttributeWireType,
+    BoolWireType,
+    DynamicWireType,
+    ListWireType,
+    MapWireType,
+    MaybeUnknownWireType,
+    NumberWireType,
+    ObjectWireType,
+    OptionalWireType,
+    SetWireType,
+    StringWireType,
+    TupleWireType,
+    UnrefinedUnknown,
+)
+from tfprovider.level2.wire_validation import (
+    WireTypeMismatch,
+    _compile_node,
+    find_wire_type_mismatches,
+    wire_type_validator,
+)
+from tfprovider.level3.statically_typed_schema import (
+    attributes_class,
+    attributes_class_codec,
+)
+
+wire_type = ObjectWireType(
+    {
+        "name": StringWireType(),
+        "count": MaybeUnknownWireType(OptionalWireType(NumberWireType())),
+        "tags": SetWireType(StringWireType()),
+        "ports": ListWireType(NumberWireType()),
+        "labels": MapWireType(OptionalWireType(StringWireType())),
+        "pair": TupleWireType([BoolWireType(), StringWireType()]),
+        "extra": DynamicWireType(),
+    },
+    frozenset({"extra"}),
+)
+
+
+def test_valid_values() -> None:
+    validator = wire_type_validator(wire_type)
+    assert wire_type_validator(wire_type) is validator
+    value = {
+        "name": "a",
+        "count": UnrefinedUnknown(),
+        "tags": ["x"],
+        "ports": [1, 2.5, "123456789012345678901234567890"],
+        "labels": {"k": None},
+        "pair": [True, "b"],
+        "ignored": object(),
+    }
+    assert validator.find_mismatches(value) == []
+    assert validator.is_valid({**value, "count": msgpack.ExtType(0, b"")})
+    assert validator.is_valid(
+        {**value, "extra": ['["list","string"]', ["x", None]]}
+    )
+
+
+def test_all_mismatches_are_reported_with_paths() -> None:
+    value = {
+        "name": None,
+        "count": True,
+        "tags": ["x", 1],
+        "ports": [1, "one", [2]],
+        "labels": {"k": 1},
+        "pair": [True],
+        "extra": ['"string"', 1],
+    }
+    assert find_wire_type_mismatches(value, wire_type) == [
+        WireTypeMismatch(
+            ROOT.attribute_name("count"), "expected number but got bool"
+        ),
+        WireTypeMismatch(
+            ROOT.attribute_name("extra"), "expected string but got int"
+        ),
+        WireTypeMismatch(
+            ROOT.attribute_name("labels").element_key("k"),
+            "expected string but got int",
+        ),
+        WireTypeMismatch(
+            ROOT.attribute_name("name"), "expected string but got null"
+        ),
+        WireTypeMismatch(
+            ROOT.attribute_name("pair"),
+            "expected tuple of length 2 but got list of length 1",
+        ),
+        WireTypeMismatch(
+            ROOT.attribute_name("ports").element_key(1),
+            "invalid number 'one'",
+        ),
+        WireTypeMismatch(
+            ROOT.attribute_name("ports").element_key(2),
+            "expected number but got list",
+        ),
+        WireTypeMismatch(
+            ROOT.attribute_name("tags"), "expected string but got int"
+        ),
+    ]
+    assert find_wire_type_mismatches({}, wire_type)[0] == WireTypeMismatch(
+        ROOT.attribute_name("count"), "missing attribute"
+    )
+    diagnostics = Diagnostics()
+    assert not wire_type_validator(wire_type).validate([], diagnostics)
+    assert [d.detail for d in diagnostics] == ["expected object but got list"]
+
+
+def test_deeply_nested_values() -> None:
+    nested_type: AttributeWireType[Any] = StringWireType()
+    value: Any = 1
+    for _ in range(200):
+        nested_type = ListWireType(nested_type)
+        value = [value]
+    validator = wire_type_validator(nested_type)
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(100)
+    try:
+        [mismatch] = validator.find_mismatches(value)
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+    assert len(mismatch.path) == 200
+
+
+@attributes_class()
+class Config:
+    name: str
+    tags: list[str] | None
+    count: int | None
+
+
+def test_unmarshal_checked() -> None:
+    codec = attributes_class_codec(Config)
+    tags = ["a", "b"]
+    diagnostics = Diagnostics()
+    config = codec.unmarshal_checked(
+        {"name": "x", "tags": tags, "count": None}, diagnostics
+    )
+    assert config == Config("x", ["a", "b"], None)
+    assert config.tags is tags  # used as-is
+    assert not diagnostics
+    assert (
+        codec.unmarshal_checked(
+            {"name": "x", "tags": [None], "count": "1"}, diagnostics
+        )
+        is None
+    )
+    assert [(d.detail, d.attribute) for d in diagnostics] == [
+        (
+            "expected string but got null",
+            ROOT.attribute_name("tags").element_key(0).to_protobuf(),
+        )
+    ]
+
+
+def test_caches_for_types_of_dynamic_values_are_bounded() -> None:
+    validator = wire_type_validator(DynamicWireType())
+    # the types of dynamic values come from the (untrusted) payload
+    for i in range(1500):
+        serialized_type = f'["object", {{"k{i}": "string"}}]'.encode()
+        value = [serialized_type, {f"k{i}": "x"}]
+        assert not validator.find_mismatches(value, ROOT)
+        wire_type_validator(ObjectWireType({f"k{i}": StringWireType()}))
+    assert _compile_node.cache_info().currsize <= 1024
+    assert wire_type_validator.cache_info().currsize <= 1024
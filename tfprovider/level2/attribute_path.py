@@ -1,9 +1,12 @@
-from collections.abc import Iterable
+from collections.abc import Iterable, Mapping
 from dataclasses import dataclass
-from typing import Self
+from typing import Any, Self, cast
 
+import msgpack
 from tfplugin_proto import tfplugin6_4_pb2 as pb
 
+from .wire_format import Unknown
+
 
 class AttributePathElement:
     pass
@@ -19,33 +22,238 @@ class ElementKey(AttributePathElement):
     key: str | int
 
 
+class AttributePathResolutionError(LookupError):
+    """
+    Raised when a path doesn't exist in the value it's resolved against.
+    """
+
+
 class AttributePath:
-    def __init__(self, from_: Iterable[AttributePathElement]):
-        self._elements = tuple(from_)
+    """
+    Immutable path to an attribute or a value nested within one.
+
+    Paths are persistent linked lists: extending a path creates a new path
+    that merely points back to the original, so building paths while walking
+    deeply nested values costs O(1) per step and all paths sharing a prefix
+    share its memory. Children for attribute names are additionally interned,
+    so the same attribute name path is only ever created once per prefix.
+    """
+
+    __slots__ = (
+        "_parent",
+        "_element",
+        "_depth",
+        "_hash",
+        "_children",
+        "_protobuf",
+        "_elements_tuple",
+    )
+
+    _parent: "AttributePath | None"
+    _element: AttributePathElement | None
+    _depth: int
+    _hash: int | None
+    _children: dict[str, Any] | None
+    _protobuf: pb.AttributePath | None
+    _elements_tuple: tuple[AttributePathElement, ...] | None
+
+    def __init__(self, from_: Iterable[AttributePathElement] = ()):
+        elements = tuple(from_)
+        parent = None
+        if elements:
+            parent = self._new(None, None)
+            for element in elements[:-1]:
+                parent = parent._extend(element)
+        self._init(parent, elements[-1] if elements else None)
+
+    def _init(
+        self,
+        parent: "AttributePath | None",
+        element: AttributePathElement | None,
+    ) -> None:
+        self._parent = parent
+        self._element = element
+        self._depth = parent._depth + 1 if parent is not None else 0
+        self._hash = None
+        self._children = None
+        self._protobuf = None
+        self._elements_tuple = None
+
+    @classmethod
+    def _new(
+        cls,
+        parent: "AttributePath | None",
+        element: AttributePathElement | None,
+    ) -> Self:
+        path = cls.__new__(cls)
+        path._init(parent, element)
+        return path
+
+    def _extend(self, element: AttributePathElement) -> Self:
+        return self._new(self, element)
 
     def attribute_name(self, name: str, /) -> Self:
-        return self.__class__(self._elements + (AttributeName(name),))
+        children = self._children
+        if children is None:
+            children = self._children = {}
+        elif (child := children.get(name)) is not None:
+            return child  # type: ignore[no-any-return]
+        child = children[name] = self._extend(AttributeName(name))
+        return child
 
     def element_key(self, key: str | int, /) -> Self:
-        return self.__class__(self._elements + (ElementKey(key),))
+        return self._extend(ElementKey(key))
+
+    @property
+    def parent(self) -> Self | None:
+        return self._parent  # type: ignore[return-value]
+
+    @property
+    def last_element(self) -> AttributePathElement | None:
+        return self._element
+
+    @property
+    def elements(self) -> tuple[AttributePathElement, ...]:
+        if (elements_tuple := self._elements_tuple) is not None:
+            return elements_tuple
+        elements = []
+        path: AttributePath | None = self
+        while path is not None and path._element is not None:
+            elements.append(path._element)
+            path = path._parent
+        elements.reverse()
+        elements_tuple = self._elements_tuple = tuple(elements)
+        return elements_tuple
+
+    @property
+    def _elements(self) -> tuple[AttributePathElement, ...]:
+        return self.elements
+
+    def __len__(self) -> int:
+        return self._depth
+
+    @classmethod
+    def from_protobuf(cls, protobuf: pb.AttributePath) -> Self:
+        """
+        Convert from Protobuf.
+        """
+        # starting from the shared root lets paths share interned prefixes
+        path = ROOT if cls is AttributePath else cls()
+        for step in protobuf.steps:
+            match step.WhichOneof("selector"):
+                case "attribute_name":
+                    path = path.attribute_name(step.attribute_name)
+                case "element_key_string":
+                    path = path.element_key(step.element_key_string)
+                case "element_key_int":
+                    path = path.element_key(step.element_key_int)
+                case _:
+                    raise ValueError(f"invalid attribute path step {step!r}")
+        return cast(Self, path)
+
+    def resolve(self, value: Any) -> Any:
+        """
+        Look up the part of `value` this path points to.
+
+        `value` can be a deserialized msgpack/JSON value, an attributes class
+        instance or any nesting of these: attribute names are looked up as
+        keys of mappings and as fields of attributes class instances, element
+        keys by indexing. If an unknown value is encountered along the way,
+        it is returned, as everything nested in it is unknown as well.
+
+        Raises `AttributePathResolutionError` if the path doesn't exist.
+        """
+        try:
+            for element in self.elements:
+                value = _resolve_step(value, element)
+        except _RESOLUTION_ERRORS as e:
+            raise AttributePathResolutionError(
+                f"can't resolve {self} in given value"
+            ) from e
+        return value
 
     def to_protobuf(self) -> pb.AttributePath:
-        steps = []
-        for elem in self._elements:
-            match elem:
+        """
+        Convert to Protobuf.
+
+        The result is cached, so it must not be modified.
+        """
+        if (protobuf := self._protobuf) is not None:
+            return protobuf
+        # caching all ancestors' messages would make converting deep paths
+        # quadratic, but caching the parent's makes converting siblings (e.g.
+        # paths to all elements of a collection) cheap:
+        parent = self._parent
+        if parent is not None and parent._protobuf is None:
+            parent._protobuf = parent._build_protobuf()
+        protobuf = self._protobuf = self._build_protobuf()
+        return protobuf
+
+    def _build_protobuf(self) -> pb.AttributePath:
+        pending = []
+        path: AttributePath | None = self
+        while path is not None and path._protobuf is None:
+            if path._element is not None:
+                pending.append(path._element)
+            path = path._parent
+        protobuf = pb.AttributePath()
+        if path is not None:
+            assert path._protobuf is not None
+            protobuf.CopyFrom(path._protobuf)
+        steps = protobuf.steps
+        for element in reversed(pending):
+            match element:
                 case AttributeName(name):
-                    steps.append(pb.AttributePath.Step(attribute_name=name))
+                    steps.add(attribute_name=name)
                 case ElementKey(str(key)):
-                    steps.append(pb.AttributePath.Step(element_key_string=key))
+                    steps.add(element_key_string=key)
                 case ElementKey(int(key)):
-                    steps.append(pb.AttributePath.Step(element_key_int=key))
+                    steps.add(element_key_int=key)
                 case _:
                     raise TypeError("should never happen")
-        return pb.AttributePath(steps=steps)
+        return protobuf
+
+    def _uncached_ancestry(self, cache_attr: str) -> list["AttributePath"]:
+        """
+        Return this path and its ancestors without a cached value, root first.
+        """
+        pending = []
+        path: AttributePath | None = self
+        while path is not None and getattr(path, cache_attr) is None:
+            pending.append(path)
+            path = path._parent
+        pending.reverse()
+        return pending
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, AttributePath):
+            return NotImplemented
+        a: AttributePath | None = self
+        b: AttributePath | None = other
+        if self._depth != other._depth:
+            return False
+        # walk both towards the root; shared prefixes end the walk early
+        while a is not b:
+            assert a is not None and b is not None
+            if a._element != b._element:
+                return False
+            a, b = a._parent, b._parent
+        return True
+
+    def __hash__(self) -> int:
+        if (h := self._hash) is not None:
+            return h
+        for path in self._uncached_ancestry("_hash"):
+            parent_hash = (
+                path._parent._hash if path._parent is not None else None
+            )
+            path._hash = hash((parent_hash, path._element))
+        assert self._hash is not None
+        return self._hash
 
     def __str__(self) -> str:
         elem_strs = []
-        for elem in self._elements:
+        for elem in self.elements:
             match elem:
                 case AttributeName(name):
                     elem_strs.append(f".{name}")
@@ -56,7 +264,82 @@ class AttributePath:
         return "".join(elem_strs)
 
     def __repr__(self) -> str:
-        return f"{self.__class__.__name__}({list(self._elements)!r})"
+        return f"{self.__class__.__name__}({list(self.elements)!r})"
+
+
+_RESOLUTION_ERRORS = (KeyError, IndexError, AttributeError, TypeError)
+
+
+def _resolve_step(value: Any, element: AttributePathElement) -> Any:
+    if isinstance(value, (Unknown, msgpack.ExtType)):
+        return value
+    if type(element) is AttributeName:
+        name = element.name
+        if isinstance(value, Mapping):
+            return value[name]
+        # only look up actual fields of attributes class (=dataclass)
+        # instances, not arbitrary attributes like methods
+        if name not in getattr(value, "__dataclass_fields__", ()):
+            raise AttributeError(name)
+        return getattr(value, name)
+    return value[cast(ElementKey, element).key]
+
+
+_NO_DEFAULT = object()
+
+
+def resolve_many(
+    paths: Iterable[AttributePath], value: Any, default: Any = _NO_DEFAULT
+) -> dict[AttributePath, Any]:
+    """
+    Resolve many paths against the same value.
+
+    Each distinct prefix of the given paths is only resolved once, so e.g.
+    resolving paths to all attributes of all elements of a list only looks up
+    the list itself once.
+
+    Paths that don't exist in `value` are mapped to `default` if given, or
+    make this raise `AttributePathResolutionError` otherwise.
+    """
+    resolved: dict[AttributePath, Any] = {}
+    unresolvable: set[AttributePath] = set()
+    result = {}
+    for path in paths:
+        # walk up to the closest already resolved prefix (or the root) ...
+        pending = []
+        node: AttributePath | None = path
+        while node is not None and node not in resolved:
+            if node in unresolvable:
+                break
+            pending.append(node)
+            node = node._parent
+        if node is None:
+            current = value
+        elif node in unresolvable:
+            current = _NO_DEFAULT
+        else:
+            current = resolved[node]
+        # ... and back down to the path itself, remembering each step
+        for prefix in reversed(pending):
+            if current is _NO_DEFAULT:
+                unresolvable.add(prefix)
+                continue
+            if prefix._element is not None:
+                try:
+                    current = _resolve_step(current, prefix._element)
+                except _RESOLUTION_ERRORS:
+                    current = _NO_DEFAULT
+                    unresolvable.add(prefix)
+                    continue
+            resolved[prefix] = current
+        if current is _NO_DEFAULT:
+            if default is _NO_DEFAULT:
+                raise AttributePathResolutionError(
+                    f"can't resolve {path} in given value"
+                )
+            current = default
+        result[path] = current
+    return result
 
 
 ROOT = AttributePath(tuple())
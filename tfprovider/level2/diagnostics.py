@@ -1,17 +1,142 @@
-from collections import UserList
-from collections.abc import Sequence
-from typing import Union
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any, Union, overload
 
-from tfplugin_proto.tfplugin6_4_pb2 import AttributePath, Diagnostic
+from tfplugin_proto import tfplugin6_4_pb2 as pb
+from tfplugin_proto.tfplugin6_4_pb2 import Diagnostic
+
+from .attribute_path import AttributePath
 from .usable_schema import NOT_SET, NotSet
 
+_SEVERITY_NOUNS = {
+    Diagnostic.Severity.ERROR: "errors",
+    Diagnostic.Severity.WARNING: "warnings",
+}
+
+
+class _Record:
+    """
+    Not yet converted diagnostic.
+    """
+
+    __slots__ = ("severity", "summary", "detail", "attribute", "repeats")
+
+    def __init__(
+        self,
+        severity: Union[Diagnostic.Severity, NotSet],
+        summary: str | NotSet,
+        detail: str | NotSet,
+        attribute: AttributePath | pb.AttributePath | NotSet,
+    ):
+        self.severity = severity
+        self.summary = summary
+        self.detail = detail
+        self.attribute = attribute
+        self.repeats = 0
+
+    def to_protobuf(self) -> Diagnostic:
+        d: dict[str, Any] = {}
+        if self.severity is not NOT_SET:
+            d["severity"] = self.severity
+        if self.repeats:
+            summary = self.summary if self.summary is not NOT_SET else ""
+            d["summary"] = f"{summary} (and {self.repeats} more like this)"
+        elif self.summary is not NOT_SET:
+            d["summary"] = self.summary
+        if self.detail is not NOT_SET:
+            d["detail"] = self.detail
+        if isinstance(self.attribute, AttributePath):
+            d["attribute"] = self.attribute.to_protobuf()
+        elif self.attribute is not NOT_SET:
+            d["attribute"] = self.attribute
+        return Diagnostic(**d)
+
+
+class DiagnosticError(Exception):
+    """
+    Exception that maps directly to an error diagnostic.
+
+    Meant for expected failures: when converted to a diagnostic (e.g. by
+    level 4 handlers), the summary, detail and attribute path given here are
+    used as-is, without formatting a traceback.
+    """
+
+    def __init__(
+        self,
+        summary: str,
+        detail: str | NotSet = NOT_SET,
+        attribute: AttributePath | pb.AttributePath | NotSet = NOT_SET,
+    ):
+        super().__init__(summary)
+        self.summary = summary
+        self.detail = detail
+        self.attribute = attribute
+
+    def add_to(self, diagnostics: "Diagnostics") -> None:
+        diagnostics.add_error(
+            summary=self.summary, detail=self.detail, attribute=self.attribute
+        )
+
+
+class NotFoundError(DiagnosticError):
+    """
+    Raised when a remote object doesn't exist (anymore).
+    """
+
+
+class ConflictError(DiagnosticError):
+    """
+    Raised when a remote object is in a state conflicting with an operation.
+    """
+
+
+class InvalidAttributeError(DiagnosticError):
+    """
+    Raised when an attribute's value is invalid.
+    """
+
+    def __init__(
+        self,
+        summary: str,
+        attribute: AttributePath | pb.AttributePath,
+        detail: str | NotSet = NOT_SET,
+    ):
+        super().__init__(summary, detail=detail, attribute=attribute)
+
+
+class Diagnostics:
+    """
+    Collection of diagnostics (errors and warnings) to return to Terraform.
+
+    Diagnostics are only converted to Protobuf messages in `to_protobuf`, so
+    adding many of them is cheap. To keep responses reasonably sized even for
+    pathological inputs, the number of diagnostics kept per severity can be
+    limited via `max_per_severity` (any further ones are only counted and
+    mentioned in a final summary diagnostic) and identical diagnostics (same
+    severity, summary and detail) can be merged into one via `deduplicate`.
+
+    Like the list this class used to be, it can be iterated over and indexed
+    (by index or slice), yielding the diagnostics `to_protobuf` returns.
+    """
+
+    def __init__(
+        self,
+        max_per_severity: int | None = None,
+        deduplicate: bool = False,
+    ) -> None:
+        self.max_per_severity = max_per_severity
+        self.deduplicate = deduplicate
+        self._records: list[_Record] = []
+        self._kept: dict[Any, int] = {}
+        self._omitted: dict[Any, int] = {}
+        # including omitted and merged ones
+        self._counts: dict[Any, int] = {}
+        self._seen: dict[tuple[Any, Any, Any], _Record] = {}
 
-class Diagnostics(UserList[Diagnostic]):
     def add_error(
         self,
         summary: str | NotSet = NOT_SET,
         detail: str | NotSet = NOT_SET,
-        attribute: AttributePath | NotSet = NOT_SET,
+        attribute: AttributePath | pb.AttributePath | NotSet = NOT_SET,
     ) -> None:
         self.add_diagnostic(
             severity=Diagnostic.Severity.ERROR,
@@ -24,7 +149,7 @@ class Diagnostics(UserList[Diagnostic]):
         self,
         summary: str | NotSet = NOT_SET,
         detail: str | NotSet = NOT_SET,
-        attribute: AttributePath | NotSet = NOT_SET,
+        attribute: AttributePath | pb.AttributePath | NotSet = NOT_SET,
     ) -> None:
         self.add_diagnostic(
             severity=Diagnostic.Severity.WARNING,
@@ -38,24 +163,90 @@ class Diagnostics(UserList[Diagnostic]):
         severity: Union[Diagnostic.Severity, NotSet] = NOT_SET,
         summary: str | NotSet = NOT_SET,
         detail: str | NotSet = NOT_SET,
-        attribute: AttributePath | NotSet = NOT_SET,
+        attribute: AttributePath | pb.AttributePath | NotSet = NOT_SET,
     ) -> None:
-        d = {
-            k: v
-            for k, v in {
-                "summary": summary,
-                "detail": detail,
-                "attribute": attribute,
-            }.items()
-            if v != NOT_SET
-        }
-        self.append(Diagnostic(severity=severity, **d))  # type: ignore
+        self._counts[severity] = self._counts.get(severity, 0) + 1
+        if self.deduplicate:
+            key = (severity, summary, detail)
+            if (seen := self._seen.get(key)) is not None:
+                seen.repeats += 1
+                return
+        if self.max_per_severity is not None:
+            kept = self._kept.get(severity, 0)
+            if kept >= self.max_per_severity:
+                self._omitted[severity] = self._omitted.get(severity, 0) + 1
+                return
+            self._kept[severity] = kept + 1
+        record = _Record(severity, summary, detail, attribute)
+        self._records.append(record)
+        if self.deduplicate:
+            self._seen[key] = record
+
+    def append(self, diagnostic: Diagnostic) -> None:
+        """
+        Add an already constructed Protobuf diagnostic.
+        """
+        self.add_diagnostic(
+            severity=diagnostic.severity,
+            summary=diagnostic.summary,
+            detail=diagnostic.detail,
+            attribute=(
+                diagnostic.attribute
+                if diagnostic.HasField("attribute")
+                else NOT_SET
+            ),
+        )
+
+    def extend(self, diagnostics: Iterable[Diagnostic]) -> None:
+        for diagnostic in diagnostics:
+            self.append(diagnostic)
 
     def errors(self) -> Sequence[Diagnostic]:
-        return [x for x in self if x.severity == Diagnostic.Severity.ERROR]
+        return self._to_protobuf_with_severity(Diagnostic.Severity.ERROR)
 
     def warnings(self) -> Sequence[Diagnostic]:
-        return [x for x in self if x.severity == Diagnostic.Severity.ERROR]
+        return self._to_protobuf_with_severity(Diagnostic.Severity.WARNING)
+
+    def has_errors(self) -> bool:
+        return Diagnostic.Severity.ERROR in self._counts
+
+    def _to_protobuf_with_severity(
+        self, severity: Diagnostic.Severity
+    ) -> list[Diagnostic]:
+        return [x for x in self.to_protobuf() if x.severity == severity]
 
     def to_protobuf(self) -> list[Diagnostic]:
-        return list(self)
+        diagnostics = [record.to_protobuf() for record in self._records]
+        for severity, n in self._omitted.items():
+            noun = _SEVERITY_NOUNS.get(severity, "diagnostics")
+            diagnostics.append(
+                Diagnostic(
+                    severity=severity,
+                    summary=f"... and {n} more {noun}",
+                    detail=(
+                        f"Only the first {self.max_per_severity} {noun} are "
+                        "shown."
+                    ),
+                )
+            )
+        return diagnostics
+
+    def __iter__(self) -> Iterator[Diagnostic]:
+        return iter(self.to_protobuf())
+
+    @overload
+    def __getitem__(self, index: int) -> Diagnostic:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Diagnostic]:
+        ...
+
+    def __getitem__(self, index: int | slice) -> Diagnostic | list[Diagnostic]:
+        return self.to_protobuf()[index]
+
+    def __len__(self) -> int:
+        return len(self._records) + len(self._omitted)
+
+    def __bool__(self) -> bool:
+        return bool(self._counts)
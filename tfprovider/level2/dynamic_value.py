@@ -1,18 +1,40 @@
+import threading
 from abc import ABC, abstractmethod
-import json
-from collections.abc import Mapping
-from typing import Any, Generic, TypeVar, cast
+from collections.abc import Callable, Mapping, Sequence
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, BinaryIO, Generic, TypeAlias, TypeVar, cast
 
 import msgpack
-
 from tfplugin_proto.tfplugin6_4_pb2 import DynamicValue
 
+from .json_backend import get_json_backend
 from .usable_schema import NOT_SET, Attribute, Block
-from .wire_format import ImmutableMsgPackish
+from .wire_format import (
+    AttributeWireType,
+    Buffer,
+    DynamicWireType,
+    ImmutableJsonish,
+    ImmutableMsgPackish,
+    ListWireType,
+    MapWireType,
+    MaybeUnknownWireType,
+    ObjectWireType,
+    OptionalWireType,
+    SetWireType,
+    TupleWireType,
+    unmarshal_type,
+)
+from .wire_marshaling import _marshal_decimal, _marshal_int
 
 F = TypeVar("F")
 T = TypeVar("T")
 
+ExtHook: TypeAlias = Callable[[int, bytes], Any]
+
+STREAM_READ_SIZE = 1024 * 1024
+"Size of the chunks in which streams are fed to msgpack's unpacker."
+
 
 # def decode_dynamic_value(
     # value: DynamicValue, wire_type: JsonAndMsgpackSerializableWireType[F, T]
@@ -38,14 +60,209 @@ T = TypeVar("T")
     # return DynamicValue(msgpack=msgpack.packb(msgpackish), json=None)
 
 
+def deserialize_msgpack(
+    b: Buffer, ext_hook: ExtHook = msgpack.ExtType
+) -> ImmutableMsgPackish:
+    """
+    Deserialize msgpack data from any contiguous buffer.
+
+    Memoryviews (e.g. slices of a larger buffer) are read in place, without
+    copying them into a `bytes` object first.
+    """
+    return cast(ImmutableMsgPackish, msgpack.unpackb(b, ext_hook=ext_hook))
+
+
+def deserialize_msgpack_stream(
+    stream: BinaryIO,
+    ext_hook: ExtHook = msgpack.ExtType,
+    read_size: int = STREAM_READ_SIZE,
+) -> ImmutableMsgPackish:
+    """
+    Deserialize a single msgpack value read incrementally from a stream.
+
+    The stream is fed to the unpacker in chunks of `read_size` bytes and the
+    unpacker only holds on to the part of the data it hasn't consumed yet, so
+    the serialized value never has to be in memory as a whole.
+    """
+    unpacker = msgpack.Unpacker(stream, ext_hook=ext_hook, read_size=read_size)
+    return cast(ImmutableMsgPackish, unpacker.unpack())
+
+
+def deserialize_json(b: Buffer) -> ImmutableJsonish:
+    """
+    Deserialize UTF-8 encoded JSON data from any contiguous buffer.
+
+    Uses the currently configured JSON backend (cf. `json_backend` module).
+    """
+    return get_json_backend().loads(b)
+
+
 def deserialize_dynamic_value(value: DynamicValue) -> ImmutableMsgPackish:
-    if (b := value.msgpack) is not None:
-        return cast(ImmutableMsgPackish, msgpack.unpackb(b))
-    elif (b := value.json) is not None:
-        return json.loads(b.decode("utf-8"))
+    # N.B. every access of a protobuf bytes field creates a new copy of the
+    # data, so each field is only accessed once here. And because these are
+    # proto3 fields, unset ones are empty rather than None.
+    if b := value.msgpack:
+        return deserialize_msgpack(b)
+    elif b := value.json:
+        return deserialize_json(b)
+    else:
+        raise ValueError(
+            "can't deserialize DynamicValue which is neither msgpack nor JSON"
+        )
+
+
+_packers = threading.local()
+
+
+def pack_msgpack(value: ImmutableMsgPackish) -> bytes:
+    """
+    Serialize a value to msgpack bytes, reusing a per-thread packer.
+
+    Equivalent to `msgpack.packb`, minus the cost of creating a new packer
+    (and its internal buffer) for every value.
+
+    Integers too large for msgpack are packed as decimal strings, which is
+    how Terraform expects them, and `Decimal`s (e.g. from JSON) the same way
+    the number marshaler would marshal them. msgpack only hands values it
+    can't pack itself to the hook doing this, so other values cost nothing
+    extra.
+    """
+    try:
+        packer = _packers.packer
+    except AttributeError:
+        packer = _packers.packer = msgpack.Packer(default=_pack_default)
+    return packer.pack(value)
+
+
+def _pack_default(value: Any) -> Any:
+    if type(value) is int:  # outside of msgpack's range
+        return _marshal_int(value)
+    if isinstance(value, Decimal):
+        return _marshal_decimal(value)
+    raise TypeError(f"can't serialize {value!r} to msgpack")
+
 
 def serialize_to_dynamic_value(value: ImmutableMsgPackish) -> DynamicValue:
-    return DynamicValue(msgpack=msgpack.packb(value))
+    return DynamicValue(msgpack=pack_msgpack(value))
+
+
+@lru_cache(maxsize=1024)
+def _contains_dynamic(wire_type: AttributeWireType[Any]) -> bool:
+    match wire_type:
+        case DynamicWireType():
+            return True
+        case OptionalWireType(
+            inner_attribute_type=inner
+        ) | MaybeUnknownWireType(inner_attribute_type=inner) | ListWireType(
+            inner_attribute_type=inner
+        ) | SetWireType(
+            inner_attribute_type=inner
+        ) | MapWireType(
+            inner_attribute_type=inner
+        ):
+            return _contains_dynamic(inner)
+        case ObjectWireType(attribute_types=attribute_types):
+            return any(map(_contains_dynamic, attribute_types.values()))
+        case TupleWireType(element_types=element_types):
+            return any(map(_contains_dynamic, element_types))
+        case _:
+            return False
+
+
+def json_dynamic_values_to_msgpack(
+    value: ImmutableJsonish, wire_type: AttributeWireType[Any]
+) -> ImmutableMsgPackish:
+    """
+    Convert values of the dynamic pseudo-type nested in a JSON value.
+
+    In JSON (e.g. raw states), Terraform represents these as objects of the
+    form `{"value": ..., "type": ...}` rather than the `[type, value]` pairs
+    used in msgpack, with the type given as JSON instead of serialized JSON.
+    Parts of the value that can't contain such values are returned as-is.
+    """
+    if value is None or not _contains_dynamic(wire_type):
+        return value
+    match wire_type:
+        case OptionalWireType(
+            inner_attribute_type=inner
+        ) | MaybeUnknownWireType(inner_attribute_type=inner):
+            return json_dynamic_values_to_msgpack(value, inner)
+        case DynamicWireType():
+            if not isinstance(value, dict) or "type" not in value:
+                return value
+            return [
+                unmarshal_type(value["type"]).serialize_type(),
+                value.get("value"),
+            ]
+        case ListWireType(inner_attribute_type=inner) | SetWireType(
+            inner_attribute_type=inner
+        ) if isinstance(value, list):
+            return [json_dynamic_values_to_msgpack(x, inner) for x in value]
+        case MapWireType(inner_attribute_type=inner) if isinstance(
+            value, dict
+        ):
+            return {
+                k: json_dynamic_values_to_msgpack(v, inner)
+                for k, v in value.items()
+            }
+        case ObjectWireType(attribute_types=attribute_types) if isinstance(
+            value, dict
+        ):
+            return {
+                k: (
+                    json_dynamic_values_to_msgpack(v, attribute_types[k])
+                    if k in attribute_types
+                    else v
+                )
+                for k, v in value.items()
+            }
+        case TupleWireType(element_types=element_types) if isinstance(
+            value, list
+        ):
+            return [
+                json_dynamic_values_to_msgpack(x, t)
+                for x, t in zip(value, element_types)
+            ]
+        case _:
+            return value
+
+
+def transcode_json_object_to_msgpack(
+    b: Buffer,
+    attribute_names: Sequence[str],
+    attribute_types: Mapping[str, AttributeWireType[Any]] | None = None,
+) -> bytes:
+    """
+    Transcode a serialized JSON object to msgpack, normalizing its attributes.
+
+    The result contains exactly the attributes in `attribute_names`, in that
+    order: missing ones are set to null and ones not listed are dropped. A
+    JSON null is transcoded to a msgpack null. If `attribute_types` are
+    given, values of the dynamic pseudo-type nested in attributes are
+    converted to their msgpack representation (cf.
+    `json_dynamic_values_to_msgpack`).
+
+    This is cheaper than unmarshaling the object into a Python representation
+    and marshaling it again when all that's needed is the right format.
+    """
+    value = deserialize_json(b)
+    if value is None:
+        return pack_msgpack(None)
+    if not isinstance(value, dict):
+        raise TypeError(
+            f"expected JSON object but got {type(value).__name__} {value!r}"
+        )
+    get = value.get
+    if attribute_types is None:
+        return pack_msgpack({name: get(name) for name in attribute_names})
+    return pack_msgpack(
+        {
+            name: json_dynamic_values_to_msgpack(
+                get(name), attribute_types[name]
+            )
+            for name in attribute_names
+        }
+    )
 
 # TODO find a cleverer solution to this, e.g. ABC for a decoder that decodes to
 #   a user-defined type, which users have to implement
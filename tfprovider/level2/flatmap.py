@@ -0,0 +1,210 @@
+"""
+Decoding of Terraform's legacy "flatmap" state format.
+
+States written by Terraform versions before 0.12 are sent to providers as a
+flat mapping of dotted keys to strings instead of JSON, e.g.
+
+    {"name": "x", "tags.%": "1", "tags.env": "prod", "ports.#": "1",
+     "ports.0": "80"}
+
+Reconstructing the original structure requires the schema, as e.g. both maps
+and objects use dotted keys and all primitive values are strings.
+"""
+from collections.abc import Iterable, Mapping
+from decimal import Decimal
+from typing import Any, TypeAlias
+
+import msgpack
+
+from .wire_format import (
+    UNKNOWN_EXT_CODE,
+    AttributeWireType,
+    BoolWireType,
+    ImmutableMsgPackish,
+    ListWireType,
+    MapWireType,
+    MaybeUnknownWireType,
+    NumberWireType,
+    ObjectWireType,
+    OptionalWireType,
+    SetWireType,
+    StringWireType,
+    TupleWireType,
+)
+
+UNKNOWN_VALUE = "74D93920-ED26-11E3-AC10-0800200C9A66"
+"Placeholder used by legacy Terraform for unknown values in flatmaps."
+
+LIST_COUNT_KEY = "#"
+"Key holding the number of elements of a list or set."
+
+MAP_COUNT_KEY = "%"
+"Key holding the number of elements of a map."
+
+_Items: TypeAlias = list[tuple[str, str]]
+
+_BOOLS = {
+    "true": True,
+    "1": True,
+    "false": False,
+    "0": False,
+}
+
+
+def unflatten_flatmap(
+    flatmap: Mapping[str, str],
+    attribute_types: Mapping[str, AttributeWireType[Any]],
+) -> dict[str, ImmutableMsgPackish]:
+    """
+    Turn a flatmap into the msgpack-like value of the object it represents.
+
+    Every key is only split once per level of nesting it's in, so this runs
+    in time linear in the total length of the keys, no matter how large the
+    collections described by the flatmap are.
+    """
+    exact, nested = _split(flatmap.items())
+    return {
+        name: _unflatten(wire_type, exact.get(name), nested.get(name))
+        for name, wire_type in attribute_types.items()
+    }
+
+
+def _split(
+    items: Iterable[tuple[str, str]]
+) -> tuple[dict[str, str], dict[str, _Items]]:
+    """
+    Group items by the first segment of their keys.
+
+    Returns the values of keys consisting of only one segment and, for all
+    others, the remainders of the keys and values grouped by first segment.
+    """
+    exact: dict[str, str] = {}
+    nested: dict[str, _Items] = {}
+    for key, value in items:
+        head, sep, rest = key.partition(".")
+        if sep:
+            if (group := nested.get(head)) is None:
+                group = nested[head] = []
+            group.append((rest, value))
+        else:
+            exact[head] = value
+    return exact, nested
+
+
+def _unflatten(
+    wire_type: AttributeWireType[Any],
+    value: str | None,
+    items: _Items | None,
+) -> ImmutableMsgPackish:
+    """
+    Unflatten a value from its own flatmap entry and those nested under it.
+    """
+    while isinstance(wire_type, (OptionalWireType, MaybeUnknownWireType)):
+        wire_type = wire_type.inner_attribute_type
+    if value == UNKNOWN_VALUE:
+        return msgpack.ExtType(UNKNOWN_EXT_CODE, b"")
+    match wire_type:
+        case StringWireType():
+            return value
+        case NumberWireType():
+            return _parse_number(value) if value is not None else None
+        case BoolWireType():
+            return _BOOLS[value.lower()] if value is not None else None
+        case ListWireType(inner_attribute_type=inner):
+            if items is None:
+                return None
+            exact, nested = _split(items)
+            if exact.get(LIST_COUNT_KEY) == UNKNOWN_VALUE:
+                return msgpack.ExtType(UNKNOWN_EXT_CODE, b"")
+            count = int(exact.get(LIST_COUNT_KEY, 0))
+            return [
+                _unflatten(inner, exact.get(str(i)), nested.get(str(i)))
+                for i in range(count)
+            ]
+        case SetWireType(inner_attribute_type=inner):
+            if items is None:
+                return None
+            exact, nested = _split(items)
+            if exact.get(LIST_COUNT_KEY) == UNKNOWN_VALUE:
+                return msgpack.ExtType(UNKNOWN_EXT_CODE, b"")
+            # legacy set elements are keyed by hash codes rather than indices
+            element_keys = [k for k in exact if k != LIST_COUNT_KEY]
+            element_keys.extend(k for k in nested if k not in exact)
+            return [
+                _unflatten(inner, exact.get(k), nested.get(k))
+                for k in element_keys
+            ]
+        case MapWireType(inner_attribute_type=inner):
+            if items is None:
+                return None
+            if _is_primitive(inner):
+                # map keys can contain dots themselves, so for primitive
+                # elements, the whole remainder is the key
+                if any(
+                    k == MAP_COUNT_KEY and v == UNKNOWN_VALUE for k, v in items
+                ):
+                    return msgpack.ExtType(UNKNOWN_EXT_CODE, b"")
+                return {
+                    k: _unflatten(inner, v, None)
+                    for k, v in items
+                    if k != MAP_COUNT_KEY
+                }
+            exact, nested = _split(items)
+            if exact.get(MAP_COUNT_KEY) == UNKNOWN_VALUE:
+                return msgpack.ExtType(UNKNOWN_EXT_CODE, b"")
+            element_keys = [k for k in exact if k != MAP_COUNT_KEY]
+            element_keys.extend(k for k in nested if k not in exact)
+            return {
+                k: _unflatten(inner, exact.get(k), nested.get(k))
+                for k in element_keys
+            }
+        case ObjectWireType(attribute_types=attribute_types):
+            if items is None:
+                return None
+            exact, nested = _split(items)
+            if LIST_COUNT_KEY in exact:
+                # old SDKs stored single nested blocks as lists of <= 1 items
+                if exact[LIST_COUNT_KEY] == UNKNOWN_VALUE:
+                    return msgpack.ExtType(UNKNOWN_EXT_CODE, b"")
+                if (element_items := nested.get("0")) is None:
+                    return None
+                exact, nested = _split(element_items)
+            return {
+                name: _unflatten(
+                    attribute_type, exact.get(name), nested.get(name)
+                )
+                for name, attribute_type in attribute_types.items()
+            }
+        case TupleWireType(element_types=element_types):
+            if items is None:
+                return None
+            exact, nested = _split(items)
+            if exact.get(LIST_COUNT_KEY) == UNKNOWN_VALUE:
+                return msgpack.ExtType(UNKNOWN_EXT_CODE, b"")
+            return [
+                _unflatten(element_type, exact.get(str(i)), nested.get(str(i)))
+                for i, element_type in enumerate(element_types)
+            ]
+        case _:
+            raise TypeError(
+                f"can't unflatten values of wire type {wire_type!r}"
+            )
+
+
+def _is_primitive(wire_type: AttributeWireType[Any]) -> bool:
+    while isinstance(wire_type, (OptionalWireType, MaybeUnknownWireType)):
+        wire_type = wire_type.inner_attribute_type
+    return isinstance(
+        wire_type, (StringWireType, NumberWireType, BoolWireType)
+    )
+
+
+def _parse_number(s: str) -> int | float | str:
+    try:
+        return int(s)
+    except ValueError:
+        pass
+    # like Terraform, only use floats for numbers they represent exactly and
+    # pass on decimal strings otherwise
+    as_float = float(s)
+    return as_float if Decimal(as_float) == Decimal(s) else s
@@ -0,0 +1,147 @@
+"""
+Pluggable JSON (de)serialization.
+
+Terraform sends some values as JSON instead of msgpack, e.g. raw states in
+`UpgradeResourceState`. By default, these are parsed with
+[orjson](https://pypi.org/project/orjson/) if it is installed (available via
+this package's `fast-json` extra) and with the standard library's `json`
+module otherwise. Other parsers can be plugged in via `set_json_backend`.
+
+Terraform numbers have arbitrary precision, so non-integral numbers are
+deserialized to `Decimal`s rather than (possibly lossy) `float`s, and
+integers to `int`s no matter their size.
+"""
+import json
+import re
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from typing import Any, cast
+from uuid import uuid4
+
+from .wire_format import Buffer, ImmutableJsonish
+
+
+class JsonBackend(ABC):
+    name: str
+    "*Must* be set by subclasses."
+
+    @abstractmethod
+    def loads(self, b: Buffer) -> ImmutableJsonish:
+        """
+        Deserialize UTF-8 encoded JSON data.
+
+        Non-integral numbers *must* be deserialized to `Decimal`s.
+        """
+
+    @abstractmethod
+    def dumps(self, value: ImmutableJsonish) -> bytes:
+        """
+        Serialize a value to UTF-8 encoded JSON data.
+
+        `Decimal`s *must* be serialized as (exact) numbers.
+        """
+
+
+class StdlibJsonBackend(JsonBackend):
+    name = "json"
+
+    def loads(self, b: Buffer) -> ImmutableJsonish:
+        if isinstance(b, memoryview):
+            # the json module doesn't support the buffer protocol, but
+            # decoding reads the buffer in place (unlike tobytes(), which
+            # would copy the whole payload only for json to decode the copy)
+            s = str(b, "utf-8")
+            return cast(ImmutableJsonish, json.loads(s, parse_float=Decimal))
+        # no need to decode first, json takes care of that
+        return cast(ImmutableJsonish, json.loads(b, parse_float=Decimal))
+
+    def dumps(self, value: ImmutableJsonish) -> bytes:
+        # json can't be made to write anything but its own types as numbers,
+        # so Decimals are written as placeholder strings replaced afterwards
+        # (containing a random token so they can't clash with actual strings)
+        decimals: list[str] = []
+        placeholder = ""
+
+        def default(o: Any) -> str:
+            nonlocal placeholder
+            if not isinstance(o, Decimal):
+                raise TypeError(
+                    f"Object of type {type(o).__name__} is not JSON "
+                    "serializable"
+                )
+            if not o.is_finite():
+                raise ValueError(f"can't serialize non-finite number {o!r}")
+            placeholder = placeholder or f"decimal-{uuid4().hex}"
+            decimals.append(str(o))
+            return placeholder
+
+        s = json.dumps(value, separators=(",", ":"), default=default)
+        if decimals:
+            parts = s.split(f'"{placeholder}"')
+            s = "".join(
+                part + decimal for part, decimal in zip(parts, decimals)
+            )
+            s += parts[-1]
+        return s.encode("utf-8")
+
+
+# orjson silently turns integers outside the 64 bit range into floats and
+# can't parse non-integral numbers into anything but floats either, but
+# Terraform numbers have arbitrary precision => any run of digits long enough
+# to possibly be such an integer, or anything looking like a non-integral
+# number, makes us fall back to the stdlib parser (at worst, this matches
+# something in a string, which just costs some speed):
+_POSSIBLY_INEXACT_NUMBER_RE = re.compile(rb"\d{19}|(?:^|[:,\[])\s*-?\d+[.eE]")
+
+
+class OrjsonJsonBackend(JsonBackend):
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+
+        self._orjson = orjson
+        self._fallback = StdlibJsonBackend()
+
+    def loads(self, b: Buffer) -> ImmutableJsonish:
+        if _POSSIBLY_INEXACT_NUMBER_RE.search(b):
+            return self._fallback.loads(b)
+        # orjson parses bytes directly, without decoding them to str first
+        return cast(ImmutableJsonish, self._orjson.loads(b))
+
+    def dumps(self, value: ImmutableJsonish) -> bytes:
+        try:
+            return cast(bytes, self._orjson.dumps(value))
+        except TypeError:  # again, integers exceeding 64 bits, or Decimals
+            return self._fallback.dumps(value)
+
+
+def default_json_backend() -> JsonBackend:
+    """
+    Return the fastest JSON backend available in the current environment.
+    """
+    try:
+        return OrjsonJsonBackend()
+    except ImportError:
+        return StdlibJsonBackend()
+
+
+_json_backend: JsonBackend | None = None
+
+
+def get_json_backend() -> JsonBackend:
+    """
+    Return the JSON backend currently in use.
+    """
+    global _json_backend
+    if _json_backend is None:
+        _json_backend = default_json_backend()
+    return _json_backend
+
+
+def set_json_backend(backend: JsonBackend | None) -> None:
+    """
+    Set the JSON backend to use, or reset it to the default if `None`.
+    """
+    global _json_backend
+    _json_backend = backend
@@ -54,7 +54,7 @@ class Schema:
 class Block:
     version: int | NotSet = NOT_SET
     attributes: list["Attribute[Any]"] | NotSet = NOT_SET
-    # block_types  # TODO
+    block_types: list["NestedBlock"] | NotSet = NOT_SET
     description: str | NotSet = NOT_SET
     description_kind: Union["StringKind", NotSet] = NOT_SET
     deprecated: bool | NotSet = NOT_SET
@@ -63,11 +63,69 @@ class Block:
         d = {k: v for k, v in asdict(self).items() if v != NOT_SET}
         if self.attributes != NOT_SET:
             d["attributes"] = [a.to_protobuf() for a in self.attributes]
+        if self.block_types != NOT_SET:
+            d["block_types"] = [b.to_protobuf() for b in self.block_types]
         if self.description_kind != NOT_SET:
             d["description_kind"] = self.description_kind.to_protobuf()
         return pb.Schema.Block(**d)
 
 
+class NestingMode(StrEnum):
+    SINGLE = auto()
+    LIST = auto()
+    SET = auto()
+    MAP = auto()
+    GROUP = auto()
+    "Only valid for nested blocks."
+
+    def to_protobuf_block_nesting(self) -> pb.Schema.NestedBlock.NestingMode:
+        return getattr(  # type: ignore[no-any-return]
+            pb.Schema.NestedBlock.NestingMode, self.name
+        )
+
+    def to_protobuf_object_nesting(self) -> pb.Schema.Object.NestingMode:
+        return getattr(  # type: ignore[no-any-return]
+            pb.Schema.Object.NestingMode, self.name
+        )
+
+
+@dataclass
+class NestedBlock:
+    type_name: str
+    block: Block
+    nesting: NestingMode
+    min_items: int | NotSet = NOT_SET
+    max_items: int | NotSet = NOT_SET
+
+    def to_protobuf(self) -> pb.Schema.NestedBlock:
+        d: dict[str, Any] = {
+            "type_name": self.type_name,
+            "block": self.block.to_protobuf(),
+            "nesting": self.nesting.to_protobuf_block_nesting(),
+        }
+        if self.min_items != NOT_SET:
+            d["min_items"] = self.min_items
+        if self.max_items != NOT_SET:
+            d["max_items"] = self.max_items
+        return pb.Schema.NestedBlock(**d)
+
+
+@dataclass
+class NestedObject:
+    """
+    Type of an attribute consisting of nested attributes.
+    """
+
+    attributes: list["Attribute[Any]"]
+    nesting: NestingMode
+
+    def to_protobuf(self) -> pb.Schema.Object:
+        return pb.Schema.Object(
+            attributes=[a.to_protobuf() for a in self.attributes],
+            nesting=self.nesting.to_protobuf_object_nesting(),
+        )
+
+
 W = TypeVar("W", bound=AttributeWireType[Any])
 
 
@@ -75,7 +133,8 @@ W = TypeVar("W", bound=AttributeWireType[Any])
 class Attribute(Generic[W]):
     name: str
     type: W
-    # nested_type: NestingObject  # TODO
+    nested_type: NestedObject | NotSet = NOT_SET
+    "If set, takes the place of `type` in the Terraform schema."
     description: str | NotSet = NOT_SET
     required: bool | NotSet = NOT_SET
     optional: bool | NotSet = NOT_SET
@@ -86,7 +145,11 @@ class Attribute(Generic[W]):
 
     def to_protobuf(self) -> pb.Schema.Attribute:
         d = {k: v for k, v in asdict(self).items() if v != NOT_SET}
-        d["type"] = self.type.serialize_type()
+        if self.nested_type != NOT_SET:
+            del d["type"]
+            d["nested_type"] = self.nested_type.to_protobuf()
+        else:
+            d["type"] = self.type.serialize_type()
         if self.description_kind != NOT_SET:
             d["description_kind"] = self.description_kind.to_protobuf()
         return pb.Schema.Attribute(**d)
@@ -4,9 +4,13 @@ https://github.com/hashicorp/terraform/blob/bdc38b6527ee9927cee67cc992e02cc199f3
 """
 import json
 from abc import ABC, abstractmethod
-from collections.abc import Mapping, Sequence
+from collections.abc import Callable, Hashable, Mapping, Sequence
 from dataclasses import dataclass
-from typing import Generic, TypeAlias, TypeVar
+from decimal import Decimal
+from functools import cache, cached_property, lru_cache, partial, wraps
+from inspect import Signature, signature
+from typing import Any, Generic, TypeAlias, TypeVar
+from weakref import WeakValueDictionary
 
 import msgpack
 
@@ -21,12 +25,156 @@ class UnrefinedUnknown(Unknown):
     pass
 
 
+_REFINEMENT_NOT_NULL = 1
+_REFINEMENT_STRING_PREFIX = 2
+_REFINEMENT_NUMBER_LOWER_BOUND = 3
+_REFINEMENT_NUMBER_UPPER_BOUND = 4
+_REFINEMENT_LENGTH_LOWER_BOUND = 5
+_REFINEMENT_LENGTH_UPPER_BOUND = 6
+
+NumberBound: TypeAlias = tuple[int | float | Decimal, bool]
+"Bound of a number range and whether it's inclusive."
+
+
+def _decode_number(value: Any) -> int | float | Decimal:
+    # numbers that don't fit msgpack's numeric types are sent as strings
+    if isinstance(value, str):
+        number = Decimal(value)
+        return int(number) if number == number.to_integral_value() else number
+    return value  # type: ignore[no-any-return]
+
+
+def _encode_number(value: int | float | Decimal) -> int | float | str:
+    return str(value) if isinstance(value, Decimal) else value
+
+
 @dataclass(frozen=True)
 class RefinedUnknown(Unknown):
-    pass
+    """
+    Unknown value about which some things are already known.
+
+    The refinements are kept in their serialized form (the payload of the
+    msgpack extension type they're sent in) and only decoded when one of them
+    is accessed, so passing refined unknowns through unchanged costs nothing.
+    Use `from_refinements` to create new ones.
+    """
+
+    data: bytes = b""
+
+    @classmethod
+    def from_refinements(
+        cls,
+        not_null: bool = False,
+        string_prefix: str | None = None,
+        number_lower_bound: NumberBound | None = None,
+        number_upper_bound: NumberBound | None = None,
+        length_lower_bound: int | None = None,
+        length_upper_bound: int | None = None,
+    ) -> "RefinedUnknown":
+        refinements: dict[int, Any] = {}
+        if not_null:
+            refinements[_REFINEMENT_NOT_NULL] = True
+        if string_prefix:
+            refinements[_REFINEMENT_STRING_PREFIX] = string_prefix
+        if number_lower_bound is not None:
+            bound, inclusive = number_lower_bound
+            refinements[_REFINEMENT_NUMBER_LOWER_BOUND] = [
+                _encode_number(bound),
+                inclusive,
+            ]
+        if number_upper_bound is not None:
+            bound, inclusive = number_upper_bound
+            refinements[_REFINEMENT_NUMBER_UPPER_BOUND] = [
+                _encode_number(bound),
+                inclusive,
+            ]
+        if length_lower_bound is not None:
+            refinements[_REFINEMENT_LENGTH_LOWER_BOUND] = length_lower_bound
+        if length_upper_bound is not None:
+            refinements[_REFINEMENT_LENGTH_UPPER_BOUND] = length_upper_bound
+        return cls(msgpack.packb(refinements) if refinements else b"")
+
+    @cached_property
+    def _refinements(self) -> dict[int, Any]:
+        if not self.data:
+            return {}
+        refinements = msgpack.unpackb(self.data, strict_map_key=False)
+        if not isinstance(refinements, dict):
+            raise ValueError(
+                f"invalid unknown value refinements {self.data!r}"
+            )
+        return refinements
+
+    @property
+    def not_null(self) -> bool:
+        "Whether the value is known not to be null."
+        return bool(self._refinements.get(_REFINEMENT_NOT_NULL, False))
+
+    @property
+    def string_prefix(self) -> str:
+        "Known prefix of a string value (empty if there is none)."
+        return self._refinements.get(  # type: ignore[no-any-return]
+            _REFINEMENT_STRING_PREFIX, ""
+        )
+
+    @property
+    def number_lower_bound(self) -> NumberBound | None:
+        return self._number_bound(_REFINEMENT_NUMBER_LOWER_BOUND)
+
+    @property
+    def number_upper_bound(self) -> NumberBound | None:
+        return self._number_bound(_REFINEMENT_NUMBER_UPPER_BOUND)
+
+    @property
+    def length_lower_bound(self) -> int | None:
+        "Inclusive lower bound of the length of a collection value."
+        return self._refinements.get(_REFINEMENT_LENGTH_LOWER_BOUND)
+
+    @property
+    def length_upper_bound(self) -> int | None:
+        "Inclusive upper bound of the length of a collection value."
+        return self._refinements.get(_REFINEMENT_LENGTH_UPPER_BOUND)
+
+    def _number_bound(self, key: int) -> NumberBound | None:
+        if (bound := self._refinements.get(key)) is None:
+            return None
+        value, inclusive = bound
+        return _decode_number(value), bool(inclusive)
+
+
+UNKNOWN_EXT_CODE = 0
+"msgpack extension type code of unrefined unknown values."
+
+REFINED_UNKNOWN_EXT_CODE = 12
+"msgpack extension type code of refined unknown values."
+
+MSGPACK_MIN_INT = -(2**63)
+"Smallest integer msgpack can represent natively."
+
+MSGPACK_MAX_INT = 2**64 - 1
+"""
+Largest integer msgpack can represent natively.
+
+Terraform sends and accepts numbers outside this range as decimal strings.
+"""
 
 
-JsonishNotNonePrimitives: TypeAlias = str | int | float | bool
+def ext_to_unknown(code: int, data: bytes) -> Unknown:
+    """
+    Convert a msgpack extension type to the unknown value it represents.
+
+    Has the same signature as msgpack's `ext_hook` so it can be passed
+    directly to an unpacker to get `Unknown` markers while unpacking.
+    """
+    if code == UNKNOWN_EXT_CODE:
+        return UnrefinedUnknown()
+    elif code == REFINED_UNKNOWN_EXT_CODE:
+        return RefinedUnknown(data)
+    else:
+        return Unknown()
+
+
+JsonishNotNonePrimitives: TypeAlias = str | int | float | Decimal | bool
 
 JsonishPrimitives: TypeAlias = JsonishNotNonePrimitives | None
 
@@ -43,6 +191,9 @@ ImmutableJsonishWithUnknown: TypeAlias = (
     | Unknown
 )
 
+Buffer: TypeAlias = bytes | bytearray | memoryview
+"Contiguous binary data that can be deserialized without copying it first."
+
 ImmutableMsgPackish: TypeAlias = (
     Mapping[str, "ImmutableMsgPackish"]
     | Sequence["ImmutableMsgPackish"]
@@ -58,7 +209,57 @@ T = TypeVar("T")
 M = TypeVar("M", bound=ImmutableMsgPackish, covariant=True)
 
 
+# weak so that types nobody uses anymore (e.g. ones of dynamic values that
+# have since dropped out of all caches) don't stick around forever; for this
+# to work, caches keyed by wire types must be bounded
+_interned_wire_types: WeakValueDictionary[
+    tuple[Hashable, ...], "AttributeWireType[Any]"
+] = WeakValueDictionary()
+
+
+@cache
+def _init_signature(cls: type) -> Signature:
+    sig = signature(cls.__init__)  # type: ignore[misc]
+    return sig.replace(parameters=list(sig.parameters.values())[1:])
+
+
+def _memoize_marshal_type(
+    marshal_type: Callable[[Any], ImmutableJsonish]
+) -> Callable[[Any], ImmutableJsonish]:
+    @wraps(marshal_type)
+    def memoized_marshal_type(self: Any) -> ImmutableJsonish:
+        try:
+            return self.__dict__["_marshaled_type"]  # type: ignore
+        except KeyError:
+            marshaled = self.__dict__["_marshaled_type"] = marshal_type(self)
+            return marshaled
+
+    return memoized_marshal_type
+
+
+def _init_once(init: Callable[..., None]) -> Callable[..., None]:
+    # __init__ is called again whenever an interned instance is "constructed"
+    @wraps(init)
+    def init_once(self: Any, *args: Any, **kwargs: Any) -> None:
+        if "_initialized" in self.__dict__:
+            return
+        init(self, *args, **kwargs)
+        self.__dict__["_initialized"] = True
+
+    return init_once
+
+
 class AttributeWireType(ABC, Generic[M]):
+    """
+    Terraform type of an attribute.
+
+    Wire types are interned, i.e. constructing a wire type structurally equal
+    to an existing one returns the existing (and already initialized)
+    instance, as long as that is still referenced anywhere else. They can
+    therefore be compared and hashed by identity, which makes them cheap to
+    use as cache keys. The results of `marshal_type` and `serialize_type` are
+    memoized and must not be modified.
+    """
 
     marshaled_value_type: type[M]
     """
@@ -67,8 +268,68 @@ class AttributeWireType(ABC, Generic[M]):
     To be set by subclasses.
     """
 
+    _init_args: tuple[tuple[Any, ...], dict[str, Any]]
+
+    def __new__(cls, *args: Any, **kwargs: Any) -> "AttributeWireType[Any]":
+        key = (cls, *cls._intern_key(*args, **kwargs))
+        if (instance := _interned_wire_types.get(key)) is not None:
+            return instance
+        instance = super().__new__(cls)
+        instance._init_args = (args, kwargs)
+        # setdefault so that concurrent construction still yields one instance
+        return _interned_wire_types.setdefault(key, instance)
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if "marshal_type" in cls.__dict__:
+            cls.marshal_type = _memoize_marshal_type(  # type: ignore
+                cls.__dict__["marshal_type"]
+            )
+        if "__init__" in cls.__dict__:
+            cls.__init__ = _init_once(  # type: ignore[method-assign]
+                cls.__dict__["__init__"]
+            )
+
+    @classmethod
+    def _intern_key(cls, *args: Any, **kwargs: Any) -> tuple[Hashable, ...]:
+        """
+        Normalize constructor arguments to something hashable.
+
+        May be overridden by subclasses whose constructor arguments aren't
+        hashable themselves.
+        """
+        if cls.__init__ is object.__init__:
+            if args or kwargs:
+                raise TypeError(f"{cls.__name__}() takes no arguments")
+            return ()
+        bound = _init_signature(cls).bind(*args, **kwargs)
+        bound.apply_defaults()
+        return tuple(bound.arguments.values())
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        args, kwargs = self._init_args
+        return (partial(type(self), **kwargs), args)
+
+    def __copy__(self) -> "AttributeWireType[M]":
+        return self
+
+    def __deepcopy__(self, memo: Any) -> "AttributeWireType[M]":
+        return self
+
+    def __repr__(self) -> str:
+        args, kwargs = self._init_args
+        arg_strs = [repr(arg) for arg in args]
+        arg_strs.extend(f"{k}={v!r}" for k, v in kwargs.items())
+        return f"{type(self).__name__}({', '.join(arg_strs)})"
+
     def serialize_type(self) -> bytes:
-        return json.dumps(self.marshal_type()).encode("utf-8")
+        try:
+            return self.__dict__["_serialized_type"]  # type: ignore
+        except KeyError:
+            serialized = self.__dict__["_serialized_type"] = json.dumps(
+                self.marshal_type()
+            ).encode("utf-8")
+            return serialized  # type: ignore[no-any-return]
 
     @abstractmethod
     def marshal_type(self) -> ImmutableJsonish:
@@ -152,3 +413,131 @@ class MapWireType(AttributeWireType[dict[str, M]]):
 
     def marshal_type(self) -> list[ImmutableJsonish]:
         return ["map", self.inner_attribute_type.marshal_type()]
+
+
+class ObjectWireType(AttributeWireType[dict[str, ImmutableMsgPackish]]):
+    marshaled_value_type: type[dict[str, ImmutableMsgPackish]]
+
+    def __init__(
+        self,
+        attribute_types: Mapping[str, AttributeWireType[Any]],
+        optional_attributes: frozenset[str] = frozenset(),
+    ):
+        # sorted so structurally equal types also look the same, as the order
+        # of attributes is irrelevant to Terraform
+        self.attribute_types = dict(sorted(attribute_types.items()))
+        self.optional_attributes = frozenset(optional_attributes)
+
+    @classmethod
+    def _intern_key(
+        cls,
+        attribute_types: Mapping[str, AttributeWireType[Any]],
+        optional_attributes: frozenset[str] = frozenset(),
+    ) -> tuple[Hashable, ...]:
+        return (
+            frozenset(attribute_types.items()),
+            frozenset(optional_attributes),
+        )
+
+    def marshal_type(self) -> list[ImmutableJsonish]:
+        marshaled: list[ImmutableJsonish] = [
+            "object",
+            {
+                name: attribute_type.marshal_type()
+                for name, attribute_type in self.attribute_types.items()
+            },
+        ]
+        if self.optional_attributes:
+            marshaled.append(sorted(self.optional_attributes))
+        return marshaled
+
+
+class TupleWireType(AttributeWireType[list[ImmutableMsgPackish]]):
+    marshaled_value_type: type[list[ImmutableMsgPackish]]
+
+    def __init__(self, element_types: Sequence[AttributeWireType[Any]]):
+        self.element_types = tuple(element_types)
+
+    @classmethod
+    def _intern_key(
+        cls, element_types: Sequence[AttributeWireType[Any]]
+    ) -> tuple[Hashable, ...]:
+        return (tuple(element_types),)
+
+    def marshal_type(self) -> list[ImmutableJsonish]:
+        return [
+            "tuple",
+            [t.marshal_type() for t in self.element_types],
+        ]
+
+
+class DynamicWireType(AttributeWireType[list[ImmutableMsgPackish]]):
+    """
+    Terraform's "dynamic" pseudo-type.
+
+    Values of this type are sent as pairs of their actual type (serialized
+    as JSON) and the value itself, cf. `Dynamic`.
+    """
+
+    marshaled_value_type: type[list[ImmutableMsgPackish]]
+
+    def marshal_type(self) -> str:
+        return "dynamic"
+
+
+@dataclass(frozen=True)
+class Dynamic:
+    """
+    Value of an attribute of the dynamic pseudo-type, along with its type.
+    """
+
+    wire_type: AttributeWireType[Any]
+    value: Any
+
+
+def unmarshal_type(marshaled: ImmutableJsonish) -> AttributeWireType[Any]:
+    """
+    Convert a type from Terraform's JSON representation to its wire type.
+
+    Inverse of `AttributeWireType.marshal_type`.
+    """
+    match marshaled:
+        case "string":
+            return StringWireType()
+        case "number":
+            return NumberWireType()
+        case "bool":
+            return BoolWireType()
+        case "dynamic":
+            return DynamicWireType()
+        case ["list", inner]:
+            return ListWireType(unmarshal_type(inner))
+        case ["set", inner]:
+            return SetWireType(unmarshal_type(inner))
+        case ["map", inner]:
+            return MapWireType(unmarshal_type(inner))
+        case ["object", Mapping() as attribute_types, *rest] if len(rest) < 2:
+            optional_attributes: Any = rest[0] if rest else ()
+            return ObjectWireType(
+                {
+                    name: unmarshal_type(attribute_type)
+                    for name, attribute_type in attribute_types.items()
+                },
+                frozenset(optional_attributes),
+            )
+        case ["tuple", list() as element_types]:
+            return TupleWireType([unmarshal_type(t) for t in element_types])
+        case _:
+            raise ValueError(f"invalid Terraform type {marshaled!r}")
+
+
+@lru_cache(maxsize=1024)
+def deserialize_type(b: bytes) -> AttributeWireType[Any]:
+    """
+    Deserialize a type from Terraform's JSON representation to its wire type.
+
+    Inverse of `AttributeWireType.serialize_type`. Results are cached by the
+    serialized type, so values sharing a type (e.g. those of dynamic
+    attributes across many resource instances) only require parsing it once.
+    """
+    return unmarshal_type(json.loads(b))
@@ -1,18 +1,38 @@
 from abc import ABC, abstractmethod
-from collections.abc import Sequence, Set
+from array import array
+from collections.abc import Iterable, Mapping, Sequence, Set
 from datetime import date, datetime
-from typing import Any, Generic, TypeVar, cast
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache, partial
+from typing import Any, Callable, Generic, TypeAlias, TypeVar, cast
 
 import msgpack
 
 from .wire_format import (
+    MSGPACK_MAX_INT,
+    MSGPACK_MIN_INT,
+    REFINED_UNKNOWN_EXT_CODE,
+    UNKNOWN_EXT_CODE,
     AttributeWireType,
+    BoolWireType,
+    Dynamic,
+    DynamicWireType,
     ImmutableMsgPackish,
+    ListWireType,
+    MapWireType,
+    MaybeUnknownWireType,
+    NumberWireType,
+    ObjectWireType,
+    OptionalWireType,
     RefinedUnknown,
     SetWireType,
     StringWireType,
+    TupleWireType,
     Unknown,
     UnrefinedUnknown,
+    deserialize_type,
+    ext_to_unknown,
+    unmarshal_type,
 )
 
 # TODO what we really want (but needs HKTVs
@@ -32,14 +52,42 @@ T = TypeVar("T")
 class AttributeWireTypeUnmarshaler(ABC, Generic[W, T]):
     attribute_wire_type: W
 
+    passthrough_types: frozenset[type] = frozenset()
+    """
+    Exact types of values that are returned unchanged when unmarshaled.
+
+    Allows containers to check their elements in bulk and skip unmarshaling
+    them one by one. May be set by subclasses.
+    """
+
     @abstractmethod
     def unmarshal_msgpack(self, value: ImmutableMsgPackish) -> T:
         pass
 
+    def trusted_unmarshal_func(
+        self,
+    ) -> Callable[[ImmutableMsgPackish], T] | None:
+        """
+        Get a function unmarshaling values known to match the wire type.
+
+        Values that passed a validator from `wire_validation` don't have to
+        be type checked again, which e.g. allows lists of strings to be used
+        as-is without looking at their elements. `None` means such values
+        are returned unchanged. May be overridden by subclasses.
+        """
+        return self.unmarshal_msgpack
+
 
 class AttributeWireTypeMarshaler(ABC, Generic[W, T]):
     attribute_wire_type: W
 
+    passthrough_types: frozenset[type] = frozenset()
+    """
+    Exact types of values that are returned unchanged when marshaled.
+
+    May be set by subclasses, cf. `AttributeWireTypeUnmarshaler`.
+    """
+
     # TODO for an attribute wire type of type W[M], this actually returns M,
     # but there is no way to express that in Python's current typing system
     # (needs generic bounds or HKTVs)
@@ -52,6 +100,7 @@ class StringWireTypeUnmarshaler(
     AttributeWireTypeUnmarshaler[StringWireType, str]
 ):
     attribute_wire_type = StringWireType()
+    passthrough_types = frozenset({str})
 
     def unmarshal_msgpack(self, value: ImmutableMsgPackish) -> str:
         if not isinstance(value, str):
@@ -61,9 +110,13 @@ class StringWireTypeUnmarshaler(
             )
         return value
 
+    def trusted_unmarshal_func(self) -> None:
+        return None
+
 
 class StringWireTypeMarshaler(AttributeWireTypeMarshaler[StringWireType, str]):
     attribute_wire_type = StringWireType()
+    passthrough_types = frozenset({str})
 
     def marshal_msgpack(self, value: Any) -> str:
         if not isinstance(value, str):
@@ -74,6 +127,148 @@ class StringWireTypeMarshaler(AttributeWireTypeMarshaler[StringWireType, str]):
         return value
 
 
+def _parse_number(value: str, lossy: bool) -> int | float | Decimal:
+    # integral strings (e.g. IDs too large for msgpack) are the common case
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    if lossy:
+        as_float = float(value)
+        return int(as_float) if as_float.is_integer() else as_float
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"invalid number {value!r}") from None
+    return _normalize_decimal(number, lossy)
+
+
+def _normalize_decimal(number: Decimal, lossy: bool) -> int | float | Decimal:
+    # same representation as if the number had been sent as msgpack, where
+    # Terraform uses ints or floats for numbers exactly representable by them
+    if number.is_finite() and number == number.to_integral_value():
+        return int(number)
+    as_float = float(number)
+    return as_float if lossy or Decimal(as_float) == number else number
+
+
+class NumberWireTypeUnmarshaler(
+    AttributeWireTypeUnmarshaler[NumberWireType, int | float | Decimal]
+):
+    """
+    Unmarshaler of Terraform's arbitrary-precision numbers.
+
+    Integral numbers are unmarshaled to `int`. Numbers that are sent as
+    msgpack floats are exactly representable as such, so they're returned
+    unchanged. All others are sent as decimal strings and unmarshaled to
+    `Decimal`, or to `float` (losing precision) if `lossy` is set.
+
+    Non-integral numbers in JSON are deserialized to `Decimal`s (cf.
+    `json_backend`), which are unmarshaled following the same rules, so the
+    result doesn't depend on the format Terraform happened to use.
+    """
+
+    attribute_wire_type = NumberWireType()
+    passthrough_types = frozenset({int, float})
+
+    def __init__(self, lossy: bool = False):
+        self.lossy = lossy
+
+    def unmarshal_msgpack(
+        self, value: ImmutableMsgPackish
+    ) -> int | float | Decimal:
+        if type(value) in (int, float):
+            return cast(int | float, value)
+        if isinstance(value, str):
+            return _parse_number(value, self.lossy)
+        if isinstance(value, Decimal):
+            return _normalize_decimal(value, self.lossy)
+        raise TypeError(
+            f"expected number but got {value!r} which is of type "
+            f"{type(value)}"
+        )
+
+
+_NUMBER_UNMARSHALER = NumberWireTypeUnmarshaler()
+
+
+def _marshal_decimal(value: Decimal) -> int | float | str:
+    if not value.is_finite():
+        raise ValueError(f"can't marshal non-finite number {value!r}")
+    if value == value.to_integral_value():
+        return _marshal_int(int(value))
+    as_float = float(value)
+    return as_float if Decimal(as_float) == value else str(value)
+
+
+def _marshal_int(value: int) -> int | str:
+    if MSGPACK_MIN_INT <= value <= MSGPACK_MAX_INT:
+        return value
+    return str(value)
+
+
+class NumberWireTypeMarshaler(
+    AttributeWireTypeMarshaler[NumberWireType, int | float | Decimal]
+):
+    """
+    Marshaler of numbers, cf. `NumberWireTypeUnmarshaler`.
+
+    Numbers that can't be represented exactly by msgpack's numeric types are
+    marshaled to decimal strings.
+    """
+
+    attribute_wire_type = NumberWireType()
+    # ints too large for msgpack are taken care of when packing
+    passthrough_types = frozenset({int, float})
+
+    def marshal_msgpack(self, value: Any) -> int | float | str:
+        value_type = type(value)
+        if value_type is int:
+            return _marshal_int(value)
+        if value_type is float:
+            return cast(float, value)
+        if isinstance(value, Decimal):
+            return _marshal_decimal(value)
+        # bool is a subclass of int but not a number as far as TF is concerned
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise TypeError(
+                f"expected number but got {value!r} which is of type "
+                f"{type(value)}"
+            )
+        return _marshal_int(int(value)) if isinstance(value, int) else value
+
+
+class BoolWireTypeUnmarshaler(
+    AttributeWireTypeUnmarshaler[BoolWireType, bool]
+):
+    attribute_wire_type = BoolWireType()
+    passthrough_types = frozenset({bool})
+
+    def unmarshal_msgpack(self, value: ImmutableMsgPackish) -> bool:
+        if not isinstance(value, bool):
+            raise TypeError(
+                f"expected bool but got {value!r} which is of type "
+                f"{type(value)}"
+            )
+        return value
+
+    def trusted_unmarshal_func(self) -> None:
+        return None
+
+
+class BoolWireTypeMarshaler(AttributeWireTypeMarshaler[BoolWireType, bool]):
+    attribute_wire_type = BoolWireType()
+    passthrough_types = frozenset({bool})
+
+    def marshal_msgpack(self, value: Any) -> bool:
+        if not isinstance(value, bool):
+            raise TypeError(
+                f"expected bool but got {value!r} which is of type "
+                f"{type(value)}"
+            )
+        return value
+
+
 class DateTimeAsStringWireTypeUnmarshaler(
     AttributeWireTypeUnmarshaler[StringWireType, datetime]
 ):
@@ -141,12 +336,25 @@ class OptionalWireTypeUnmarshaler(
     ):
         self.inner = inner
         self.attribute_wire_type = inner.attribute_wire_type
+        if inner.passthrough_types:
+            self.passthrough_types = inner.passthrough_types | {type(None)}
 
     def unmarshal_msgpack(self, value: ImmutableMsgPackish) -> T | None:
         return (
             self.inner.unmarshal_msgpack(value) if value is not None else None
         )
 
+    def trusted_unmarshal_func(
+        self,
+    ) -> Callable[[ImmutableMsgPackish], T | None] | None:
+        if (unmarshal := self.inner.trusted_unmarshal_func()) is None:
+            return None
+
+        def unmarshal_optional(value: ImmutableMsgPackish) -> T | None:
+            return unmarshal(value) if value is not None else None
+
+        return unmarshal_optional
+
 
 class OptionalWireTypeMarshaler(
     AttributeWireTypeMarshaler[AttributeWireType[M], T | None]
@@ -156,6 +364,8 @@ class OptionalWireTypeMarshaler(
     ):
         self.inner = inner
         self.attribute_wire_type = inner.attribute_wire_type
+        if inner.passthrough_types:
+            self.passthrough_types = inner.passthrough_types | {type(None)}
 
     def marshal_msgpack(self, value: T | None) -> M | None:
         if value is None:
@@ -175,18 +385,35 @@ class MaybeUnknownWireTypeUnmarshaler(
     ):
         self.inner = inner
         self.attribute_wire_type = inner.attribute_wire_type
+        # unknown values are never of any of these types:
+        self.passthrough_types = inner.passthrough_types
 
     def unmarshal_msgpack(self, value: ImmutableMsgPackish) -> T | Unknown:
-        if isinstance(value, msgpack.ExtType):
-            if value.code == 0:
-                return UnrefinedUnknown()
-            elif value.code == 12:
-                return UnrefinedUnknown()  # TODO actually return refined UK
-            else:
-                return Unknown()
+        if isinstance(value, Unknown):
+            # already converted while unpacking (cf. ext_to_unknown)
+            return value
+        elif isinstance(value, msgpack.ExtType):
+            return ext_to_unknown(value.code, value.data)
         else:
             return self.inner.unmarshal_msgpack(value)
 
+    def trusted_unmarshal_func(
+        self,
+    ) -> Callable[[ImmutableMsgPackish], T | Unknown]:
+        unmarshal = self.inner.trusted_unmarshal_func()
+
+        def unmarshal_maybe_unknown(value: ImmutableMsgPackish) -> Any:
+            if isinstance(value, msgpack.ExtType):
+                return ext_to_unknown(value.code, value.data)
+            if unmarshal is None or isinstance(value, Unknown):
+                return value
+            return unmarshal(value)
+
+        return unmarshal_maybe_unknown
+
+
+_UNREFINED_UNKNOWN_EXT = msgpack.ExtType(UNKNOWN_EXT_CODE, b"")
+
 
 class MaybeUnknownWireTypeMarshaler(
     AttributeWireTypeMarshaler[AttributeWireType[M], T | Unknown]
@@ -196,12 +423,13 @@ class MaybeUnknownWireTypeMarshaler(
     ):
         self.inner = inner
         self.attribute_wire_type = inner.attribute_wire_type
+        self.passthrough_types = inner.passthrough_types
 
     def marshal_msgpack(self, value: T | Unknown) -> M | msgpack.ExtType:
         if isinstance(value, UnrefinedUnknown):
-            return msgpack.ExtType(0, b"")
+            return _UNREFINED_UNKNOWN_EXT
         elif isinstance(value, RefinedUnknown):
-            raise msgpack.ExtType(0, b"")  # TODO actually return refined UK
+            return msgpack.ExtType(REFINED_UNKNOWN_EXT_CODE, value.data)
         elif isinstance(value, Unknown):
             assert False, "should never happen (exhaustive)"
         else:
@@ -211,6 +439,62 @@ class MaybeUnknownWireTypeMarshaler(
             return cast(M, self.inner.marshal_msgpack(value))
 
 
+def _passes_through(
+    values: Iterable[Any], passthrough_types: frozenset[type]
+) -> bool:
+    # type checks in bulk (map and set construction both run in C)
+    return bool(passthrough_types) and set(map(type, values)).issubset(
+        passthrough_types
+    )
+
+
+class ListWireTypeUnmarshaler(
+    AttributeWireTypeUnmarshaler[AttributeWireType[list[M]], Sequence[T]]
+):
+    def __init__(
+        self, inner: AttributeWireTypeUnmarshaler[AttributeWireType[M], T]
+    ):
+        self.inner = inner
+        self.attribute_wire_type = ListWireType(inner.attribute_wire_type)
+
+    def unmarshal_msgpack(self, value: ImmutableMsgPackish) -> list[T]:
+        if not isinstance(value, list):
+            raise TypeError(f"expected list but got {value!r}")
+        if _passes_through(value, self.inner.passthrough_types):
+            return cast(list[T], value)
+        unmarshal = self.inner.unmarshal_msgpack
+        return [unmarshal(elem) for elem in value]
+
+    def trusted_unmarshal_func(
+        self,
+    ) -> Callable[[ImmutableMsgPackish], list[T]] | None:
+        if (unmarshal := self.inner.trusted_unmarshal_func()) is None:
+            return None
+
+        def unmarshal_list(value: Any) -> list[T]:
+            return [unmarshal(elem) for elem in value]
+
+        return unmarshal_list
+
+
+class ListWireTypeMarshaler(
+    AttributeWireTypeMarshaler[AttributeWireType[list[M]], Sequence[T]]
+):
+    def __init__(
+        self, inner: AttributeWireTypeMarshaler[AttributeWireType[M], T]
+    ):
+        self.inner = inner
+        self.attribute_wire_type = ListWireType(inner.attribute_wire_type)
+
+    def marshal_msgpack(self, value: Sequence[T]) -> list[M]:
+        if not isinstance(value, Sequence) or isinstance(value, str):
+            raise TypeError(f"expected sequence but got {value!r}")
+        if _passes_through(value, self.inner.passthrough_types):
+            return cast(list[M], value if type(value) is list else list(value))
+        marshal = self.inner.marshal_msgpack
+        return cast(list[M], [marshal(elem) for elem in value])
+
+
 class SetWireTypeUnmarshaler(
     AttributeWireTypeUnmarshaler[AttributeWireType[list[M]], Set[T]]
 ):
@@ -223,8 +507,21 @@ class SetWireTypeUnmarshaler(
     def unmarshal_msgpack(self, value: ImmutableMsgPackish) -> Set[T]:
         if not isinstance(value, Sequence):
             raise TypeError(f"expected sequence but got {value!r}")
+        if _passes_through(value, self.inner.passthrough_types):
+            return set(cast(Sequence[T], value))
         return set(self.inner.unmarshal_msgpack(elem) for elem in value)
 
+    def trusted_unmarshal_func(
+        self,
+    ) -> Callable[[ImmutableMsgPackish], Set[T]]:
+        if (unmarshal := self.inner.trusted_unmarshal_func()) is None:
+            return set  # type: ignore[return-value]
+
+        def unmarshal_set(value: Any) -> Set[T]:
+            return {unmarshal(elem) for elem in value}
+
+        return unmarshal_set
+
 
 class SetWireTypeMarshaler(
     AttributeWireTypeMarshaler[AttributeWireType[list[M]], Set[T]]
@@ -237,11 +534,1021 @@ class SetWireTypeMarshaler(
 
     def marshal_msgpack(self, value: Set[T]) -> list[M]:
         # TODO check if iterable
+        if _passes_through(value, self.inner.passthrough_types):
+            return cast(list[M], list(value))
         # type should be correct, but inferring it would require HKTVs/GBs
         marshaled_value = [self.inner.marshal_msgpack(x) for x in value]
         return cast(list[M], marshaled_value)
 
 
+class MapWireTypeUnmarshaler(
+    AttributeWireTypeUnmarshaler[
+        AttributeWireType[dict[str, M]], Mapping[str, T]
+    ]
+):
+    def __init__(
+        self, inner: AttributeWireTypeUnmarshaler[AttributeWireType[M], T]
+    ):
+        self.inner = inner
+        self.attribute_wire_type = MapWireType(inner.attribute_wire_type)
+
+    def unmarshal_msgpack(self, value: ImmutableMsgPackish) -> dict[str, T]:
+        if not isinstance(value, dict):
+            raise TypeError(f"expected dict but got {value!r}")
+        if not _passes_through(value, _STR_TYPES):
+            raise TypeError(f"expected only string keys but got {value!r}")
+        if _passes_through(value.values(), self.inner.passthrough_types):
+            return cast(dict[str, T], value)
+        unmarshal = self.inner.unmarshal_msgpack
+        return {k: unmarshal(v) for k, v in value.items()}
+
+    def trusted_unmarshal_func(
+        self,
+    ) -> Callable[[ImmutableMsgPackish], dict[str, T]] | None:
+        if (unmarshal := self.inner.trusted_unmarshal_func()) is None:
+            return None
+
+        def unmarshal_map(value: Any) -> dict[str, T]:
+            return {k: unmarshal(v) for k, v in value.items()}
+
+        return unmarshal_map
+
+
+class MapWireTypeMarshaler(
+    AttributeWireTypeMarshaler[
+        AttributeWireType[dict[str, M]], Mapping[str, T]
+    ]
+):
+    def __init__(
+        self, inner: AttributeWireTypeMarshaler[AttributeWireType[M], T]
+    ):
+        self.inner = inner
+        self.attribute_wire_type = MapWireType(inner.attribute_wire_type)
+
+    def marshal_msgpack(self, value: Mapping[str, T]) -> dict[str, M]:
+        if not isinstance(value, Mapping):
+            raise TypeError(f"expected mapping but got {value!r}")
+        if not _passes_through(value, _STR_TYPES):
+            raise TypeError(f"expected only string keys but got {value!r}")
+        if _passes_through(value.values(), self.inner.passthrough_types):
+            return cast(
+                dict[str, M], value if type(value) is dict else dict(value)
+            )
+        marshal = self.inner.marshal_msgpack
+        return cast(dict[str, M], {k: marshal(v) for k, v in value.items()})
+
+
+_STR_TYPES = frozenset({str})
+
+
+class TupleWireTypeUnmarshaler(
+    AttributeWireTypeUnmarshaler[
+        AttributeWireType[list[ImmutableMsgPackish]], tuple[Any, ...]
+    ]
+):
+    def __init__(
+        self,
+        inners: Sequence[
+            AttributeWireTypeUnmarshaler[AttributeWireType[Any], Any]
+        ],
+    ):
+        self.inners = tuple(inners)
+        self.attribute_wire_type = TupleWireType(
+            [inner.attribute_wire_type for inner in self.inners]
+        )
+        self._unmarshal_funcs = tuple(
+            inner.unmarshal_msgpack for inner in self.inners
+        )
+
+    def unmarshal_msgpack(self, value: ImmutableMsgPackish) -> tuple[Any, ...]:
+        if not isinstance(value, list) or len(value) != len(self.inners):
+            raise TypeError(
+                f"expected list of length {len(self.inners)} but got {value!r}"
+            )
+        return tuple(
+            unmarshal(elem)
+            for unmarshal, elem in zip(self._unmarshal_funcs, value)
+        )
+
+
+class TupleWireTypeMarshaler(
+    AttributeWireTypeMarshaler[
+        AttributeWireType[list[ImmutableMsgPackish]], tuple[Any, ...]
+    ]
+):
+    def __init__(
+        self,
+        inners: Sequence[
+            AttributeWireTypeMarshaler[AttributeWireType[Any], Any]
+        ],
+    ):
+        self.inners = tuple(inners)
+        self.attribute_wire_type = TupleWireType(
+            [inner.attribute_wire_type for inner in self.inners]
+        )
+        self._marshal_funcs = tuple(
+            inner.marshal_msgpack for inner in self.inners
+        )
+
+    def marshal_msgpack(
+        self, value: tuple[Any, ...]
+    ) -> list[ImmutableMsgPackish]:
+        if not isinstance(value, Sequence) or len(value) != len(self.inners):
+            raise TypeError(
+                f"expected sequence of length {len(self.inners)} but got "
+                f"{value!r}"
+            )
+        return [
+            marshal(elem) for marshal, elem in zip(self._marshal_funcs, value)
+        ]
+
+
+class ObjectWireTypeUnmarshaler(
+    AttributeWireTypeUnmarshaler[ObjectWireType, dict[str, Any]]
+):
+    """
+    Unmarshaler of objects into plain dicts.
+
+    Cf. `AttributesClassUnmarshaler` in level 3 for unmarshaling objects into
+    instances of classes instead.
+    """
+
+    def __init__(
+        self,
+        inners: Mapping[
+            str, AttributeWireTypeUnmarshaler[AttributeWireType[Any], Any]
+        ],
+        optional_attributes: frozenset[str] = frozenset(),
+    ):
+        self.inners = dict(inners)
+        self.attribute_wire_type = ObjectWireType(
+            {
+                name: inner.attribute_wire_type
+                for name, inner in self.inners.items()
+            },
+            optional_attributes,
+        )
+        self._unmarshal_funcs = tuple(
+            (name, inner.unmarshal_msgpack)
+            for name, inner in self.inners.items()
+        )
+
+    def unmarshal_msgpack(self, value: ImmutableMsgPackish) -> dict[str, Any]:
+        if not isinstance(value, dict):
+            raise TypeError(f"expected dict but got {value!r}")
+        get = value.get
+        return {
+            name: unmarshal(get(name))
+            for name, unmarshal in self._unmarshal_funcs
+        }
+
+
+class ObjectWireTypeMarshaler(
+    AttributeWireTypeMarshaler[ObjectWireType, Mapping[str, Any]]
+):
+    def __init__(
+        self,
+        inners: Mapping[
+            str, AttributeWireTypeMarshaler[AttributeWireType[Any], Any]
+        ],
+        optional_attributes: frozenset[str] = frozenset(),
+    ):
+        self.inners = dict(inners)
+        self.attribute_wire_type = ObjectWireType(
+            {
+                name: inner.attribute_wire_type
+                for name, inner in self.inners.items()
+            },
+            optional_attributes,
+        )
+        self._marshal_funcs = tuple(
+            (name, inner.marshal_msgpack)
+            for name, inner in self.inners.items()
+        )
+
+    def marshal_msgpack(
+        self, value: Mapping[str, Any]
+    ) -> dict[str, ImmutableMsgPackish]:
+        if not isinstance(value, Mapping):
+            raise TypeError(f"expected mapping but got {value!r}")
+        get = value.get
+        return {
+            name: marshal(get(name)) for name, marshal in self._marshal_funcs
+        }
+
+
+DEFAULT_MAX_NESTING_DEPTH = 1024
+"""
+Default maximum nesting depth of values of arbitrary wire types.
+
+Same as the maximum depth msgpack can (de)serialize. Only applies to values
+(un)marshaled iteratively, i.e. by the (un)marshalers from
+`unmarshaler_for_wire_type`/`marshaler_for_wire_type`, which are used for
+values of the dynamic pseudo-type. The (un)marshalers of values whose types
+are given by a schema (e.g. `ListWireTypeUnmarshaler`) still recurse once per
+nesting level, so these are limited by Python's recursion limit instead (by
+default 1000 frames, shared with the caller), but can't be nested any deeper
+than the schema itself is.
+"""
+
+
+def _split_dynamic_value(
+    value: ImmutableMsgPackish,
+) -> tuple[AttributeWireType[Any], ImmutableMsgPackish]:
+    if isinstance(value, dict) and "type" in value:
+        # JSON representation, cf. json_dynamic_values_to_msgpack
+        return unmarshal_type(value["type"]), value.get("value")
+    if not isinstance(value, list) or len(value) != 2:
+        raise TypeError(f"expected [type, value] pair but got {value!r}")
+    serialized_type, inner_value = value
+    if isinstance(serialized_type, str):
+        serialized_type = serialized_type.encode("utf-8")
+    elif not isinstance(serialized_type, bytes):
+        raise TypeError(
+            f"expected serialized type but got {serialized_type!r}"
+        )
+    return deserialize_type(serialized_type), inner_value
+
+
+class DynamicWireTypeUnmarshaler(
+    AttributeWireTypeUnmarshaler[DynamicWireType, Dynamic]
+):
+    """
+    Unmarshaler of values of the dynamic pseudo-type.
+
+    The value is unmarshaled according to the type it's sent with, as if by
+    the unmarshaler returned by `unmarshaler_for_wire_type`. Both the parsed
+    type and that unmarshaler are cached, so they're only built once for all
+    values of the same type (as long as they aren't evicted: the caches are
+    bounded, as types come from untrusted input).
+    """
+
+    attribute_wire_type = DynamicWireType()
+
+    def __init__(
+        self, max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH
+    ):
+        self.max_nesting_depth = max_nesting_depth
+
+    def unmarshal_msgpack(self, value: ImmutableMsgPackish) -> Dynamic:
+        wire_type, inner_value = _split_dynamic_value(value)
+        unmarshal = unmarshaler_for_wire_type(
+            wire_type, self.max_nesting_depth
+        ).unmarshal_msgpack
+        return Dynamic(wire_type, unmarshal(inner_value))
+
+
+class DynamicWireTypeMarshaler(
+    AttributeWireTypeMarshaler[DynamicWireType, Dynamic]
+):
+    attribute_wire_type = DynamicWireType()
+
+    def __init__(
+        self, max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH
+    ):
+        self.max_nesting_depth = max_nesting_depth
+
+    def marshal_msgpack(self, value: Dynamic) -> list[ImmutableMsgPackish]:
+        if not isinstance(value, Dynamic):
+            raise TypeError(f"expected Dynamic but got {value!r}")
+        wire_type = value.wire_type
+        marshal = marshaler_for_wire_type(
+            wire_type, self.max_nesting_depth
+        ).marshal_msgpack
+        return [wire_type.serialize_type(), marshal(value.value)]
+
+
+_LEAF = "leaf"
+_LIST = "list"
+_SET = "set"
+_MAP = "map"
+_OBJECT = "object"
+_TUPLE = "tuple"
+_DYNAMIC = "dynamic"
+_FINISH = "finish"
+
+_NESTED_KINDS: dict[type, str] = {
+    ListWireType: _LIST,
+    SetWireType: _SET,
+    MapWireType: _MAP,
+    ObjectWireType: _OBJECT,
+    TupleWireType: _TUPLE,
+    DynamicWireType: _DYNAMIC,
+}
+
+_MAX_FLAT_HEIGHT = 8
+"""
+Maximum height of (type) subtrees that are (un)marshaled by plain functions.
+
+These are recursive, but only up to this depth, so they can't hit the
+recursion limit either, while being much faster than going through the
+explicit stack for values made up of many small containers.
+"""
+
+_NON_VALUE_TYPES = frozenset(
+    {type(None), UnrefinedUnknown, RefinedUnknown, msgpack.ExtType}
+)
+"Types of values that are valid in place of values of any wire type."
+
+
+class _NestedNode:
+    """
+    Compiled (un)marshaling instructions for values of a single wire type.
+    """
+
+    __slots__ = (
+        "kind",
+        "convert",
+        "passthrough_types",
+        "height",
+        "children",
+        "names",
+        "leaf_height",
+    )
+
+    def __init__(
+        self,
+        kind: str,
+        convert: Callable[[Any], Any] | None = None,
+        passthrough_types: frozenset[type] = frozenset(),
+        height: int = 0,
+        children: tuple["_NestedNode", ...] = (),
+        names: tuple[str, ...] = (),
+    ):
+        self.kind = kind
+        self.convert = convert
+        "(Un)marshal function of leaves, which are never pushed as children."
+        self.passthrough_types = passthrough_types
+        self.height = height
+        "Nesting depth of the values of leaves (0 for non-containers)."
+        self.children = children
+        self.names = names
+        self.leaf_height = max(
+            (child.height for child in children if child.kind is _LEAF),
+            default=0,
+        )
+
+
+_FINISH_NODE = _NestedNode(_FINISH)
+
+
+def _strip_nullability(
+    wire_type: AttributeWireType[Any],
+) -> AttributeWireType[Any]:
+    # values of arbitrary wire types may be null or unknown anywhere anyway
+    while isinstance(wire_type, (OptionalWireType, MaybeUnknownWireType)):
+        wire_type = wire_type.inner_attribute_type
+    return wire_type
+
+
+def _child_wire_types(
+    wire_type: AttributeWireType[Any],
+) -> tuple[AttributeWireType[Any], ...]:
+    match wire_type:
+        case ListWireType(inner_attribute_type=inner) | SetWireType(
+            inner_attribute_type=inner
+        ) | MapWireType(inner_attribute_type=inner):
+            return (_strip_nullability(inner),)
+        case ObjectWireType(attribute_types=attribute_types):
+            return tuple(map(_strip_nullability, attribute_types.values()))
+        case TupleWireType(element_types=element_types):
+            return tuple(map(_strip_nullability, element_types))
+        case _:
+            return ()
+
+
+_FlatFactory: TypeAlias = Callable[
+    [str, tuple[_NestedNode, ...], tuple[str, ...]], Callable[[Any], Any]
+]
+
+
+def _compile_nested_node(
+    wire_type: AttributeWireType[Any],
+    leaf: Callable[[AttributeWireType[Any]], Any],
+    flat: _FlatFactory,
+) -> _NestedNode:
+    """
+    Compile the node for a wire type, and those for all types nested in it.
+
+    `leaf` has to return the (un)marshaler for non-nested wire types, `flat`
+    the (un)marshal function for containers whose elements are all leaves.
+    """
+    nodes: dict[AttributeWireType[Any], _NestedNode] = {}
+    # post-order traversal using an explicit stack, as types can be as
+    # deeply nested as values
+    stack = [(wire_type, False)]
+    while stack:
+        current, children_done = stack.pop()
+        if current in nodes:
+            continue
+        child_types = _child_wire_types(current)
+        if not children_done:
+            stack.append((current, True))
+            stack.extend((t, False) for t in child_types if t not in nodes)
+            continue
+        kind = _NESTED_KINDS.get(type(current))
+        if kind is None:
+            leaf_converter = leaf(current)
+            nodes[current] = _NestedNode(
+                _LEAF,
+                getattr(leaf_converter, "unmarshal_msgpack", None)
+                or leaf_converter.marshal_msgpack,
+                leaf_converter.passthrough_types,
+            )
+            continue
+        children = tuple(nodes[t] for t in child_types)
+        names = (
+            tuple(current.attribute_types)
+            if isinstance(current, ObjectWireType)
+            else ()
+        )
+        height = 1 + max((child.height for child in children), default=0)
+        if (
+            kind is not _DYNAMIC
+            and height <= _MAX_FLAT_HEIGHT
+            and all(child.kind is _LEAF for child in children)
+        ):
+            nodes[current] = _NestedNode(
+                _LEAF, flat(kind, children, names), height=height
+            )
+        else:
+            nodes[current] = _NestedNode(kind, children=children, names=names)
+    return nodes[wire_type]
+
+
+def _leaf_unmarshaler(
+    wire_type: AttributeWireType[Any],
+) -> AttributeWireTypeUnmarshaler[AttributeWireType[Any], Any]:
+    inner: AttributeWireTypeUnmarshaler[AttributeWireType[Any], Any]
+    match wire_type:
+        case StringWireType():
+            inner = StringWireTypeUnmarshaler()
+        case NumberWireType():
+            inner = _NUMBER_UNMARSHALER
+        case BoolWireType():
+            inner = BoolWireTypeUnmarshaler()
+        case _:
+            raise TypeError(f"can't unmarshal values of type {wire_type!r}")
+    return MaybeUnknownWireTypeUnmarshaler(OptionalWireTypeUnmarshaler(inner))
+
+
+def _leaf_marshaler(
+    wire_type: AttributeWireType[Any],
+) -> AttributeWireTypeMarshaler[AttributeWireType[Any], Any]:
+    inner: AttributeWireTypeMarshaler[AttributeWireType[Any], Any]
+    match wire_type:
+        case StringWireType():
+            inner = StringWireTypeMarshaler()
+        case NumberWireType():
+            inner = NumberWireTypeMarshaler()
+        case BoolWireType():
+            inner = BoolWireTypeMarshaler()
+        case _:
+            raise TypeError(f"can't marshal values of type {wire_type!r}")
+    return MaybeUnknownWireTypeMarshaler(OptionalWireTypeMarshaler(inner))
+
+
+def _unmarshal_non_value(value: Any) -> Any:
+    if type(value) is msgpack.ExtType:
+        return ext_to_unknown(value.code, value.data)
+    return value
+
+
+def _marshal_non_value(value: Any) -> Any:
+    if type(value) is UnrefinedUnknown:
+        return _UNREFINED_UNKNOWN_EXT
+    if type(value) is RefinedUnknown:
+        return msgpack.ExtType(REFINED_UNKNOWN_EXT_CODE, value.data)
+    return value
+
+
+def _check_map_keys(value: Any) -> None:
+    if not _passes_through(value, _STR_TYPES):
+        raise TypeError(f"expected only string keys but got {value!r}")
+
+
+def _flat_unmarshaler(
+    kind: str, children: tuple[_NestedNode, ...], names: tuple[str, ...]
+) -> Callable[[Any], Any]:
+    converts = tuple(child.convert for child in children)
+    unmarshal: Callable[[Any], Any]
+    if kind is _LIST or kind is _SET:
+        ((convert, passthrough_types),) = (
+            (child.convert, child.passthrough_types) for child in children
+        )
+        # elements that are containers themselves aren't hashable
+        is_list = kind is _LIST or children[0].height > 0
+
+        def unmarshal(value: Any) -> Any:
+            if type(value) in _NON_VALUE_TYPES:
+                return _unmarshal_non_value(value)
+            if not isinstance(value, list):
+                raise TypeError(f"expected list but got {value!r}")
+            if not _passes_through(value, passthrough_types):
+                value = [convert(x) for x in value]  # type: ignore[misc]
+            return value if is_list else set(value)
+
+    elif kind is _MAP:
+        ((convert, passthrough_types),) = (
+            (child.convert, child.passthrough_types) for child in children
+        )
+
+        def unmarshal(value: Any) -> Any:
+            if type(value) in _NON_VALUE_TYPES:
+                return _unmarshal_non_value(value)
+            if not isinstance(value, dict):
+                raise TypeError(f"expected dict but got {value!r}")
+            _check_map_keys(value)
+            if _passes_through(value.values(), passthrough_types):
+                return value
+            return {
+                k: convert(v) for k, v in value.items()  # type: ignore[misc]
+            }
+
+    elif kind is _OBJECT:
+        items = tuple(zip(names, converts))
+
+        def unmarshal(value: Any) -> Any:
+            if type(value) in _NON_VALUE_TYPES:
+                return _unmarshal_non_value(value)
+            if not isinstance(value, dict):
+                raise TypeError(f"expected dict but got {value!r}")
+            get = value.get
+            return {
+                name: convert(get(name))  # type: ignore[misc]
+                for name, convert in items
+            }
+
+    else:  # tuple
+        length = len(converts)
+
+        def unmarshal(value: Any) -> Any:
+            if type(value) in _NON_VALUE_TYPES:
+                return _unmarshal_non_value(value)
+            if not isinstance(value, list) or len(value) != length:
+                raise TypeError(
+                    f"expected list of length {length} but got {value!r}"
+                )
+            return tuple(
+                convert(x)  # type: ignore[misc]
+                for convert, x in zip(converts, value)
+            )
+
+    return unmarshal
+
+
+def _check_collection(value: Any) -> None:
+    if not isinstance(value, (Sequence, Set)) or isinstance(value, str):
+        raise TypeError(f"expected collection but got {value!r}")
+
+
+def _flat_marshaler(
+    kind: str, children: tuple[_NestedNode, ...], names: tuple[str, ...]
+) -> Callable[[Any], Any]:
+    converts = tuple(child.convert for child in children)
+    marshal: Callable[[Any], Any]
+    if kind is _LIST or kind is _SET:
+        ((convert, passthrough_types),) = (
+            (child.convert, child.passthrough_types) for child in children
+        )
+
+        def marshal(value: Any) -> Any:
+            if type(value) in _NON_VALUE_TYPES:
+                return _marshal_non_value(value)
+            _check_collection(value)
+            if _passes_through(value, passthrough_types):
+                return value if type(value) is list else list(value)
+            return [convert(x) for x in value]  # type: ignore[misc]
+
+    elif kind is _MAP:
+        ((convert, passthrough_types),) = (
+            (child.convert, child.passthrough_types) for child in children
+        )
+
+        def marshal(value: Any) -> Any:
+            if type(value) in _NON_VALUE_TYPES:
+                return _marshal_non_value(value)
+            if not isinstance(value, Mapping):
+                raise TypeError(f"expected mapping but got {value!r}")
+            _check_map_keys(value)
+            if _passes_through(value.values(), passthrough_types):
+                return value if type(value) is dict else dict(value)
+            return {
+                k: convert(v) for k, v in value.items()  # type: ignore[misc]
+            }
+
+    elif kind is _OBJECT:
+        items = tuple(zip(names, converts))
+
+        def marshal(value: Any) -> Any:
+            if type(value) in _NON_VALUE_TYPES:
+                return _marshal_non_value(value)
+            if not isinstance(value, Mapping):
+                raise TypeError(f"expected mapping but got {value!r}")
+            get = value.get
+            return {
+                name: convert(get(name))  # type: ignore[misc]
+                for name, convert in items
+            }
+
+    else:  # tuple
+        length = len(converts)
+
+        def marshal(value: Any) -> Any:
+            if type(value) in _NON_VALUE_TYPES:
+                return _marshal_non_value(value)
+            _check_collection(value)
+            if len(value) != length:
+                raise TypeError(
+                    f"expected sequence of length {length} but got {value!r}"
+                )
+            return [
+                convert(x)  # type: ignore[misc]
+                for convert, x in zip(converts, value)
+            ]
+
+    return marshal
+
+
+# wire types of dynamic values come from untrusted input, so caches keyed by
+# wire types must be bounded (like `deserialize_type`'s)
+@lru_cache(maxsize=1024)
+def _unmarshaling_node(wire_type: AttributeWireType[Any]) -> _NestedNode:
+    return _compile_nested_node(
+        wire_type, _leaf_unmarshaler, _flat_unmarshaler
+    )
+
+
+@lru_cache(maxsize=1024)
+def _marshaling_node(wire_type: AttributeWireType[Any]) -> _NestedNode:
+    return _compile_nested_node(wire_type, _leaf_marshaler, _flat_marshaler)
+
+
+def _check_depth(depth: int, max_depth: int | None) -> None:
+    if max_depth is not None and depth > max_depth:
+        raise ValueError(f"value is nested more than {max_depth} levels deep")
+
+
+def _make_dynamic(
+    wire_type: AttributeWireType[Any], holder: list[Any]
+) -> Dynamic:
+    return Dynamic(wire_type, holder[0])
+
+
+class IterativeWireTypeUnmarshaler(
+    AttributeWireTypeUnmarshaler[AttributeWireType[Any], Any]
+):
+    """
+    Unmarshaler of values of any nested wire type, to plain Python values.
+
+    Values are walked using an explicit stack instead of a Python call per
+    nesting level, so even deeply nested values (e.g. generic JSON-like
+    documents of the dynamic pseudo-type) can't hit the recursion limit.
+    Values nested deeper than `max_nesting_depth` are rejected (`None`
+    means no limit).
+
+    Cf. `unmarshaler_for_wire_type` for how values are unmarshaled.
+    """
+
+    def __init__(
+        self,
+        wire_type: AttributeWireType[Any],
+        max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH,
+    ):
+        self.attribute_wire_type = wire_type
+        self.max_nesting_depth = max_nesting_depth
+        self._root = _unmarshaling_node(_strip_nullability(wire_type))
+
+    def unmarshal_msgpack(self, value: ImmutableMsgPackish) -> Any:
+        max_depth = self.max_nesting_depth
+        _check_depth(self._root.height, max_depth)
+        holder: list[Any] = [None]
+        # entries: node, value, container to put the result in, key there,
+        # nesting depth of the value
+        stack: list[tuple[_NestedNode, Any, Any, Any, int]] = [
+            (self._root, value, holder, 0, 0)
+        ]
+        pop, push, extend = stack.pop, stack.append, stack.extend
+        current: Any
+        while stack:
+            node, current, target, key, depth = pop()
+            kind = node.kind
+            if kind is _LEAF:
+                target[key] = node.convert(current)  # type: ignore[misc]
+                continue
+            if kind is _FINISH:
+                # for results that can only be built once all of their
+                # elements are (pushed before the elements => popped after)
+                finish, partial_result = current
+                target[key] = finish(partial_result)
+                continue
+            if type(current) in _NON_VALUE_TYPES:
+                target[key] = _unmarshal_non_value(current)
+                continue
+            if kind is _DYNAMIC:
+                wire_type, inner_value = _split_dynamic_value(current)
+                inner_node = _unmarshaling_node(wire_type)
+                _check_depth(depth + inner_node.height, max_depth)
+                inner_holder: list[Any] = [None]
+                push(
+                    (
+                        _FINISH_NODE,
+                        (partial(_make_dynamic, wire_type), inner_holder),
+                        target,
+                        key,
+                        depth,
+                    )
+                )
+                push((inner_node, inner_value, inner_holder, 0, depth))
+                continue
+            depth += 1
+            # children that are leaves are converted right away and can be
+            # containers themselves
+            _check_depth(depth + node.leaf_height, max_depth)
+            children = node.children
+            # from here on, at least one child isn't a leaf
+            if kind is _LIST or kind is _SET:
+                if not isinstance(current, list):
+                    raise TypeError(f"expected list but got {current!r}")
+                (child,) = children
+                # sets of containers are unmarshaled to lists, too, as
+                # their elements aren't hashable
+                elements = target[key] = [None] * len(current)
+                extend(
+                    (child, x, elements, i, depth)
+                    for i, x in enumerate(current)
+                )
+            elif kind is _MAP:
+                if not isinstance(current, dict):
+                    raise TypeError(f"expected dict but got {current!r}")
+                _check_map_keys(current)
+                (child,) = children
+                items = target[key] = dict.fromkeys(current)
+                extend((child, v, items, k, depth) for k, v in current.items())
+            elif kind is _OBJECT:
+                if not isinstance(current, dict):
+                    raise TypeError(f"expected dict but got {current!r}")
+                get = current.get
+                attributes = target[key] = dict.fromkeys(node.names)
+                for name, child in zip(node.names, children):
+                    if child.kind is _LEAF:
+                        attributes[name] = child.convert(  # type: ignore
+                            get(name)
+                        )
+                    else:
+                        push((child, get(name), attributes, name, depth))
+            else:  # tuple
+                if not isinstance(current, list) or len(current) != len(
+                    children
+                ):
+                    raise TypeError(
+                        f"expected list of length {len(children)} but got "
+                        f"{current!r}"
+                    )
+                elements = [None] * len(current)
+                push((_FINISH_NODE, (tuple, elements), target, key, depth))
+                for i, (child, x) in enumerate(zip(children, current)):
+                    if child.kind is _LEAF:
+                        elements[i] = child.convert(x)  # type: ignore[misc]
+                    else:
+                        push((child, x, elements, i, depth))
+        return holder[0]
+
+
+class IterativeWireTypeMarshaler(
+    AttributeWireTypeMarshaler[AttributeWireType[Any], Any]
+):
+    """
+    Marshaler counterpart of `IterativeWireTypeUnmarshaler`.
+    """
+
+    def __init__(
+        self,
+        wire_type: AttributeWireType[Any],
+        max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH,
+    ):
+        self.attribute_wire_type = wire_type
+        self.max_nesting_depth = max_nesting_depth
+        self._root = _marshaling_node(_strip_nullability(wire_type))
+
+    def marshal_msgpack(self, value: Any) -> ImmutableMsgPackish:
+        max_depth = self.max_nesting_depth
+        _check_depth(self._root.height, max_depth)
+        holder: list[Any] = [None]
+        stack: list[tuple[_NestedNode, Any, Any, Any, int]] = [
+            (self._root, value, holder, 0, 0)
+        ]
+        pop, push, extend = stack.pop, stack.append, stack.extend
+        current: Any
+        while stack:
+            node, current, target, key, depth = pop()
+            kind = node.kind
+            if kind is _LEAF:
+                target[key] = node.convert(current)  # type: ignore[misc]
+                continue
+            if type(current) in _NON_VALUE_TYPES:
+                target[key] = _marshal_non_value(current)
+                continue
+            if kind is _DYNAMIC:
+                if not isinstance(current, Dynamic):
+                    raise TypeError(f"expected Dynamic but got {current!r}")
+                wire_type = current.wire_type
+                inner_node = _marshaling_node(wire_type)
+                _check_depth(depth + inner_node.height, max_depth)
+                pair = target[key] = [wire_type.serialize_type(), None]
+                push((inner_node, current.value, pair, 1, depth))
+                continue
+            depth += 1
+            _check_depth(depth + node.leaf_height, max_depth)
+            children = node.children
+            if kind is _LIST or kind is _SET or kind is _TUPLE:
+                _check_collection(current)
+                if kind is _TUPLE and len(current) != len(children):
+                    raise TypeError(
+                        f"expected sequence of length {len(children)} but "
+                        f"got {current!r}"
+                    )
+                elements = target[key] = [None] * len(current)
+                if kind is _TUPLE:
+                    extend(
+                        (child, x, elements, i, depth)
+                        for i, (child, x) in enumerate(zip(children, current))
+                    )
+                else:
+                    (child,) = children
+                    extend(
+                        (child, x, elements, i, depth)
+                        for i, x in enumerate(current)
+                    )
+            else:  # map or object
+                if not isinstance(current, Mapping):
+                    raise TypeError(f"expected mapping but got {current!r}")
+                if kind is _OBJECT:
+                    get = current.get
+                    attributes = target[key] = dict.fromkeys(node.names)
+                    extend(
+                        (child, get(name), attributes, name, depth)
+                        for name, child in zip(node.names, children)
+                    )
+                    continue
+                _check_map_keys(current)
+                (child,) = children
+                items = target[key] = dict.fromkeys(current)
+                extend((child, v, items, k, depth) for k, v in current.items())
+        return holder[0]
+
+
+@lru_cache(maxsize=1024)
+def unmarshaler_for_wire_type(
+    wire_type: AttributeWireType[Any],
+    max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH,
+) -> AttributeWireTypeUnmarshaler[AttributeWireType[Any], Any]:
+    """
+    Get an unmarshaler for values of any wire type, to plain Python values.
+
+    Lists are unmarshaled to lists, sets to sets, maps and objects to dicts,
+    tuples to tuples and values of the dynamic pseudo-type to `Dynamic`.
+    Sets of anything other than strings, numbers and bools are unmarshaled
+    to lists, as their elements aren't hashable. As Terraform allows values
+    nested in these to be null or unknown, so does the unmarshaler.
+
+    Nested values are unmarshaled iteratively, rejecting ones nested deeper
+    than `max_nesting_depth`, cf. `IterativeWireTypeUnmarshaler`.
+    """
+    wire_type = _strip_nullability(wire_type)
+    if type(wire_type) in _NESTED_KINDS:
+        return IterativeWireTypeUnmarshaler(wire_type, max_nesting_depth)
+    return _leaf_unmarshaler(wire_type)
+
+
+@lru_cache(maxsize=1024)
+def marshaler_for_wire_type(
+    wire_type: AttributeWireType[Any],
+    max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH,
+) -> AttributeWireTypeMarshaler[AttributeWireType[Any], Any]:
+    """
+    Get a marshaler of plain Python values of any wire type.
+
+    Counterpart of `unmarshaler_for_wire_type`.
+    """
+    wire_type = _strip_nullability(wire_type)
+    if type(wire_type) in _NESTED_KINDS:
+        return IterativeWireTypeMarshaler(wire_type, max_nesting_depth)
+    return _leaf_marshaler(wire_type)
+
+
+_NUMBER_TYPES = frozenset({int, float})
+
+
+def _check_array_bounds(values: array, lo: Any, hi: Any) -> None:
+    # min()/max() of arrays are computed without Python calls per element
+    if values and lo is not None and min(values) < lo:
+        raise ValueError(
+            f"expected only numbers >= {lo!r} but got {min(values)!r}"
+        )
+    if values and hi is not None and max(values) > hi:
+        raise ValueError(
+            f"expected only numbers <= {hi!r} but got {max(values)!r}"
+        )
+
+
+def _number_array(typecode: str, values: Iterable[Any]) -> array:
+    try:
+        return array(typecode, values)
+    except (OverflowError, TypeError) as e:
+        # TypeError e.g. for non-integral numbers and integer typecodes
+        raise ValueError(
+            "numbers out of range or not representable for array typecode "
+            f"{typecode!r}: {e}"
+        ) from e
+
+
+class NumberArrayWireTypeUnmarshaler(
+    AttributeWireTypeUnmarshaler[
+        AttributeWireType[list[int | float | str]], array
+    ]
+):
+    """
+    Unmarshaler of lists or sets of numbers into compact `array.array`s.
+
+    Elements are converted and range checked by `array` itself, in C, so even
+    large collections are unmarshaled without a Python call per element. The
+    range of valid numbers is determined by the typecode (e.g. `"H"` for
+    unsigned 16 bit integers) and can be restricted further via `min` and
+    `max` (both inclusive).
+    """
+
+    def __init__(
+        self,
+        typecode: str = "q",
+        min: Any = None,
+        max: Any = None,
+        as_set: bool = False,
+    ):
+        self.typecode = typecode
+        self.min = min
+        self.max = max
+        self.as_set = as_set
+        self.attribute_wire_type = (SetWireType if as_set else ListWireType)(
+            NumberWireType()
+        )
+
+    def unmarshal_msgpack(self, value: ImmutableMsgPackish) -> array:
+        if not isinstance(value, list):
+            raise TypeError(f"expected list but got {value!r}")
+        if not _passes_through(value, _NUMBER_TYPES):
+            # e.g. numbers too large for msgpack, which are sent as strings
+            unmarshal = _NUMBER_UNMARSHALER.unmarshal_msgpack
+            value = [unmarshal(elem) for elem in value]
+        result = _number_array(self.typecode, value)
+        _check_array_bounds(result, self.min, self.max)
+        return result
+
+
+class NumberArrayWireTypeMarshaler(
+    AttributeWireTypeMarshaler[
+        AttributeWireType[list[int | float | str]], array
+    ]
+):
+    """
+    Marshaler counterpart of `NumberArrayWireTypeUnmarshaler`.
+
+    Also accepts other collections of numbers, which are converted to arrays
+    first so they're range checked in the same way.
+    """
+
+    def __init__(
+        self,
+        typecode: str = "q",
+        min: Any = None,
+        max: Any = None,
+        as_set: bool = False,
+    ):
+        self.typecode = typecode
+        self.min = min
+        self.max = max
+        self.as_set = as_set
+        self.attribute_wire_type = (SetWireType if as_set else ListWireType)(
+            NumberWireType()
+        )
+
+    def marshal_msgpack(self, value: Any) -> list[int | float]:
+        if type(value) is not array or value.typecode != self.typecode:
+            if not isinstance(value, (Sequence, Set)) or isinstance(
+                value, str
+            ):
+                raise TypeError(f"expected collection but got {value!r}")
+            # array() would silently accept bools
+            if not _passes_through(value, _NUMBER_TYPES):
+                raise TypeError(f"expected only numbers but got {value!r}")
+            value = _number_array(self.typecode, value)
+        _check_array_bounds(value, self.min, self.max)
+        marshaled = value.tolist()
+        if self.as_set:
+            return list(dict.fromkeys(marshaled))
+        return marshaled
+
+
 #### ye olde #####
 
 
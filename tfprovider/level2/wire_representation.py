@@ -4,37 +4,60 @@ Combined wire type + value marshaling/unmarshaling.
 # TODO better name might be type mapping? or sth. like that.
 
 from abc import ABC
-from collections.abc import Set
+from array import array
+from collections.abc import Mapping, Sequence, Set
 from dataclasses import dataclass, field
 from datetime import date, datetime
-from typing import Generic, TypeVar, cast
+from decimal import Decimal
+from typing import Any, Generic, TypeVar, cast
 
 import msgpack
 
 from .wire_format import (
     AttributeWireType,
+    BoolWireType,
+    Dynamic,
+    DynamicWireType,
     ImmutableMsgPackish,
+    ListWireType,
+    MapWireType,
     MaybeUnknownWireType,
+    NumberWireType,
     OptionalWireType,
     SetWireType,
     StringWireType,
+    TupleWireType,
     Unknown,
 )
 from .wire_marshaling import (
     AttributeWireTypeMarshaler,
     AttributeWireTypeUnmarshaler,
+    BoolWireTypeMarshaler,
+    BoolWireTypeUnmarshaler,
     DateAsStringWireTypeMarshaler,
     DateAsStringWireTypeUnmarshaler,
     DateTimeAsStringWireTypeMarshaler,
     DateTimeAsStringWireTypeUnmarshaler,
+    DynamicWireTypeMarshaler,
+    DynamicWireTypeUnmarshaler,
+    ListWireTypeMarshaler,
+    ListWireTypeUnmarshaler,
+    MapWireTypeMarshaler,
+    MapWireTypeUnmarshaler,
     MaybeUnknownWireTypeMarshaler,
     MaybeUnknownWireTypeUnmarshaler,
+    NumberArrayWireTypeMarshaler,
+    NumberArrayWireTypeUnmarshaler,
+    NumberWireTypeMarshaler,
+    NumberWireTypeUnmarshaler,
     OptionalWireTypeMarshaler,
     OptionalWireTypeUnmarshaler,
     SetWireTypeMarshaler,
     SetWireTypeUnmarshaler,
     StringWireTypeMarshaler,
     StringWireTypeUnmarshaler,
+    TupleWireTypeMarshaler,
+    TupleWireTypeUnmarshaler,
 )
 
 M = TypeVar("M", bound=ImmutableMsgPackish, covariant=True)
@@ -75,6 +98,36 @@ class StringWireRepresentation(WireRepresentation[str, str]):
     )
 
 
+@dataclass
+class NumberWireRepresentation(
+    WireRepresentation[int | float | str, int | float | Decimal]
+):
+    """
+    Number representation that doesn't lose precision, cf. number marshalers.
+    """
+
+    attribute_wire_type: NumberWireType = field(default=NumberWireType())
+    unmarshaler: NumberWireTypeUnmarshaler = field(
+        default=NumberWireTypeUnmarshaler()
+    )
+    marshaler: NumberWireTypeMarshaler = field(
+        default=NumberWireTypeMarshaler()
+    )
+
+
+@dataclass
+class BoolWireRepresentation(WireRepresentation[bool, bool]):
+    """
+    Trivial bool representation.
+    """
+
+    attribute_wire_type: BoolWireType = field(default=BoolWireType())
+    unmarshaler: BoolWireTypeUnmarshaler = field(
+        default=BoolWireTypeUnmarshaler()
+    )
+    marshaler: BoolWireTypeMarshaler = field(default=BoolWireTypeMarshaler())
+
+
 @dataclass
 class DateTimeAsStringWireRepresentation(WireRepresentation[str, datetime]):
     """
@@ -105,6 +158,23 @@ class DateAsStringWireRepresentation(WireRepresentation[str, date]):
     )
 
 
+@dataclass
+class DynamicWireRepresentation(
+    WireRepresentation[list[ImmutableMsgPackish], Dynamic]
+):
+    """
+    Representation of values of the dynamic pseudo-type as `Dynamic`.
+    """
+
+    attribute_wire_type: DynamicWireType = field(default=DynamicWireType())
+    unmarshaler: DynamicWireTypeUnmarshaler = field(
+        default=DynamicWireTypeUnmarshaler()
+    )
+    marshaler: DynamicWireTypeMarshaler = field(
+        default=DynamicWireTypeMarshaler()
+    )
+
+
 @dataclass
 class OptionalWireRepresentation(WireRepresentation[M | None, T | None]):
     """
@@ -165,3 +235,105 @@ class SetWireRepresentation(WireRepresentation[list[M], Set[T]]):
         self.attribute_wire_type = SetWireType(inner.attribute_wire_type)
         self.unmarshaler = SetWireTypeUnmarshaler(inner.unmarshaler)
         self.marshaler = SetWireTypeMarshaler(inner.marshaler)
+
+
+@dataclass
+class ListWireRepresentation(WireRepresentation[list[M], Sequence[T]]):
+    """
+    Wrapper around another representation representing a list of its values.
+    """
+
+    inner: WireRepresentation[M, T]
+    attribute_wire_type: ListWireType[M]
+    unmarshaler: ListWireTypeUnmarshaler[M, T]
+    marshaler: ListWireTypeMarshaler[M, T]
+
+    def __init__(self, inner: WireRepresentation[M, T]):
+        self.inner = inner
+        self.attribute_wire_type = ListWireType(inner.attribute_wire_type)
+        self.unmarshaler = ListWireTypeUnmarshaler(inner.unmarshaler)
+        self.marshaler = ListWireTypeMarshaler(inner.marshaler)
+
+
+@dataclass
+class MapWireRepresentation(WireRepresentation[dict[str, M], Mapping[str, T]]):
+    """
+    Wrapper around another representation representing a map of its values.
+    """
+
+    inner: WireRepresentation[M, T]
+    attribute_wire_type: MapWireType[M]
+    unmarshaler: MapWireTypeUnmarshaler[M, T]
+    marshaler: MapWireTypeMarshaler[M, T]
+
+    def __init__(self, inner: WireRepresentation[M, T]):
+        self.inner = inner
+        self.attribute_wire_type = MapWireType(inner.attribute_wire_type)
+        self.unmarshaler = MapWireTypeUnmarshaler(inner.unmarshaler)
+        self.marshaler = MapWireTypeMarshaler(inner.marshaler)
+
+
+@dataclass
+class TupleWireRepresentation(
+    WireRepresentation[list[ImmutableMsgPackish], tuple[Any, ...]]
+):
+    """
+    Wrapper around other representations representing a tuple of values.
+    """
+
+    inners: tuple[WireRepresentation[Any, Any], ...]
+    attribute_wire_type: TupleWireType
+    unmarshaler: TupleWireTypeUnmarshaler
+    marshaler: TupleWireTypeMarshaler
+
+    def __init__(self, inners: Sequence[WireRepresentation[Any, Any]]):
+        self.inners = tuple(inners)
+        self.attribute_wire_type = TupleWireType(
+            [inner.attribute_wire_type for inner in self.inners]
+        )
+        self.unmarshaler = TupleWireTypeUnmarshaler(
+            [inner.unmarshaler for inner in self.inners]
+        )
+        self.marshaler = TupleWireTypeMarshaler(
+            [inner.marshaler for inner in self.inners]
+        )
+
+
+@dataclass
+class NumberArrayWireRepresentation(
+    WireRepresentation[list[int | float | str], array]
+):
+    """
+    Compact representation of lists (or sets) of numbers as `array.array`s.
+
+    Meant for large collections, which take up much less memory this way and
+    are (un)marshaled without a Python call per element. Never chosen
+    automatically, so has to be given explicitly, e.g. for port numbers:
+
+    ```python
+    ports: array = attribute(
+        representation=NumberArrayWireRepresentation("H", min=1)
+    )
+    ```
+    """
+
+    typecode: str
+    attribute_wire_type: AttributeWireType[list[int | float | str]]
+    unmarshaler: NumberArrayWireTypeUnmarshaler
+    marshaler: NumberArrayWireTypeMarshaler
+
+    def __init__(
+        self,
+        typecode: str = "q",
+        min: Any = None,
+        max: Any = None,
+        as_set: bool = False,
+    ):
+        self.typecode = typecode
+        self.unmarshaler = NumberArrayWireTypeUnmarshaler(
+            typecode, min=min, max=max, as_set=as_set
+        )
+        self.marshaler = NumberArrayWireTypeMarshaler(
+            typecode, min=min, max=max, as_set=as_set
+        )
+        self.attribute_wire_type = self.unmarshaler.attribute_wire_type
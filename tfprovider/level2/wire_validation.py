@@ -0,0 +1,424 @@
+"""
+Validation of marshaled values against wire types.
+
+A validator is compiled once per wire type into a tree of nodes that holds
+everything needed to check values of that type (accepted Python types,
+children, ...). Values are then checked by walking them iteratively using
+an explicit stack rather than by recursing, so deeply nested values can't
+hit the recursion limit, and all mismatches are reported rather than just
+the first one, each with the path at which it occurs.
+
+Values that passed validation can be unmarshaled without repeating the
+type checks, cf. `AttributeWireTypeUnmarshaler.trusted_unmarshal_func`.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any
+
+import msgpack
+
+from .attribute_path import ROOT, AttributePath
+from .diagnostics import Diagnostics
+from .wire_format import (
+    REFINED_UNKNOWN_EXT_CODE,
+    UNKNOWN_EXT_CODE,
+    AttributeWireType,
+    BoolWireType,
+    DynamicWireType,
+    ImmutableMsgPackish,
+    ListWireType,
+    MapWireType,
+    MaybeUnknownWireType,
+    NumberWireType,
+    ObjectWireType,
+    OptionalWireType,
+    RefinedUnknown,
+    SetWireType,
+    StringWireType,
+    TupleWireType,
+    Unknown,
+    UnrefinedUnknown,
+    deserialize_type,
+    unmarshal_type,
+)
+from .wire_marshaling import _parse_number, _passes_through
+
+INVALID_VALUE_TYPE_SUMMARY = "Invalid attribute value type"
+
+_UNKNOWN_EXT_CODES = frozenset({UNKNOWN_EXT_CODE, REFINED_UNKNOWN_EXT_CODE})
+_UNKNOWN_TYPES = frozenset({Unknown, UnrefinedUnknown, RefinedUnknown})
+_STR_TYPES = frozenset({str})
+_MISSING = object()
+
+_LEAF = "leaf"
+_LIST = "list"
+_SET = "set"
+_MAP = "map"
+_OBJECT = "object"
+_TUPLE = "tuple"
+_DYNAMIC = "dynamic"
+
+
+@dataclass(frozen=True)
+class WireTypeMismatch:
+    """
+    Part of a value that doesn't match the wire type it should be of.
+    """
+
+    path: AttributePath
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path or '(root)'}: {self.message}"
+
+
+class _Node:
+    """
+    Compiled validation instructions for values of a single wire type.
+    """
+
+    __slots__ = (
+        "kind",
+        "description",
+        "accepted",
+        "maybe_unknown",
+        "container_type",
+        "children",
+    )
+
+    def __init__(
+        self,
+        kind: str,
+        description: str,
+        accepted: frozenset[type],
+        maybe_unknown: bool,
+        container_type: type | None = None,
+        children: tuple[Any, ...] = (),
+    ):
+        self.kind = kind
+        self.description = description
+        self.accepted = accepted
+        "Exact types of values that are valid without further checks."
+        self.maybe_unknown = maybe_unknown
+        self.container_type = container_type
+        self.children = children
+
+
+@lru_cache(maxsize=1024)
+def _compile_node(wire_type: AttributeWireType[Any], lenient: bool) -> _Node:
+    # `lenient` makes everything nullable and unknown-able, which is how
+    # Terraform treats the types of values of the dynamic pseudo-type
+    nullable = maybe_unknown = lenient
+    while isinstance(wire_type, (OptionalWireType, MaybeUnknownWireType)):
+        if isinstance(wire_type, OptionalWireType):
+            nullable = True
+        else:
+            maybe_unknown = True
+        wire_type = wire_type.inner_attribute_type
+    accepted: frozenset[type] = frozenset()
+    if nullable:
+        accepted |= {type(None)}
+    if maybe_unknown:
+        accepted |= _UNKNOWN_TYPES
+    match wire_type:
+        case StringWireType():
+            return _Node(_LEAF, "string", accepted | {str}, maybe_unknown)
+        case NumberWireType():
+            # numbers too large for msgpack are sent as strings, which are
+            # checked separately; JSON numbers may also have become Decimals
+            return _Node(
+                _LEAF,
+                "number",
+                accepted | {int, float, Decimal},
+                maybe_unknown,
+                str,
+            )
+        case BoolWireType():
+            return _Node(_LEAF, "bool", accepted | {bool}, maybe_unknown)
+        case ListWireType(inner_attribute_type=inner) | SetWireType(
+            inner_attribute_type=inner
+        ):
+            kind = _LIST if isinstance(wire_type, ListWireType) else _SET
+            return _Node(
+                kind,
+                kind,
+                accepted,
+                maybe_unknown,
+                list,
+                (_compile_node(inner, lenient),),
+            )
+        case MapWireType(inner_attribute_type=inner):
+            return _Node(
+                _MAP,
+                "map",
+                accepted,
+                maybe_unknown,
+                dict,
+                (_compile_node(inner, lenient),),
+            )
+        case ObjectWireType():
+            return _Node(
+                _OBJECT,
+                "object",
+                accepted,
+                maybe_unknown,
+                dict,
+                tuple(
+                    (
+                        name,
+                        _compile_node(attribute_type, lenient),
+                        name in wire_type.optional_attributes,
+                    )
+                    for name, attribute_type in (
+                        wire_type.attribute_types.items()
+                    )
+                ),
+            )
+        case TupleWireType(element_types=element_types):
+            return _Node(
+                _TUPLE,
+                f"tuple of length {len(element_types)}",
+                accepted,
+                maybe_unknown,
+                list,
+                tuple(_compile_node(t, lenient) for t in element_types),
+            )
+        case DynamicWireType():
+            return _Node(
+                _DYNAMIC, "[type, value] pair", accepted, maybe_unknown, list
+            )
+        case _:
+            raise TypeError(f"can't validate values of type {wire_type!r}")
+
+
+def _describe_type(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, (Unknown, msgpack.ExtType)):
+        return "unknown value"
+    return type(value).__name__
+
+
+class WireTypeValidator:
+    """
+    Compiled validator of marshaled values of a wire type.
+
+    Only types are checked, not e.g. whether number strings are in range.
+    Attributes of objects that aren't part of the object type are ignored,
+    as they are when unmarshaling.
+
+    Use `wire_type_validator` to obtain the (cached) validator for a wire
+    type instead of instantiating this directly.
+    """
+
+    def __init__(self, wire_type: AttributeWireType[Any]):
+        self.wire_type = wire_type
+        self._root = _compile_node(wire_type, False)
+
+    def is_valid(self, value: ImmutableMsgPackish) -> bool:
+        """
+        Check whether a value matches the wire type.
+        """
+        return not self.find_mismatches(value, stop_at_first=True)
+
+    def find_mismatches(
+        self,
+        value: ImmutableMsgPackish,
+        path: AttributePath = ROOT,
+        stop_at_first: bool = False,
+    ) -> list[WireTypeMismatch]:
+        """
+        Find all parts of a value (located at `path`) not matching the type.
+        """
+        mismatches: list[WireTypeMismatch] = []
+        stack: list[tuple[_Node, Any, AttributePath]] = [
+            (self._root, value, path)
+        ]
+        current: Any
+        pop, push, extend = stack.pop, stack.append, stack.extend
+        while stack:
+            if mismatches and stop_at_first:
+                break
+            node, current, path = pop()
+            value_type = type(current)
+            if value_type in node.accepted:
+                continue
+            if value_type is msgpack.ExtType:
+                if not node.maybe_unknown:
+                    mismatches.append(
+                        WireTypeMismatch(
+                            path,
+                            f"expected {node.description} but got unknown "
+                            "value",
+                        )
+                    )
+                elif current.code not in _UNKNOWN_EXT_CODES:
+                    mismatches.append(
+                        WireTypeMismatch(
+                            path,
+                            "unsupported msgpack extension type "
+                            f"{current.code}",
+                        )
+                    )
+                continue
+            if value_type is not node.container_type and not (
+                # JSON representation, cf. json_dynamic_values_to_msgpack
+                value_type is dict
+                and node.kind is _DYNAMIC
+            ):
+                mismatches.append(
+                    WireTypeMismatch(
+                        path,
+                        "missing attribute"
+                        if current is _MISSING
+                        else f"expected {node.description} but got "
+                        f"{_describe_type(current)}",
+                    )
+                )
+                continue
+            kind = node.kind
+            if kind is _LEAF:
+                # only number strings get here
+                try:
+                    _parse_number(current, lossy=False)
+                except ValueError:
+                    mismatches.append(
+                        WireTypeMismatch(path, f"invalid number {current!r}")
+                    )
+            elif kind is _LIST or kind is _SET:
+                (element_node,) = node.children
+                if _passes_through(current, element_node.accepted):
+                    continue
+                # pushed in reverse so mismatches are found in order
+                if kind is _SET:
+                    # set elements have no paths of their own
+                    extend((element_node, x, path) for x in reversed(current))
+                else:
+                    extend(
+                        (element_node, current[i], path.element_key(i))
+                        for i in range(len(current) - 1, -1, -1)
+                    )
+            elif kind is _MAP:
+                (element_node,) = node.children
+                if not _passes_through(current, _STR_TYPES):
+                    mismatches.extend(
+                        WireTypeMismatch(
+                            path, f"expected string key but got {key!r}"
+                        )
+                        for key in current
+                        if type(key) is not str
+                    )
+                    continue
+                if _passes_through(current.values(), element_node.accepted):
+                    continue
+                extend(
+                    (element_node, v, path.element_key(k))
+                    for k, v in reversed(current.items())
+                )
+            elif kind is _OBJECT:
+                get = current.get
+                for name, attribute_node, optional in reversed(node.children):
+                    attribute_value = get(name, _MISSING)
+                    if attribute_value is _MISSING and optional:
+                        continue
+                    # missing required attributes are reported when popped
+                    # to keep mismatches in order
+                    push(
+                        (
+                            attribute_node,
+                            attribute_value,
+                            path.attribute_name(name),
+                        )
+                    )
+            elif kind is _TUPLE:
+                if len(current) != len(node.children):
+                    mismatches.append(
+                        WireTypeMismatch(
+                            path,
+                            f"expected {node.description} but got list of "
+                            f"length {len(current)}",
+                        )
+                    )
+                    continue
+                extend(
+                    (node.children[i], current[i], path.element_key(i))
+                    for i in range(len(current) - 1, -1, -1)
+                )
+            else:
+                if (dynamic := _dynamic_value_node(current)) is None:
+                    mismatches.append(
+                        WireTypeMismatch(
+                            path,
+                            f"expected {node.description} with a valid type "
+                            f"but got {current!r}",
+                        )
+                    )
+                    continue
+                push((*dynamic, path))
+        return mismatches
+
+    def validate(
+        self,
+        value: ImmutableMsgPackish,
+        diagnostics: Diagnostics,
+        path: AttributePath = ROOT,
+    ) -> bool:
+        """
+        Report all mismatches as errors, returning whether there were none.
+        """
+        mismatches = self.find_mismatches(value, path)
+        for mismatch in mismatches:
+            diagnostics.add_error(
+                summary=INVALID_VALUE_TYPE_SUMMARY,
+                detail=mismatch.message,
+                attribute=mismatch.path,
+            )
+        return not mismatches
+
+
+def _dynamic_value_node(
+    value: list[Any] | dict[str, Any]
+) -> tuple[_Node, Any] | None:
+    """
+    Return the node for the type of a dynamic value along with its value.
+    """
+    try:
+        if isinstance(value, dict):
+            # JSON representation, cf. json_dynamic_values_to_msgpack
+            if "type" not in value:
+                return None
+            wire_type = unmarshal_type(value["type"])
+            return _compile_node(wire_type, True), value.get("value")
+        if len(value) != 2:
+            return None
+        serialized_type = value[0]
+        if isinstance(serialized_type, str):
+            serialized_type = serialized_type.encode("utf-8")
+        elif not isinstance(serialized_type, bytes):
+            return None
+        wire_type = deserialize_type(serialized_type)
+    except ValueError:  # includes JSON decoding errors
+        return None
+    return _compile_node(wire_type, True), value[1]
+
+
+@lru_cache(maxsize=1024)
+def wire_type_validator(
+    wire_type: AttributeWireType[Any],
+) -> WireTypeValidator:
+    """
+    Get the compiled validator for a wire type.
+    """
+    return WireTypeValidator(wire_type)
+
+
+def find_wire_type_mismatches(
+    value: ImmutableMsgPackish,
+    wire_type: AttributeWireType[Any],
+    path: AttributePath = ROOT,
+) -> list[WireTypeMismatch]:
+    """
+    Find all parts of a marshaled value not matching its wire type.
+    """
+    return wire_type_validator(wire_type).find_mismatches(value, path)
@@ -0,0 +1,218 @@
+"""
+Decoding of many values of the same `@attributes_class` class at once.
+
+Batches are unmarshaled attribute by attribute ("column by column") instead
+of value by value, reusing the class's compiled codec: per-attribute work
+like looking up unmarshalers or checking whether values can be passed
+through unchanged happens once per batch rather than once per value, and
+columns of values that pass through aren't unmarshaled one by one at all.
+"""
+from collections.abc import Iterable, Iterator, Sequence
+from functools import cache
+from operator import itemgetter
+from typing import Any, Callable, Generic, TypeVar
+
+from tfplugin_proto import tfplugin6_4_pb2 as pb
+
+from ..level2.dynamic_value import deserialize_json, deserialize_msgpack
+from ..level2.wire_format import Buffer, ImmutableMsgPackish, ext_to_unknown
+from ..level2.wire_marshaling import _passes_through
+from .statically_typed_schema import attributes_class_codec
+
+T = TypeVar("T")
+
+_DICT_TYPES = frozenset({dict})
+
+
+class AttributesClassColumns(Generic[T]):
+    """
+    Struct-of-arrays view of many instances of an attributes class.
+
+    Holds one list of values per attribute, all of the same length, with the
+    values of the i-th instance at index i of each. Bulk operations like
+    comparing states against a backend's listing can work on whole columns
+    this way, without creating instances or accessing their attributes one
+    by one.
+    """
+
+    def __init__(self, klass: type[T], columns: dict[str, list[Any]]):
+        self.klass = klass
+        self.columns = columns
+        "Lists of values by attribute name, in declaration order."
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()), ()))
+
+    def __getitem__(self, name: str) -> list[Any]:
+        return self.columns[name]
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self.rows())
+
+    def row(self, i: int) -> T:
+        """
+        Create the instance at index `i`.
+        """
+        codec = attributes_class_codec(self.klass)
+        return codec._create_instance(
+            {name: column[i] for name, column in self.columns.items()}
+        )
+
+    def rows(self) -> list[T]:
+        """
+        Create all instances.
+        """
+        create_instance = attributes_class_codec(self.klass)._create_instance
+        names = tuple(self.columns)
+        return [
+            create_instance(dict(zip(names, values)))
+            for values in zip(*self.columns.values())
+        ]
+
+
+class AttributesClassBatchDecoder(Generic[T]):
+    """
+    Decoder of batches of values of an `@attributes_class` class.
+
+    Use `attributes_class_batch_decoder` to obtain the (cached) decoder for a
+    class instead of instantiating this directly.
+    """
+
+    def __init__(self, klass: type[T]):
+        self.klass = klass
+        codec = attributes_class_codec(klass)
+        self._plan: tuple[
+            tuple[
+                str,
+                Callable[[Any], Any],
+                Callable[[ImmutableMsgPackish], Any],
+                frozenset[type],
+            ],
+            ...,
+        ] = tuple(
+            (
+                name,
+                itemgetter(name),
+                unmarshal,
+                codec._passthrough_types[name],
+            )
+            for name, unmarshal in codec.unmarshalers.items()
+        )
+
+    def unmarshal_columns(
+        self, marshaled_values: Sequence[ImmutableMsgPackish]
+    ) -> AttributesClassColumns[T]:
+        """
+        Unmarshal already-deserialized msgpack (or JSON) values into columns.
+        """
+        if not _passes_through(marshaled_values, _DICT_TYPES):
+            for i, value in enumerate(marshaled_values):
+                if not isinstance(value, dict):
+                    raise TypeError(
+                        f"Expected dict at index {i} but got "
+                        f"{type(value).__name__} {value!r}"
+                    )
+        columns = {}
+        for name, get, unmarshal, passthrough_types in self._plan:
+            try:
+                column = list(map(get, marshaled_values))
+                if not _passes_through(column, passthrough_types):
+                    column = list(map(unmarshal, column))
+            except Exception as e:
+                raise ValueError(
+                    f"error unmarshaling attribute {name!r} at index "
+                    f"{_failing_index(marshaled_values, get, unmarshal)}"
+                ) from e
+            columns[name] = column
+        return AttributesClassColumns(self.klass, columns)
+
+    def unmarshal(
+        self, marshaled_values: Sequence[ImmutableMsgPackish]
+    ) -> list[T]:
+        """
+        Unmarshal already-deserialized msgpack (or JSON) values.
+        """
+        return self.unmarshal_columns(marshaled_values).rows()
+
+    def decode_msgpack_columns(
+        self, payloads: Iterable[Buffer]
+    ) -> AttributesClassColumns[T]:
+        """
+        Deserialize and unmarshal msgpack data into columns.
+        """
+        return self.unmarshal_columns(
+            [deserialize_msgpack(b, ext_hook=ext_to_unknown) for b in payloads]
+        )
+
+    def decode_msgpack(self, payloads: Iterable[Buffer]) -> list[T]:
+        """
+        Deserialize and unmarshal msgpack data.
+        """
+        return self.decode_msgpack_columns(payloads).rows()
+
+    def decode_dynamic_value_columns(
+        self, values: Iterable[pb.DynamicValue]
+    ) -> AttributesClassColumns[T]:
+        """
+        Deserialize and unmarshal msgpack or JSON `DynamicValue`s into columns.
+        """
+        return self.unmarshal_columns(
+            [_deserialize_dynamic_value(value) for value in values]
+        )
+
+    def decode_dynamic_values(
+        self, values: Iterable[pb.DynamicValue]
+    ) -> list[T]:
+        """
+        Deserialize and unmarshal msgpack or JSON `DynamicValue`s.
+        """
+        return self.decode_dynamic_value_columns(values).rows()
+
+
+def _failing_index(
+    marshaled_values: Sequence[Any],
+    get: Callable[[Any], Any],
+    unmarshal: Callable[[Any], Any],
+) -> int | None:
+    # only used for error messages, so it's fine to redo the work here
+    for i, value in enumerate(marshaled_values):
+        try:
+            unmarshal(get(value))
+        except Exception:
+            return i
+    return None
+
+
+def _deserialize_dynamic_value(value: pb.DynamicValue) -> ImmutableMsgPackish:
+    # N.B. accessing a protobuf bytes field copies it => only do it once
+    if b := value.msgpack:
+        return deserialize_msgpack(b, ext_hook=ext_to_unknown)
+    elif b := value.json:
+        return deserialize_json(b)
+    raise ValueError(
+        "can't deserialize DynamicValue which is neither msgpack nor JSON"
+    )
+
+
+@cache
+def _attributes_class_batch_decoder(
+    klass: type,
+) -> AttributesClassBatchDecoder[Any]:
+    return AttributesClassBatchDecoder(klass)
+
+
+def attributes_class_batch_decoder(
+    klass: type[T],
+) -> AttributesClassBatchDecoder[T]:
+    """
+    Get the (cached) batch decoder for an `@attributes_class` class.
+    """
+    # type checkers don't consider type[T] hashable, but plain type is
+    hashable_klass: type = klass
+    return _attributes_class_batch_decoder(hashable_klass)
+
+
+def decode_dynamic_values_into_attribute_class_instances(
+    values: Iterable[pb.DynamicValue], klass: type[T]
+) -> list[T]:
+    return attributes_class_batch_decoder(klass).decode_dynamic_values(values)
@@ -0,0 +1,268 @@
+"""
+Structural diffs between values of `@attributes_class` classes.
+
+Diffs are computed using the wire types of the class's attributes, descending
+into lists, maps and objects to find the most specific paths at which two
+values differ. Subtrees that are identical or compare equal are skipped
+without being traversed any further, so diffing mostly-unchanged values
+costs little more than comparing them.
+"""
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import is_dataclass
+from functools import cache, lru_cache, partial
+from typing import Any, Generic, TypeAlias, TypeVar
+
+from ..level2.attribute_path import ROOT, AttributePath
+from ..level2.wire_format import (
+    AttributeWireType,
+    ListWireType,
+    MapWireType,
+    MaybeUnknownWireType,
+    ObjectWireType,
+    OptionalWireType,
+)
+from .statically_typed_schema import _tuple_attrgetter, attributes_class_codec
+
+T = TypeVar("T")
+
+ValueDiffer: TypeAlias = Callable[
+    [Any, Any, AttributePath, list[AttributePath]], None
+]
+"""
+Function appending the paths at which two *unequal* values differ to a list.
+
+The paths are relative to the path passed in, which is where the values are
+located.
+"""
+
+_MISSING = object()
+
+
+def _diff_leaf(
+    old: Any, new: Any, path: AttributePath, changed: list[AttributePath]
+) -> None:
+    changed.append(path)
+
+
+@lru_cache(maxsize=1024)
+def compile_value_differ(wire_type: AttributeWireType[Any]) -> ValueDiffer:
+    """
+    Build (or get the cached) function that diffs values of the wire type.
+
+    Works for both marshaled (msgpack-like) values and their representations
+    in attributes class instances, as long as lists are represented as
+    sequences and maps as mappings. Sets are compared as a whole, as their
+    elements have no paths of their own, as are mismatching values (e.g. a
+    list vs. null or unknown).
+    """
+    while isinstance(wire_type, (OptionalWireType, MaybeUnknownWireType)):
+        wire_type = wire_type.inner_attribute_type
+    match wire_type:
+        case ListWireType(inner_attribute_type=inner):
+            diff_element = compile_value_differ(inner)
+
+            def diff_list(
+                old: Any,
+                new: Any,
+                path: AttributePath,
+                changed: list[AttributePath],
+            ) -> None:
+                if (
+                    not isinstance(old, Sequence)
+                    or not isinstance(new, Sequence)
+                    or isinstance(old, str)
+                    or isinstance(new, str)
+                    or len(old) != len(new)
+                ):
+                    changed.append(path)
+                    return
+                for i, (old_element, new_element) in enumerate(zip(old, new)):
+                    if old_element is not new_element and (
+                        old_element != new_element
+                    ):
+                        diff_element(
+                            old_element,
+                            new_element,
+                            path.element_key(i),
+                            changed,
+                        )
+
+            return diff_list
+        case MapWireType(inner_attribute_type=inner):
+            diff_element = compile_value_differ(inner)
+
+            def diff_map(
+                old: Any,
+                new: Any,
+                path: AttributePath,
+                changed: list[AttributePath],
+            ) -> None:
+                if not isinstance(old, Mapping) or not isinstance(
+                    new, Mapping
+                ):
+                    changed.append(path)
+                    return
+                for key, old_element in old.items():
+                    new_element = new.get(key, _MISSING)
+                    if new_element is _MISSING:
+                        changed.append(path.element_key(key))
+                    elif old_element is not new_element and (
+                        old_element != new_element
+                    ):
+                        diff_element(
+                            old_element,
+                            new_element,
+                            path.element_key(key),
+                            changed,
+                        )
+                for key in new:
+                    if key not in old:
+                        changed.append(path.element_key(key))
+
+            return diff_map
+        case ObjectWireType(attribute_types=attribute_types):
+            attribute_differs = [
+                (name, compile_value_differ(attribute_type))
+                for name, attribute_type in attribute_types.items()
+            ]
+
+            def diff_object(
+                old: Any,
+                new: Any,
+                path: AttributePath,
+                changed: list[AttributePath],
+            ) -> None:
+                # marshaled objects are dicts, unmarshaled ones usually
+                # attributes class instances
+                if isinstance(old, Mapping) and isinstance(new, Mapping):
+                    get_old, get_new = old.get, new.get
+                elif type(old) is type(new) and is_dataclass(old):
+                    get_old = partial(getattr, old)
+                    get_new = partial(getattr, new)
+                else:
+                    changed.append(path)
+                    return
+                for name, diff_attribute in attribute_differs:
+                    old_value, new_value = get_old(name), get_new(name)
+                    if old_value is not new_value and old_value != new_value:
+                        diff_attribute(
+                            old_value,
+                            new_value,
+                            path.attribute_name(name),
+                            changed,
+                        )
+
+            return diff_object
+        case _:
+            return _diff_leaf
+
+
+def diff_values(
+    old: Any,
+    new: Any,
+    wire_type: AttributeWireType[Any],
+    path: AttributePath = ROOT,
+) -> list[AttributePath]:
+    """
+    Diff two values of the given wire type located at `path`.
+    """
+    changed: list[AttributePath] = []
+    if old is not new and old != new:
+        compile_value_differ(wire_type)(old, new, path, changed)
+    return changed
+
+
+class AttributesClassDiffer(Generic[T]):
+    """
+    Compiled diffing plan for an `@attributes_class` class.
+
+    Use `attributes_class_differ` to obtain the (cached) differ for a class
+    instead of instantiating this directly.
+    """
+
+    def __init__(self, klass: type[T]):
+        self.klass = klass
+        wire_types = attributes_class_codec(klass).attribute_wire_types
+        self._names = tuple(wire_types)
+        self._paths = tuple(ROOT.attribute_name(name) for name in self._names)
+        self._differs = tuple(
+            compile_value_differ(wire_type)
+            for wire_type in wire_types.values()
+        )
+        self._get_attribute_values = _tuple_attrgetter(self._names)
+
+    def diff(self, old: T | None, new: T | None) -> list[AttributePath]:
+        """
+        Diff two instances, returning the paths at which they differ.
+
+        If exactly one of them is `None`, the result is `[ROOT]`.
+        """
+        if old is new:
+            return []
+        if old is None or new is None:
+            return [ROOT]
+        return self._diff_attribute_values(
+            self._get_attribute_values(old), self._get_attribute_values(new)
+        )
+
+    def diff_marshaled(
+        self,
+        old: Mapping[str, Any] | None,
+        new: Mapping[str, Any] | None,
+    ) -> list[AttributePath]:
+        """
+        Like `diff`, but for marshaled (e.g. deserialized msgpack) values.
+
+        Missing attributes are treated like null ones.
+        """
+        if old is new:
+            return []
+        if old is None or new is None:
+            return [ROOT]
+        return self._diff_attribute_values(
+            tuple(old.get(name) for name in self._names),
+            tuple(new.get(name) for name in self._names),
+        )
+
+    def _diff_attribute_values(
+        self, old_values: tuple[Any, ...], new_values: tuple[Any, ...]
+    ) -> list[AttributePath]:
+        changed: list[AttributePath] = []
+        if old_values == new_values:
+            return changed
+        for path, differ, old_value, new_value in zip(
+            self._paths, self._differs, old_values, new_values
+        ):
+            if old_value is not new_value and old_value != new_value:
+                differ(old_value, new_value, path, changed)
+        return changed
+
+
+@cache
+def _attributes_class_differ(klass: type) -> AttributesClassDiffer[Any]:
+    return AttributesClassDiffer(klass)
+
+
+def attributes_class_differ(klass: type[T]) -> AttributesClassDiffer[T]:
+    """
+    Get the compiled differ for an `@attributes_class`-decorated class.
+    """
+    # type checkers don't consider type[T] hashable, but plain type is
+    hashable_klass: type = klass
+    return _attributes_class_differ(hashable_klass)
+
+
+def diff_attributes_class_instances(
+    old: T | None, new: T | None, klass: type[T] | None = None
+) -> list[AttributePath]:
+    """
+    Return the paths at which two instances of an attributes class differ.
+
+    `klass` only has to be given if both instances could be `None`.
+    """
+    if klass is None:
+        instance = old if old is not None else new
+        if instance is None:
+            return []
+        klass = type(instance)
+    return attributes_class_differ(klass).diff(old, new)
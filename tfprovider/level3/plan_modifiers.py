@@ -0,0 +1,128 @@
+"""
+Declarative plan modifiers for `@attributes_class` classes.
+
+Plan modifiers are declared per attribute via the corresponding arguments of
+`attribute` and applied to proposed new states before the resource's own
+planning logic (if any) gets to see them.
+"""
+from dataclasses import fields
+from functools import cache
+from typing import Any, Generic, TypeVar
+
+from ..level2.attribute_path import ROOT, AttributePath
+from ..level2.wire_format import Unknown
+from .statically_typed_schema import (
+    _tuple_attrgetter,
+    replace_attributes_class_instance,
+)
+
+T = TypeVar("T")
+
+
+class AttributesClassPlanModifiers(Generic[T]):
+    """
+    Compiled table of the plan modifiers of an `@attributes_class` class.
+
+    Use `attributes_class_plan_modifiers` to obtain the (cached) table for a
+    class instead of instantiating this directly.
+    """
+
+    def __init__(self, klass: type[T]):
+        self.klass = klass
+        requires_replace = []
+        use_state_for_unknown = []
+        # TODO see https://github.com/python/mypy/issues/14941
+        for attr_field in fields(klass):  # type: ignore
+            config = attr_field.metadata.get("tfprovider", {})
+            if config.get("requires_replace"):
+                requires_replace.append(attr_field.name)
+            if config.get("use_state_for_unknown"):
+                use_state_for_unknown.append(attr_field.name)
+        self.requires_replace_names = tuple(requires_replace)
+        self.use_state_for_unknown_names = tuple(use_state_for_unknown)
+        self._requires_replace_paths = tuple(
+            ROOT.attribute_name(name) for name in requires_replace
+        )
+        self._get_requires_replace_values = _tuple_attrgetter(
+            self.requires_replace_names
+        )
+        self._get_use_state_for_unknown_values = _tuple_attrgetter(
+            self.use_state_for_unknown_names
+        )
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.requires_replace_names or self.use_state_for_unknown_names
+        )
+
+    def apply(
+        self, prior_state: T | None, proposed_new_state: T | None
+    ) -> tuple[T | None, list[AttributePath]]:
+        """
+        Apply the plan modifiers to a proposed new state.
+
+        Returns the modified state and the paths of attributes requiring the
+        resource to be replaced. Creating or destroying resources is never
+        modified.
+        """
+        if prior_state is None or proposed_new_state is None:
+            return proposed_new_state, []
+        planned_state = proposed_new_state
+        if self.use_state_for_unknown_names:
+            kept_values = {
+                name: prior_value
+                for name, planned_value, prior_value in zip(
+                    self.use_state_for_unknown_names,
+                    self._get_use_state_for_unknown_values(planned_state),
+                    self._get_use_state_for_unknown_values(prior_state),
+                )
+                if isinstance(planned_value, Unknown)
+            }
+            if kept_values:
+                planned_state = replace_attributes_class_instance(
+                    planned_state, **kept_values
+                )
+        requires_replace = []
+        if self.requires_replace_names:
+            prior_values = self._get_requires_replace_values(prior_state)
+            planned_values = self._get_requires_replace_values(planned_state)
+            if prior_values != planned_values:
+                requires_replace = [
+                    path
+                    for path, prior_value, planned_value in zip(
+                        self._requires_replace_paths,
+                        prior_values,
+                        planned_values,
+                    )
+                    if prior_value != planned_value
+                ]
+        return planned_state, requires_replace
+
+
+@cache
+def _attributes_class_plan_modifiers(
+    klass: type,
+) -> AttributesClassPlanModifiers[Any]:
+    return AttributesClassPlanModifiers(klass)
+
+
+def attributes_class_plan_modifiers(
+    klass: type[T],
+) -> AttributesClassPlanModifiers[T]:
+    """
+    Get the compiled plan modifier table of an `@attributes_class` class.
+    """
+    # type checkers don't consider type[T] hashable, but plain type is
+    hashable_klass: type = klass
+    return _attributes_class_plan_modifiers(hashable_klass)
+
+
+def apply_plan_modifiers(
+    klass: type[T], prior_state: T | None, proposed_new_state: T | None
+) -> tuple[T | None, list[AttributePath]]:
+    """
+    Apply the plan modifiers declared on `klass` to a proposed new state.
+    """
+    return attributes_class_plan_modifiers(klass).apply(
+        prior_state, proposed_new_state
+    )
@@ -2,44 +2,85 @@
 Helpers for working with schemas that can be statically type checked.
 """
 
-import json
-from collections.abc import Callable
-from dataclasses import Field, dataclass, field, fields
+from collections import abc
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import Field, dataclass, field, fields, is_dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from functools import cache
 from inspect import get_annotations
-from typing import Any, TypeVar, Union, cast, dataclass_transform
+from operator import attrgetter
+from types import MemberDescriptorType, UnionType
+from typing import (
+    Any,
+    BinaryIO,
+    Generic,
+    TypeVar,
+    Union,
+    cast,
+    dataclass_transform,
+    get_args,
+    get_origin,
+)
 
 from tfplugin_proto import tfplugin6_4_pb2 as pb
 
+from ..level2.attribute_path import ROOT, AttributePath
+from ..level2.diagnostics import Diagnostics
 from ..level2.dynamic_value import (
-    deserialize_dynamic_value,
+    deserialize_json,
+    deserialize_msgpack,
+    deserialize_msgpack_stream,
+    pack_msgpack,
     serialize_to_dynamic_value,
+    transcode_json_object_to_msgpack,
 )
+from ..level2.flatmap import unflatten_flatmap
 from ..level2.usable_schema import (
     NOT_SET,
     Attribute,
+    Block,
+    NestedBlock,
+    NestedObject,
+    NestingMode,
     NotSet,
     ProviderSchema,
     StringKind,
 )
 from ..level2.wire_format import (
     AttributeWireType,
+    Buffer,
+    Dynamic,
     ImmutableMsgPackish,
-    OptionalWireType,
-    SetWireType,
-    StringWireType,
+    ObjectWireType,
     Unknown,
+    ext_to_unknown,
 )
 from ..level2.wire_marshaling import (
+    DEFAULT_MAX_NESTING_DEPTH,
     AttributeWireTypeMarshaler,
     AttributeWireTypeUnmarshaler,
+    DynamicWireTypeMarshaler,
+    DynamicWireTypeUnmarshaler,
+    NumberWireTypeUnmarshaler,
 )
 from ..level2.wire_representation import (
+    BoolWireRepresentation,
+    DateAsStringWireRepresentation,
+    DateTimeAsStringWireRepresentation,
+    DynamicWireRepresentation,
+    ListWireRepresentation,
+    MapWireRepresentation,
     MaybeUnknownWireRepresentation,
+    NumberWireRepresentation,
     OptionalWireRepresentation,
     SetWireRepresentation,
     StringWireRepresentation,
+    TupleWireRepresentation,
     WireRepresentation,
 )
+from ..level2.wire_validation import WireTypeMismatch, wire_type_validator
+from .validators import Validator
 
 T = TypeVar("T")
 M = TypeVar("M", bound=ImmutableMsgPackish)
@@ -64,6 +105,16 @@ def attribute(
     | None = None,
     unmarshaler: AttributeWireTypeUnmarshaler[AttributeWireType[M], T]
     | None = None,
+    # nesting
+    block: bool = False,
+    nested_attributes: bool = False,
+    min_items: int | NotSet = NOT_SET,
+    max_items: int | NotSet = NOT_SET,
+    # validation
+    validators: Sequence[Validator] = (),
+    # plan modifiers
+    requires_replace: bool = False,
+    use_state_for_unknown: bool = False,
     # dataclasses
     **kwargs: Any,
 ) -> Any:
@@ -71,6 +122,23 @@ def attribute(
     Customize a Terraform schema attribute.
 
     Analogue of `dataclasses.field`.
+
+    Attributes annotated with another `@attributes_class` class (or a list,
+    set or `dict[str, ...]` of one) have Terraform object types by default.
+    Classes used in sets have to be hashable, i.e. frozen and without list,
+    set or map attributes.
+    With `block=True`, they're instead declared as nested blocks, with
+    `nested_attributes=True` as nested attributes. Both take `min_items` and
+    `max_items` into account.
+
+    `validators` are run on the attribute's value whenever Terraform asks to
+    validate a config (cf. `validators` module).
+
+    The plan modifiers are applied automatically when planning resource
+    changes (cf. `plan_modifiers` module): `requires_replace` makes changes
+    to the attribute force the resource to be replaced, `use_state_for_unknown`
+    keeps the attribute's prior state value when its planned value would
+    otherwise be unknown.
     """
     return field(
         *args,
@@ -89,6 +157,13 @@ def attribute(
                 "wire_type": wire_type,
                 "marshaler": marshaler,
                 "unmarshaler": unmarshaler,
+                "block": block,
+                "nested_attributes": nested_attributes,
+                "min_items": min_items,
+                "max_items": max_items,
+                "validators": tuple(validators),
+                "requires_replace": requires_replace,
+                "use_state_for_unknown": use_state_for_unknown,
             },
         },
         **kwargs,
@@ -97,66 +172,220 @@ def attribute(
 
 @dataclass_transform(field_specifiers=(attribute, Field))
 def attributes_class(
-    *args: Any, **kwargs: Any
+    *args: Any, frozen: bool = False, slots: bool = False, **kwargs: Any
 ) -> Callable[[type[T]], type[T]]:
     """
     Mark a class as representing a Terraform schema attribute list type.
 
     Transforms the class in much the same way as `dataclasses.dataclass` does,
-    generating an appropriate constructor.
+    generating an appropriate constructor. Any further arguments are passed
+    on to `dataclasses.dataclass`.
+
+    Instances of `frozen` classes can't be modified, so they can be shared
+    and cached safely; use `replace_attributes_class_instance` to get
+    modified copies. Instances of `slots` classes store their attributes in
+    slots instead of a `__dict__`, which takes up considerably less memory
+    when many of them are kept around. Both are fully supported by codecs.
 
     The specifics of how to map attribute types and values to Terraform's wire
     format can be customized using `attribute`.
     """
 
     def _schema(klass: type[T]) -> type[T]:
-        return cast(type[T], dataclass(*args, **kwargs)(klass))
+        return cast(
+            type[T],
+            dataclass(*args, frozen=frozen, slots=slots, **kwargs)(klass),
+        )
 
     return _schema
 
 
-ANNOTATION_TO_REPRESENTATION: dict[Any, WireRepresentation[Any, Any]] = {
+ANNOTATION_TO_REPRESENTATION: dict[Any, WireRepresentation[Any, Any]] = {}
+"""
+Explicitly registered representations for annotations.
+
+Takes precedence over the automatic resolution of annotations done by
+`representation_for_annotation`. Registrations have to happen before any
+classes using them are defined, as resolutions are cached.
+"""
+
+_LOSSY_NUMBER_REPRESENTATION = NumberWireRepresentation(
+    unmarshaler=NumberWireTypeUnmarshaler(lossy=True)
+)
+
+_PRIMITIVE_REPRESENTATIONS: dict[Any, WireRepresentation[Any, Any]] = {
     str: StringWireRepresentation(),
-    # TODO make this happen automatically
-    (str | None): OptionalWireRepresentation(StringWireRepresentation()),
-    (str | Unknown): MaybeUnknownWireRepresentation(
-        StringWireRepresentation()
-    ),
-    (str | None | Unknown): MaybeUnknownWireRepresentation(
-        OptionalWireRepresentation(StringWireRepresentation())
-    ),
-    set[str]: SetWireRepresentation(StringWireRepresentation()),
-    (set[str] | None): OptionalWireRepresentation(
-        SetWireRepresentation(StringWireRepresentation())
-    ),
-    (set[str] | None | Unknown): MaybeUnknownWireRepresentation(
-        OptionalWireRepresentation(
-            SetWireRepresentation(StringWireRepresentation())
-        )
-    ),
-    (set[str | Unknown] | None): OptionalWireRepresentation(
-        SetWireRepresentation(
-            MaybeUnknownWireRepresentation(StringWireRepresentation())
-        )
-    ),
+    bool: BoolWireRepresentation(),
+    int: NumberWireRepresentation(),
+    Decimal: NumberWireRepresentation(),
+    (int | Decimal): NumberWireRepresentation(),
+    # floats are the explicit opt-in to losing precision
+    float: _LOSSY_NUMBER_REPRESENTATION,
+    (int | float): _LOSSY_NUMBER_REPRESENTATION,
+    datetime: DateTimeAsStringWireRepresentation(),
+    date: DateAsStringWireRepresentation(),
 }
 
-ANNOTATION_TO_WIRE_TYPE: dict[Any, AttributeWireType[Any]] = {
-    str: StringWireType(),
-    # TODO make this happen automatically
-    (str | None): StringWireType(),
-    (str | Unknown): StringWireType(),
-    (str | None | Unknown): StringWireType(),
-    set[str]: SetWireType(StringWireType()),
-    (set[str] | None): OptionalWireType(SetWireType(StringWireType())),
-    (set[str] | None | Unknown): OptionalWireType(
-        SetWireType(StringWireType())
-    ),
-    (set[str | Unknown] | None): OptionalWireType(
-        SetWireType(StringWireType())
-    ),
+_NUMBER_UNIONS = {
+    frozenset({int, float}): int | float,
+    frozenset({int, Decimal}): int | Decimal,
 }
 
+_LIST_ORIGINS = {list, Sequence, abc.MutableSequence}
+_SET_ORIGINS = {set, frozenset, abc.Set, abc.MutableSet}
+_MAP_ORIGINS = {dict, Mapping, abc.MutableMapping}
+
+
+@cache
+def representation_for_annotation(
+    annotation: Any,
+    max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH,
+) -> WireRepresentation[Any, Any] | None:
+    """
+    Determine the representation to use for an attribute's type annotation.
+
+    Handles primitive types, lists, sets and maps of representable types as
+    well as unions of a representable type with `None` and/or `Unknown`.
+    Returns `None` for annotations that can't be represented automatically.
+
+    Values of the dynamic pseudo-type nested more than `max_nesting_depth`
+    levels deep are rejected when (un)marshaling them.
+    """
+    if (explicit := ANNOTATION_TO_REPRESENTATION.get(annotation)) is not None:
+        return explicit
+    if (primitive := _PRIMITIVE_REPRESENTATIONS.get(annotation)) is not None:
+        return primitive
+    if annotation is Dynamic:
+        return DynamicWireRepresentation(
+            unmarshaler=DynamicWireTypeUnmarshaler(max_nesting_depth),
+            marshaler=DynamicWireTypeMarshaler(max_nesting_depth),
+        )
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin in (Union, UnionType):
+        members = set(args)
+        nullable = type(None) in members
+        maybe_unknown = any(
+            isinstance(m, type) and issubclass(m, Unknown) for m in members
+        )
+        rest = [
+            m
+            for m in members
+            if m is not type(None)
+            and not (isinstance(m, type) and issubclass(m, Unknown))
+        ]
+        if len(rest) == 1:
+            representation = representation_for_annotation(
+                rest[0], max_nesting_depth
+            )
+        elif (numbers := frozenset(rest)) in _NUMBER_UNIONS:
+            representation = _PRIMITIVE_REPRESENTATIONS[
+                _NUMBER_UNIONS[numbers]
+            ]
+        else:
+            return None
+        if representation is None:
+            return None
+        if nullable:
+            representation = OptionalWireRepresentation(representation)
+        if maybe_unknown:
+            representation = MaybeUnknownWireRepresentation(representation)
+        return representation
+    if len(args) == 1 and origin in _LIST_ORIGINS | _SET_ORIGINS:
+        if origin in _SET_ORIGINS:
+            _check_set_element_annotation(args[0])
+        if (
+            inner := representation_for_annotation(args[0], max_nesting_depth)
+        ) is None:
+            return None
+        if origin in _LIST_ORIGINS:
+            return ListWireRepresentation(inner)
+        return SetWireRepresentation(inner)
+    if origin is tuple and args and Ellipsis not in args:
+        inners = [
+            representation_for_annotation(arg, max_nesting_depth)
+            for arg in args
+        ]
+        if any(inner is None for inner in inners):
+            return None
+        return TupleWireRepresentation(cast(list[Any], inners))
+    if isinstance(annotation, type) and is_dataclass(annotation):
+        return AttributesClassWireRepresentation(annotation, max_nesting_depth)
+    if len(args) == 2 and origin in _MAP_ORIGINS and args[0] is str:
+        if (
+            inner := representation_for_annotation(args[1], max_nesting_depth)
+        ) is None:
+            return None
+        return MapWireRepresentation(inner)
+    return None
+
+
+def _is_hashable_annotation(annotation: Any) -> bool:
+    origin = get_origin(annotation)
+    if origin in (Union, UnionType) or origin is tuple:
+        return all(
+            _is_hashable_annotation(arg)
+            for arg in get_args(annotation)
+            if arg is not Ellipsis
+        )
+    if origin in _LIST_ORIGINS | _SET_ORIGINS | _MAP_ORIGINS:
+        return False
+    if isinstance(annotation, type) and is_dataclass(annotation):
+        return annotation.__hash__ is not None and all(
+            map(_is_hashable_annotation, get_annotations(annotation).values())
+        )
+    return getattr(annotation, "__hash__", None) is not None
+
+
+def _check_set_element_annotation(annotation: Any) -> None:
+    # sets of e.g. non-frozen attributes classes could be declared just fine
+    # but would fail as soon as a value is unmarshaled
+    if not _is_hashable_annotation(annotation):
+        raise TypeError(
+            f"elements of sets must be hashable, but {annotation!r} isn't; "
+            "use a frozen attributes class without list, set or map "
+            "attributes, or a list instead of a set"
+        )
+
+
+def _strip_optional(annotation: Any) -> Any:
+    if get_origin(annotation) in (Union, UnionType):
+        rest = [
+            m
+            for m in get_args(annotation)
+            if m is not type(None)
+            and not (isinstance(m, type) and issubclass(m, Unknown))
+        ]
+        if len(rest) == 1:
+            return rest[0]
+    return annotation
+
+
+def _nesting_for_annotation(annotation: Any) -> tuple[NestingMode, type]:
+    """
+    Determine nesting mode and nested class from a nested attribute's type.
+    """
+    annotation = _strip_optional(annotation)
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if isinstance(annotation, type) and is_dataclass(annotation):
+        return NestingMode.SINGLE, annotation
+    if len(args) == 1 and origin in _LIST_ORIGINS:
+        nesting, nested = NestingMode.LIST, _strip_optional(args[0])
+    elif len(args) == 1 and origin in _SET_ORIGINS:
+        _check_set_element_annotation(args[0])
+        nesting, nested = NestingMode.SET, _strip_optional(args[0])
+    elif len(args) == 2 and origin in _MAP_ORIGINS:
+        nesting, nested = NestingMode.MAP, _strip_optional(args[1])
+    else:
+        nested = None
+    if not (isinstance(nested, type) and is_dataclass(nested)):
+        raise TypeError(
+            f"can't nest {annotation!r}, only attributes classes and lists, "
+            "sets and maps of them"
+        )
+    return nesting, nested
+
 
 def attributes_class_to_usable(klass: type) -> list[Attribute[Any]]:
     """
@@ -167,28 +396,80 @@ def attributes_class_to_usable(klass: type) -> list[Attribute[Any]]:
     represented as `WireType` instances in the former and serialized `bytes` in
     the latter.
 
+    Attributes declared as nested blocks are not included, cf.
+    `attributes_class_to_usable_block_types`.
+
     You don't normally have to use this function unless you're trying to do
     something strange. `attributes_class_to_protobuf` is the one you'll
     usually want, to go directly to Terraform's representation.
     """
+    wire_types = attributes_class_codec(klass).attribute_wire_types
     annotations = get_annotations(klass)
-    return [
-        Attribute(
-            name=f.name,
-            type=(
-                wt
-                if (
-                    wt := f.metadata["tfprovider"].get("wire_type") is not None
-                )
-                else rep.attribute_wire_type
-                if (rep := f.metadata["tfprovider"].get("representation"))
-                is not None
-                else ANNOTATION_TO_WIRE_TYPE[annotations[f.name]]
-            ),
-            **f.metadata["terraform"],
+    attributes: list[Attribute[Any]] = []
+    for f in fields(klass):
+        config = f.metadata.get("tfprovider", {})
+        if config.get("block"):
+            continue
+        nested_type: NestedObject | NotSet = NOT_SET
+        if config.get("nested_attributes"):
+            nesting, nested = _nesting_for_annotation(annotations[f.name])
+            nested_type = NestedObject(
+                attributes=attributes_class_to_usable(nested),
+                nesting=nesting,
+            )
+        attributes.append(
+            Attribute(
+                name=f.name,
+                type=wire_types[f.name],
+                nested_type=nested_type,
+                **f.metadata.get("terraform", {}),
+            )
         )
-        for f in fields(klass)
-    ]
+    return attributes
+
+
+def attributes_class_to_usable_block_types(klass: type) -> list[NestedBlock]:
+    """
+    Transform the nested blocks of an `@attribute_class`-decorated class.
+    """
+    annotations = get_annotations(klass)
+    block_types = []
+    for f in fields(klass):
+        config = f.metadata.get("tfprovider", {})
+        if not config.get("block"):
+            continue
+        nesting, nested = _nesting_for_annotation(annotations[f.name])
+        terraform_config = f.metadata.get("terraform", {})
+        block_types.append(
+            NestedBlock(
+                type_name=f.name,
+                block=attributes_class_to_usable_block(
+                    nested,
+                    description=terraform_config.get("description", NOT_SET),
+                    description_kind=terraform_config.get(
+                        "description_kind", NOT_SET
+                    ),
+                    deprecated=terraform_config.get("deprecated", NOT_SET),
+                ),
+                nesting=nesting,
+                min_items=config.get("min_items", NOT_SET),
+                max_items=config.get("max_items", NOT_SET),
+            )
+        )
+    return block_types
+
+
+def attributes_class_to_usable_block(klass: type, **kwargs: Any) -> Block:
+    """
+    Transform an `@attribute_class`-decorated class to a usable schema block.
+
+    Keyword arguments are passed on to `Block`.
+    """
+    return Block(
+        attributes=attributes_class_to_usable(klass),
+        block_types=attributes_class_to_usable_block_types(klass),
+        **kwargs,
+    )
 
 
 def attributes_class_to_protobuf(klass: type) -> list[pb.Schema.Attribute]:
@@ -198,120 +479,639 @@ def attributes_class_to_protobuf(klass: type) -> list[pb.Schema.Attribute]:
     return [a.to_protobuf() for a in attributes_class_to_usable(klass)]
 
 
+def _tuple_attrgetter(
+    names: tuple[str, ...]
+) -> Callable[[Any], tuple[Any, ...]]:
+    # unlike a plain attrgetter, always returns a tuple
+    if len(names) == 0:
+        return lambda instance: ()
+    if len(names) == 1:
+        getter = attrgetter(names[0])
+        return lambda instance: (getter(instance),)
+    return attrgetter(*names)
+
+
+def _instance_factory(
+    klass: type[T], names: tuple[str, ...]
+) -> Callable[[dict[str, Any]], T]:
+    """
+    Get a function creating instances from their attribute values.
+
+    The values have to be passed in a dict with keys in the order of `names`.
+    Where possible, instances are created without calling `__init__` at all,
+    storing attributes directly in the instance's `__dict__` or (for frozen
+    classes) slots. This also bypasses the overhead of setting attributes of
+    frozen classes. It isn't possible if the class defines `__post_init__` or
+    its own `__init__`, which have to be run.
+    """
+    params = getattr(klass, "__dataclass_params__", None)
+    if (
+        params is None
+        or not params.init
+        or hasattr(klass, "__post_init__")
+        or any(not f.init for f in fields(klass))  # type: ignore[arg-type]
+    ):
+        return lambda attributes: klass(**attributes)
+    new = object.__new__
+    slots = [_slot_descriptor(klass, name) for name in names]
+    # setting slots one by one is only faster than __init__ if the latter has
+    # to go through object.__setattr__ because the class is frozen
+    if params.frozen and all(slot is not None for slot in slots):
+        setters = tuple(slot.__set__ for slot in slots)  # type: ignore
+
+        def create_with_slots(attributes: dict[str, Any]) -> T:
+            instance = new(klass)
+            for set_value, value in zip(setters, attributes.values()):
+                set_value(instance, value)
+            return cast(T, instance)
+
+        return create_with_slots
+    if any(slot is not None for slot in slots) or not any(
+        "__dict__" in base.__dict__ for base in klass.__mro__
+    ):
+        return lambda attributes: klass(**attributes)
+
+    def create_with_dict(attributes: dict[str, Any]) -> T:
+        instance = new(klass)
+        instance.__dict__.update(attributes)
+        return cast(T, instance)
+
+    return create_with_dict
+
+
+def _slot_descriptor(klass: type, name: str) -> MemberDescriptorType | None:
+    for base in klass.__mro__:
+        if name in base.__dict__:
+            attr = base.__dict__[name]
+            return attr if isinstance(attr, MemberDescriptorType) else None
+    return None
+
+
+def _unmarshal_func(
+    representation: WireRepresentation[Any, T]
+) -> Callable[[ImmutableMsgPackish], T]:
+    # skip the representation's delegating method (one Python call per
+    # attribute and value) unless a subclass customized it:
+    if (
+        type(representation).unmarshal_value_msgpack
+        is WireRepresentation.unmarshal_value_msgpack
+    ):
+        return representation.unmarshaler.unmarshal_msgpack
+    return representation.unmarshal_value_msgpack
+
+
+def _passthrough_types(
+    unmarshal: Callable[[ImmutableMsgPackish], Any]
+) -> frozenset[type]:
+    # only known for unmarshal funcs that are methods of an unmarshaler
+    unmarshaler = getattr(unmarshal, "__self__", None)
+    if isinstance(unmarshaler, AttributeWireTypeUnmarshaler):
+        return unmarshaler.passthrough_types
+    return frozenset()
+
+
+def _trusted_unmarshal_func(
+    unmarshal: Callable[[ImmutableMsgPackish], Any]
+) -> Callable[[ImmutableMsgPackish], Any] | None:
+    owner = getattr(unmarshal, "__self__", None)
+    if isinstance(owner, AttributeWireTypeUnmarshaler):
+        return owner.trusted_unmarshal_func()
+    if isinstance(owner, AttributesClassCodec):
+        return owner.unmarshal_trusted
+    # custom unmarshal funcs might do anything, so they're kept as they are
+    return unmarshal
+
+
+def _marshal_func(
+    representation: WireRepresentation[Any, T]
+) -> Callable[[T], ImmutableMsgPackish]:
+    if (
+        type(representation).marshal_value_msgpack
+        is WireRepresentation.marshal_value_msgpack
+    ):
+        return representation.marshaler.marshal_msgpack
+    return representation.marshal_value_msgpack
+
+
+class AttributesClassCodec(Generic[T]):
+    """
+    Compiled marshaling/unmarshaling plan for an `@attributes_class` class.
+
+    Resolving the representation of each attribute from its annotation and
+    metadata only happens once, when the codec is created. Use
+    `attributes_class_codec` to obtain the (cached) codec for a class instead
+    of instantiating this directly.
+
+    `max_nesting_depth` limits the nesting depth of values of the dynamic
+    pseudo-type (cf. `unmarshaler_for_wire_type`), including those in nested
+    attributes classes.
+    """
+
+    def __init__(
+        self,
+        klass: type[T],
+        max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH,
+    ):
+        self.klass = klass
+        self.max_nesting_depth = max_nesting_depth
+        annotations = get_annotations(klass)
+        unmarshalers: dict[str, Callable[[ImmutableMsgPackish], Any]] = {}
+        marshalers: dict[str, Callable[[Any], ImmutableMsgPackish]] = {}
+        wire_types: dict[str, AttributeWireType[Any]] = {}
+        # TODO see https://github.com/python/mypy/issues/14941 for why
+        #   dataclass+type[T] doesn't currently work => typing disabled:
+        for attr_field in fields(klass):  # type: ignore
+            name = attr_field.name
+            config = attr_field.metadata.get("tfprovider", {})
+            annotation = annotations.get(name)
+            # precedence: explicit representation > explicit (un)marshaler >
+            # representation derived from annotation
+            explicit_representation = config.get("representation")
+            representation = (
+                explicit_representation
+                or representation_for_annotation(annotation, max_nesting_depth)
+            )
+            if (wire_type := config.get("wire_type")) is not None:
+                wire_types[name] = wire_type
+            elif representation is not None:
+                wire_types[name] = representation.attribute_wire_type
+            if explicit_representation is not None:
+                unmarshalers[name] = _unmarshal_func(explicit_representation)
+                marshalers[name] = _marshal_func(explicit_representation)
+                continue
+            if (unmarshaler := config.get("unmarshaler")) is not None:
+                unmarshalers[name] = unmarshaler.unmarshal_msgpack
+                wire_types.setdefault(name, unmarshaler.attribute_wire_type)
+            if (marshaler := config.get("marshaler")) is not None:
+                marshalers[name] = marshaler.marshal_msgpack
+                wire_types.setdefault(name, marshaler.attribute_wire_type)
+            if representation is not None:
+                unmarshalers.setdefault(name, _unmarshal_func(representation))
+                marshalers.setdefault(name, _marshal_func(representation))
+            if name not in unmarshalers or name not in marshalers:
+                raise TypeError(
+                    f"don't know how to (un)marshal attribute {name!r} of "
+                    f"{klass.__name__} with annotation {annotation!r}; "
+                    "please specify a representation explicitly"
+                )
+            if name not in wire_types:
+                raise TypeError(
+                    f"don't know the wire type of attribute {name!r} of "
+                    f"{klass.__name__} with annotation {annotation!r}; "
+                    "please specify it explicitly"
+                )
+        self.unmarshalers = unmarshalers
+        self.marshalers = marshalers
+        self.attribute_wire_types = wire_types
+        # used to marshal attributes in a deterministic (= declaration) order
+        # without per-attribute dict lookups or getattr calls:
+        self._names = tuple(marshalers)
+        self._marshal_funcs = tuple(marshalers.values())
+        self._get_attribute_values = _tuple_attrgetter(self._names)
+        self._name_set = frozenset(self._names)
+        self._create_instance = _instance_factory(klass, self._names)
+        self._passthrough_types = {
+            name: _passthrough_types(unmarshal)
+            for name, unmarshal in unmarshalers.items()
+        }
+        self._trusted_unmarshal_funcs = tuple(
+            (name, _trusted_unmarshal_func(unmarshal))
+            for name, unmarshal in unmarshalers.items()
+        )
+        self._validator = wire_type_validator(ObjectWireType(wire_types))
+
+    def unmarshal(self, marshaled_dict: ImmutableMsgPackish) -> T:
+        """
+        Unmarshal an already-deserialized msgpack (or JSON) value.
+        """
+        if not isinstance(marshaled_dict, dict):
+            raise TypeError(
+                f"Expected dict but got {type(marshaled_dict).__name__} "
+                f"{marshaled_dict!r}"
+            )
+        constructor_kwargs = {}
+        for name, unmarshal in self.unmarshalers.items():
+            try:
+                constructor_kwargs[name] = unmarshal(marshaled_dict[name])
+            except Exception as e:
+                # TODO better exception type
+                raise ValueError(
+                    f"error unmarshaling attribute {name!r}"
+                ) from e
+        return self._create_instance(constructor_kwargs)
+
+    def validate_marshaled(
+        self, marshaled_dict: ImmutableMsgPackish, path: AttributePath = ROOT
+    ) -> list[WireTypeMismatch]:
+        """
+        Find all parts of a marshaled value not matching the attributes' types.
+
+        Cf. `level2.wire_validation`.
+        """
+        return self._validator.find_mismatches(marshaled_dict, path)
+
+    def unmarshal_trusted(self, marshaled_dict: Any) -> T:
+        """
+        Unmarshal a value known to match the attributes' wire types.
+
+        Meant for values that passed `validate_marshaled`, for which all of
+        `unmarshal`'s type checks are redundant and hence skipped, e.g. values
+        of `str | None` or `list[str]` attributes are used as-is.
+        """
+        return self._create_instance(
+            {
+                name: (
+                    marshaled_dict[name]
+                    if unmarshal is None
+                    else unmarshal(marshaled_dict[name])
+                )
+                for name, unmarshal in self._trusted_unmarshal_funcs
+            }
+        )
+
+    def unmarshal_checked(
+        self, marshaled_dict: ImmutableMsgPackish, diagnostics: Diagnostics
+    ) -> T | None:
+        """
+        Validate and unmarshal a value, reporting any mismatches as errors.
+
+        Returns `None` if there were mismatches.
+        """
+        if not self._validator.validate(marshaled_dict, diagnostics):
+            return None
+        return self.unmarshal_trusted(marshaled_dict)
+
+    def replace(self, instance: T, /, **changes: Any) -> T:
+        """
+        Create a copy of an instance with some attributes replaced.
+
+        Like `dataclasses.replace`, but cheaper, as the copy is created in the
+        same way as unmarshaled instances are. Works for frozen classes, too.
+        """
+        if not self._name_set.issuperset(changes):
+            unknown = ", ".join(sorted(set(changes) - self._name_set))
+            raise TypeError(
+                f"{self.klass.__name__} has no attributes named {unknown}"
+            )
+        attributes = dict(
+            zip(self._names, self._get_attribute_values(instance))
+        )
+        attributes.update(changes)
+        return self._create_instance(attributes)
+
+    def marshal(self, instance: T) -> ImmutableMsgPackish:
+        """
+        Marshal an instance to a msgpack-serializable value.
+        """
+        return dict(
+            zip(
+                self._names,
+                [
+                    marshal(value)
+                    for marshal, value in zip(
+                        self._marshal_funcs,
+                        self._get_attribute_values(instance),
+                    )
+                ],
+            )
+        )
+
+    def encode_msgpack(self, instance: T) -> bytes:
+        """
+        Marshal and serialize an instance to msgpack bytes.
+        """
+        return pack_msgpack(self.marshal(instance))
+
+    def decode_msgpack(self, b: Buffer) -> T:
+        """
+        Deserialize and unmarshal msgpack data.
+        """
+        return self.unmarshal(deserialize_msgpack(b, ext_hook=ext_to_unknown))
+
+    def decode_optional_msgpack(self, b: Buffer) -> T | None:
+        """
+        Like `decode_msgpack`, but allowing the serialized value to be null.
+        """
+        marshaled_value = deserialize_msgpack(b, ext_hook=ext_to_unknown)
+        if marshaled_value is None:
+            return None
+        return self.unmarshal(marshaled_value)
+
+    def decode_msgpack_stream(self, stream: BinaryIO) -> T | None:
+        """
+        Deserialize and unmarshal msgpack data read incrementally from stream.
+
+        Null values are returned as `None`.
+        """
+        marshaled_value = deserialize_msgpack_stream(
+            stream, ext_hook=ext_to_unknown
+        )
+        if marshaled_value is None:
+            return None
+        return self.unmarshal(marshaled_value)
+
+    def transcode_json_to_msgpack(self, b: Buffer) -> bytes:
+        """
+        Transcode a serialized JSON value of this class to msgpack.
+
+        The value is normalized to this class's attributes but never
+        unmarshaled into an instance.
+        """
+        return transcode_json_object_to_msgpack(
+            b, self._names, self.attribute_wire_types
+        )
+
+    def transcode_flatmap_to_msgpack(
+        self, flatmap: Mapping[str, str]
+    ) -> bytes:
+        """
+        Transcode a legacy flatmap value of this class to msgpack.
+        """
+        return pack_msgpack(
+            unflatten_flatmap(flatmap, self.attribute_wire_types)
+        )
+
+    def decode_flatmap(self, flatmap: Mapping[str, str]) -> T:
+        """
+        Unmarshal a legacy flatmap value (cf. `level2.flatmap`).
+        """
+        return self.unmarshal(
+            unflatten_flatmap(flatmap, self.attribute_wire_types)
+        )
+
+    def decode_json(self, b: Buffer) -> T:
+        """
+        Deserialize and unmarshal JSON data.
+        """
+        return self.unmarshal(deserialize_json(b))
+
+    def decode_optional_json(self, b: Buffer) -> T | None:
+        """
+        Like `decode_json`, but allowing the serialized value to be null.
+        """
+        marshaled_value = deserialize_json(b)
+        if marshaled_value is None:
+            return None
+        return self.unmarshal(marshaled_value)
+
+    def decode_dynamic_value(self, value: pb.DynamicValue) -> T:
+        """
+        Deserialize and unmarshal a msgpack or JSON `DynamicValue`.
+        """
+        # N.B. accessing a protobuf bytes field copies it => only do it once
+        if b := value.msgpack:
+            return self.decode_msgpack(b)
+        elif b := value.json:
+            return self.decode_json(b)
+        raise ValueError(
+            "can't deserialize DynamicValue which is neither msgpack nor JSON"
+        )
+
+    def decode_checked_dynamic_value(
+        self, value: pb.DynamicValue, diagnostics: Diagnostics
+    ) -> T | None:
+        """
+        Like `decode_dynamic_value`, but using `unmarshal_checked`.
+        """
+        if b := value.msgpack:
+            marshaled_value = deserialize_msgpack(b, ext_hook=ext_to_unknown)
+        elif b := value.json:
+            marshaled_value = deserialize_json(b)
+        else:
+            raise ValueError(
+                "can't deserialize DynamicValue which is neither msgpack nor "
+                "JSON"
+            )
+        return self.unmarshal_checked(marshaled_value, diagnostics)
+
+    def decode_optional_dynamic_value(
+        self, value: pb.DynamicValue
+    ) -> T | None:
+        """
+        Like `decode_dynamic_value`, but allowing the value to be null.
+        """
+        if b := value.msgpack:
+            return self.decode_optional_msgpack(b)
+        elif b := value.json:
+            return self.decode_optional_json(b)
+        raise ValueError(
+            "can't deserialize DynamicValue which is neither msgpack nor JSON"
+        )
+
+
+class AttributesClassUnmarshaler(
+    AttributeWireTypeUnmarshaler[ObjectWireType, T]
+):
+    def __init__(self, codec: AttributesClassCodec[T]):
+        self.codec = codec
+        self.attribute_wire_type = ObjectWireType(codec.attribute_wire_types)
+        # bind directly to the codec so nested objects cost no extra call:
+        self.unmarshal_msgpack = codec.unmarshal  # type: ignore
+
+    def unmarshal_msgpack(self, value: ImmutableMsgPackish) -> T:
+        return self.codec.unmarshal(value)
+
+    def trusted_unmarshal_func(self) -> Callable[[ImmutableMsgPackish], T]:
+        return self.codec.unmarshal_trusted
+
+
+class AttributesClassMarshaler(AttributeWireTypeMarshaler[ObjectWireType, T]):
+    def __init__(self, codec: AttributesClassCodec[T]):
+        self.codec = codec
+        self.attribute_wire_type = ObjectWireType(codec.attribute_wire_types)
+        self.marshal_msgpack = codec.marshal  # type: ignore
+
+    def marshal_msgpack(self, value: T) -> ImmutableMsgPackish:
+        return self.codec.marshal(value)
+
+
+@dataclass
+class AttributesClassWireRepresentation(
+    WireRepresentation[dict[str, ImmutableMsgPackish], T]
+):
+    """
+    Representation of Terraform objects as instances of an attributes class.
+
+    Uses the nested class's own (cached) codec.
+    """
+
+    klass: type[T]
+    attribute_wire_type: ObjectWireType
+    unmarshaler: AttributesClassUnmarshaler[T]
+    marshaler: AttributesClassMarshaler[T]
+
+    def __init__(
+        self,
+        klass: type[T],
+        max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH,
+    ):
+        self.klass = klass
+        codec = attributes_class_codec(klass, max_nesting_depth)
+        self.attribute_wire_type = ObjectWireType(codec.attribute_wire_types)
+        self.unmarshaler = AttributesClassUnmarshaler(codec)
+        self.marshaler = AttributesClassMarshaler(codec)
+
+
+@cache
+def _attributes_class_codec(
+    klass: type, max_nesting_depth: int | None
+) -> AttributesClassCodec[Any]:
+    return AttributesClassCodec(klass, max_nesting_depth)
+
+
+def attributes_class_codec(
+    klass: type[T], max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH
+) -> AttributesClassCodec[T]:
+    """
+    Get the compiled codec for an `@attributes_class`-decorated class.
+    """
+    # type checkers don't consider type[T] hashable, but plain type is
+    hashable_klass: type = klass
+    return _attributes_class_codec(hashable_klass, max_nesting_depth)
+
+
+def replace_attributes_class_instance(instance: T, /, **changes: Any) -> T:
+    """
+    Create a copy of an attributes class instance with some attributes changed.
+
+    Cf. `AttributesClassCodec.replace`.
+    """
+    return attributes_class_codec(type(instance)).replace(instance, **changes)
+
+
 def deserialize_dynamic_value_into_attribute_class_instance(
-    value: pb.DynamicValue, klass: type[T]
+    value: pb.DynamicValue,
+    klass: type[T],
+    *,
+    max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH,
 ) -> T:
-    marshaled_value = deserialize_dynamic_value(value)
-    return unmarshal_msgpack_into_attributes_class_instance(
-        marshaled_value, klass
-    )
+    return attributes_class_codec(
+        klass, max_nesting_depth
+    ).decode_dynamic_value(value)
+
+
+def deserialize_checked_attribute_class_instance(
+    value: pb.DynamicValue,
+    klass: type[T],
+    diagnostics: Diagnostics,
+    *,
+    max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH,
+) -> T | None:
+    return attributes_class_codec(
+        klass, max_nesting_depth
+    ).decode_checked_dynamic_value(value, diagnostics)
 
 
 def deserialize_dynamic_value_into_optional_attribute_class_instance(
-    value: pb.DynamicValue, klass: type[T]
+    value: pb.DynamicValue,
+    klass: type[T],
+    *,
+    max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH,
 ) -> T | None:
-    marshaled_value = deserialize_dynamic_value(value)
-    if marshaled_value is None:
-        return None
-    return unmarshal_msgpack_into_attributes_class_instance(
-        marshaled_value, klass
-    )
+    return attributes_class_codec(
+        klass, max_nesting_depth
+    ).decode_optional_dynamic_value(value)
 
 
 def deserialize_raw_state_into_optional_attribute_class_instance(
-    value: pb.RawState, klass: type[T]
+    value: pb.RawState,
+    klass: type[T],
+    *,
+    max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH,
 ) -> T | None:
-    # TODO handle flatmap
-    marshaled_value = json.loads(value.json)  # TODO use/introd. l2 func?
-    if marshaled_value is None:
+    codec = attributes_class_codec(klass, max_nesting_depth)
+    if raw_json := value.json:
+        return codec.decode_optional_json(raw_json)
+    # states written by Terraform < 0.12 are only available as flatmaps
+    return codec.decode_flatmap(value.flatmap)
+
+
+def upgrade_raw_state_into_optional_attribute_class_instance(
+    value: pb.RawState,
+    klass: type[T],
+    upgrade: Callable[[Any], Any],
+    *,
+    max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH,
+) -> T | None:
+    """
+    Deserialize a raw state, upgrade it and unmarshal the result.
+
+    `upgrade` gets the deserialized but not yet unmarshaled state, or for
+    legacy flatmap states, the flatmap as a `dict`, and has to return the
+    upgraded state in the format of the current version of `klass`.
+    """
+    raw_state = (
+        deserialize_json(b) if (b := value.json) else dict(value.flatmap)
+    )
+    upgraded_raw_state = upgrade(raw_state)
+    if upgraded_raw_state is None:
         return None
-    return unmarshal_msgpack_into_attributes_class_instance(
-        marshaled_value, klass
+    return attributes_class_codec(klass, max_nesting_depth).unmarshal(
+        upgraded_raw_state
     )
 
 
+def transcode_raw_state_json_to_dynamic_value(
+    raw_json: Buffer,
+    klass: type[T],
+) -> pb.DynamicValue:
+    """
+    Turn a raw JSON state into a msgpack `DynamicValue` without unmarshaling.
+
+    Only makes sense for states that are already at the current schema
+    version, as no upgrade logic can be applied.
+    """
+    codec = attributes_class_codec(klass)
+    return pb.DynamicValue(msgpack=codec.transcode_json_to_msgpack(raw_json))
+
+
+def transcode_raw_state_flatmap_to_dynamic_value(
+    flatmap: Mapping[str, str],
+    klass: type[T],
+) -> pb.DynamicValue:
+    """
+    Turn a raw flatmap state into a `DynamicValue` without unmarshaling.
+
+    Only makes sense for states that are already at the current schema
+    version, as no upgrade logic can be applied.
+    """
+    codec = attributes_class_codec(klass)
+    return pb.DynamicValue(msgpack=codec.transcode_flatmap_to_msgpack(flatmap))
+
+
 def serialize_attribute_class_instance_to_dynamic_value(
     instance: T,
+    *,
+    max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH,
 ) -> pb.DynamicValue:
-    marshaled_value = marshal_attributes_class_instance_to_msgpack(instance)
-    return serialize_to_dynamic_value(marshaled_value)
+    codec = attributes_class_codec(type(instance), max_nesting_depth)
+    return pb.DynamicValue(msgpack=codec.encode_msgpack(instance))
 
 
 def serialize_optional_attribute_class_instance_to_dynamic_value(
     instance: T | None,
+    *,
+    max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH,
 ) -> pb.DynamicValue:
-    marshaled_value = (
-        marshal_attributes_class_instance_to_msgpack(instance)
-        if instance is not None
-        else None
+    if instance is None:
+        return serialize_to_dynamic_value(None)
+    return serialize_attribute_class_instance_to_dynamic_value(
+        instance, max_nesting_depth=max_nesting_depth
     )
-    return serialize_to_dynamic_value(marshaled_value)
 
 
-# TODO what about json?
+# deserialized JSON has the same structure as msgpack (minus unknown values),
+# so this works for both:
 def unmarshal_msgpack_into_attributes_class_instance(
     marshaled_dict: ImmutableMsgPackish, klass: type[T]
 ) -> T:
-    if not isinstance(marshaled_dict, dict):
-        raise TypeError(
-            f"Expected dict but got {type(marshaled_dict).__name__} "
-            f"{marshaled_dict!r}"
-        )
-    annotations = get_annotations(klass)
-    constructor_kwargs = {}
-    # TODO see https://github.com/python/mypy/issues/14941 for why
-    #   dataclass+type[T] doesn't currently work => typing disabled for now:
-    for attr_field in fields(klass):  # type: ignore
-        try:
-            name = attr_field.name
-            marshaled_value = marshaled_dict[name]  # TODO error handling
-            config = attr_field.metadata["tfprovider"]
-            if (representation := config.get("representation")) is not None:
-                unmarshaled_value = representation.unmarshal_value_msgpack(
-                    marshaled_value
-                )
-            elif (unmarshaler := config.get("unmarshaler")) is not None:
-                unmarshaled_value = unmarshaler.unmarshal_msgpack(
-                    marshaled_value
-                )
-            else:
-                annotation = annotations[name]
-                representation = ANNOTATION_TO_REPRESENTATION[annotation]
-                unmarshaled_value = representation.unmarshal_value_msgpack(
-                    marshaled_value
-                )
-            constructor_kwargs[name] = unmarshaled_value
-        except Exception as e:
-            # TODO better exception type
-            raise ValueError(
-                f"error unmarshaling attribute {attr_field.name!r}"
-            ) from e
-    return klass(**constructor_kwargs)
+    return attributes_class_codec(klass).unmarshal(marshaled_dict)
 
 
 def marshal_attributes_class_instance_to_msgpack(
     instance: T,
 ) -> ImmutableMsgPackish:
-    annotations = get_annotations(instance.__class__)
-    result_dict = {}
-    for attr_field in fields(instance):  # type: ignore
-        name = attr_field.name
-        unmarshaled_value = getattr(instance, name)  # TODO error handling
-        config = attr_field.metadata["tfprovider"]
-        if (representation := config.get("representation")) is not None:
-            marshaled_value = representation.marshal_value_msgpack(
-                unmarshaled_value
-            )
-        elif (marshaler := config.get("marshaler")) is not None:
-            marshaled_value = marshaler.unmarshal_msgpack(unmarshaled_value)
-        else:
-            annotation = annotations[name]
-            representation = ANNOTATION_TO_REPRESENTATION[annotation]
-            marshaled_value = representation.marshal_value_msgpack(
-                unmarshaled_value
-            )
-        result_dict[name] = marshaled_value
-    return result_dict
+    return attributes_class_codec(type(instance)).marshal(instance)
 
 
 # TODO later:
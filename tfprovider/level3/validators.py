@@ -0,0 +1,408 @@
+"""
+Declarative validation of attribute values.
+
+Validators are attached to attributes via `attribute(validators=[...])` and
+run automatically when Terraform asks the provider to validate a config. All
+preparatory work (compiling regexes, building lookup sets, ...) happens when
+the validators are created, i.e. when the attributes class is defined.
+
+Unknown and null values are never validated, as Terraform validates configs
+before all of their values are known and null values are the business of
+`required`.
+"""
+import re
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Mapping, Sequence, Set
+from dataclasses import fields
+from functools import cache
+from ipaddress import ip_network
+from typing import Any, Generic, TypeVar
+
+from ..level2.attribute_path import ROOT, AttributePath
+from ..level2.diagnostics import Diagnostics
+from ..level2.wire_format import Unknown
+
+T = TypeVar("T")
+
+INVALID_VALUE_SUMMARY = "Invalid attribute value"
+INVALID_COMBINATION_SUMMARY = "Invalid attribute combination"
+
+
+def _is_known(value: Any) -> bool:
+    return value is not None and not isinstance(value, Unknown)
+
+
+class Validator(ABC):
+    """
+    Check of an attribute's value.
+    """
+
+    @abstractmethod
+    def validate(
+        self,
+        value: Any,
+        path: AttributePath,
+        config: Any,
+        diagnostics: Diagnostics,
+    ) -> None:
+        """
+        Validate `value`, located at `path` in `config`.
+
+        Problems are reported by adding errors to `diagnostics`. Only called
+        for known, non-null values.
+        """
+
+
+class ValueValidator(Validator):
+    """
+    Validator checking values on their own, without regard to the config.
+
+    Subclasses only have to implement `is_valid` and `describe_invalid`, but
+    should override `find_invalid` to check many values in a tight loop
+    without a Python method call per value if possible.
+    """
+
+    @abstractmethod
+    def is_valid(self, value: Any) -> bool:
+        """
+        Check a single known, non-null value.
+        """
+
+    @abstractmethod
+    def describe_invalid(self, value: Any) -> str:
+        """
+        Explain why a value is invalid, for use in diagnostics.
+        """
+
+    def find_invalid(self, values: Sequence[Any]) -> list[int]:
+        """
+        Return the indices of invalid values among known, non-null ones.
+        """
+        is_valid = self.is_valid
+        return [i for i, value in enumerate(values) if not is_valid(value)]
+
+    def validate(
+        self,
+        value: Any,
+        path: AttributePath,
+        config: Any,
+        diagnostics: Diagnostics,
+    ) -> None:
+        if self.find_invalid([value]):
+            self.report(value, path, diagnostics)
+
+    def report(
+        self, value: Any, path: AttributePath, diagnostics: Diagnostics
+    ) -> None:
+        diagnostics.add_error(
+            summary=INVALID_VALUE_SUMMARY,
+            detail=self.describe_invalid(value),
+            attribute=path,
+        )
+
+
+class Regex(ValueValidator):
+    """
+    Require string values to match a regular expression in their entirety.
+    """
+
+    def __init__(self, pattern: str | re.Pattern[str], message: str = ""):
+        self.pattern = re.compile(pattern)
+        self.message = message
+
+    def is_valid(self, value: Any) -> bool:
+        return self.pattern.fullmatch(value) is not None
+
+    def find_invalid(self, values: Sequence[Any]) -> list[int]:
+        fullmatch = self.pattern.fullmatch
+        return [
+            i for i, value in enumerate(values) if fullmatch(value) is None
+        ]
+
+    def describe_invalid(self, value: Any) -> str:
+        return self.message or (
+            f"{value!r} doesn't match the regular expression "
+            f"{self.pattern.pattern!r}"
+        )
+
+
+class LengthBetween(ValueValidator):
+    """
+    Require the length of values (strings or collections) to be in a range.
+
+    Both bounds are inclusive and optional.
+    """
+
+    def __init__(self, min: int | None = None, max: int | None = None):
+        self.min = min if min is not None else 0
+        self.max = max
+
+    def is_valid(self, value: Any) -> bool:
+        n = len(value)
+        return self.min <= n and (self.max is None or n <= self.max)
+
+    def find_invalid(self, values: Sequence[Any]) -> list[int]:
+        lo = self.min
+        if (hi := self.max) is None:
+            return [i for i, value in enumerate(values) if len(value) < lo]
+        return [
+            i for i, value in enumerate(values) if not lo <= len(value) <= hi
+        ]
+
+    def describe_invalid(self, value: Any) -> str:
+        bound = f"at most {self.max}" if self.max is not None else "unbounded"
+        return (
+            f"length of {value!r} is {len(value)}, but must be at least "
+            f"{self.min} and {bound}"
+        )
+
+
+class Between(ValueValidator):
+    """
+    Require (numeric) values to be in a range.
+
+    Both bounds are inclusive and optional.
+    """
+
+    def __init__(self, min: Any = None, max: Any = None):
+        self.min = min
+        self.max = max
+
+    def is_valid(self, value: Any) -> bool:
+        return (self.min is None or self.min <= value) and (
+            self.max is None or value <= self.max
+        )
+
+    def find_invalid(self, values: Sequence[Any]) -> list[int]:
+        lo, hi = self.min, self.max
+        if lo is None and hi is None:
+            return []
+        if lo is None:
+            return [i for i, value in enumerate(values) if value > hi]
+        if hi is None:
+            return [i for i, value in enumerate(values) if value < lo]
+        return [i for i, value in enumerate(values) if not lo <= value <= hi]
+
+    def describe_invalid(self, value: Any) -> str:
+        lo = "-inf" if self.min is None else repr(self.min)
+        hi = "inf" if self.max is None else repr(self.max)
+        return f"{value!r} is not between {lo} and {hi}"
+
+
+class OneOf(ValueValidator):
+    """
+    Require values to be one of a fixed collection of allowed values.
+    """
+
+    def __init__(self, allowed: Iterable[Any]):
+        self.allowed = frozenset(allowed)
+
+    def is_valid(self, value: Any) -> bool:
+        return value in self.allowed
+
+    def find_invalid(self, values: Sequence[Any]) -> list[int]:
+        allowed = self.allowed
+        return [i for i, value in enumerate(values) if value not in allowed]
+
+    def describe_invalid(self, value: Any) -> str:
+        allowed = ", ".join(sorted(repr(x) for x in self.allowed))
+        return f"{value!r} is not one of the allowed values {allowed}"
+
+
+class Cidr(ValueValidator):
+    """
+    Require string values to be IPv4 or IPv6 networks in CIDR notation.
+
+    Host bits must not be set, e.g. `10.0.0.0/8` is valid but `10.0.0.1/8`
+    isn't.
+    """
+
+    def __init__(self, version: int | None = None):
+        self.version = version
+
+    def is_valid(self, value: Any) -> bool:
+        if "/" not in value:
+            return False
+        try:
+            network = ip_network(value, strict=True)
+        except ValueError:
+            return False
+        return self.version is None or network.version == self.version
+
+    def describe_invalid(self, value: Any) -> str:
+        kind = f"IPv{self.version} " if self.version is not None else ""
+        return f"{value!r} is not a valid {kind}network in CIDR notation"
+
+
+class Each(Validator):
+    """
+    Apply a value validator to each element of a list, set or map.
+
+    Elements of lists and maps are reported at their own paths; set elements
+    have none, so invalid ones are reported at the set's path instead.
+    """
+
+    def __init__(self, validator: ValueValidator):
+        self.validator = validator
+
+    def validate(
+        self,
+        value: Any,
+        path: AttributePath,
+        config: Any,
+        diagnostics: Diagnostics,
+    ) -> None:
+        validator = self.validator
+        if isinstance(value, Mapping):
+            keys = [k for k, v in value.items() if _is_known(v)]
+            elements: Sequence[Any] = [value[k] for k in keys]
+            for i in validator.find_invalid(elements):
+                validator.report(
+                    elements[i], path.element_key(keys[i]), diagnostics
+                )
+        elif isinstance(value, (Set, Sequence)) and not isinstance(value, str):
+            # only filter out unknown/null elements if there are any
+            indices: Sequence[int] = range(len(value))
+            elements = value if isinstance(value, Sequence) else list(value)
+            if not all(map(_is_known, elements)):
+                indices = [i for i, v in enumerate(elements) if _is_known(v)]
+                elements = [elements[i] for i in indices]
+            for i in validator.find_invalid(elements):
+                element_path = (
+                    path.element_key(indices[i])
+                    if isinstance(value, Sequence)
+                    else path
+                )
+                validator.report(elements[i], element_path, diagnostics)
+        else:
+            raise TypeError(
+                f"can't validate elements of non-collection {value!r}"
+            )
+
+
+class _CrossAttributeValidator(Validator):
+    def __init__(self, *names: str):
+        self.names = names
+
+
+class ConflictsWith(_CrossAttributeValidator):
+    """
+    Forbid setting the attribute together with any of the given others.
+    """
+
+    def validate(
+        self,
+        value: Any,
+        path: AttributePath,
+        config: Any,
+        diagnostics: Diagnostics,
+    ) -> None:
+        conflicting = [
+            name for name in self.names if _is_known(getattr(config, name))
+        ]
+        if conflicting:
+            diagnostics.add_error(
+                summary=INVALID_COMBINATION_SUMMARY,
+                detail=(
+                    f"{path} conflicts with "
+                    + ", ".join(f".{name}" for name in conflicting)
+                ),
+                attribute=path,
+            )
+
+
+class RequiredWith(_CrossAttributeValidator):
+    """
+    Require all of the given other attributes to be set with the attribute.
+
+    Unknown values count as set, as they might well be once known.
+    """
+
+    def validate(
+        self,
+        value: Any,
+        path: AttributePath,
+        config: Any,
+        diagnostics: Diagnostics,
+    ) -> None:
+        missing = [
+            name for name in self.names if getattr(config, name) is None
+        ]
+        if missing:
+            diagnostics.add_error(
+                summary=INVALID_COMBINATION_SUMMARY,
+                detail=(
+                    f"{path} requires "
+                    + ", ".join(f".{name}" for name in missing)
+                    + " to be set as well"
+                ),
+                attribute=path,
+            )
+
+
+class AttributesClassValidators(Generic[T]):
+    """
+    Compiled table of the validators of an `@attributes_class` class.
+
+    Use `attributes_class_validators` to obtain the (cached) table for a class
+    instead of instantiating this directly.
+    """
+
+    def __init__(self, klass: type[T]):
+        self.klass = klass
+        table = []
+        # TODO see https://github.com/python/mypy/issues/14941
+        for attr_field in fields(klass):  # type: ignore
+            config = attr_field.metadata.get("tfprovider", {})
+            if validators := tuple(config.get("validators", ())):
+                table.append(
+                    (
+                        attr_field.name,
+                        ROOT.attribute_name(attr_field.name),
+                        validators,
+                    )
+                )
+        self._table: tuple[
+            tuple[str, AttributePath, tuple[Validator, ...]], ...
+        ] = tuple(table)
+
+    def __bool__(self) -> bool:
+        return bool(self._table)
+
+    def validate(self, config: T, diagnostics: Diagnostics) -> None:
+        """
+        Run all validators on the attributes of `config`.
+        """
+        for name, path, validators in self._table:
+            value = getattr(config, name)
+            if not _is_known(value):
+                continue
+            for validator in validators:
+                validator.validate(value, path, config, diagnostics)
+
+
+@cache
+def _attributes_class_validators(
+    klass: type,
+) -> AttributesClassValidators[Any]:
+    return AttributesClassValidators(klass)
+
+
+def attributes_class_validators(
+    klass: type[T],
+) -> AttributesClassValidators[T]:
+    """
+    Get the compiled validator table of an `@attributes_class` class.
+    """
+    # type checkers don't consider type[T] hashable, but plain type is
+    hashable_klass: type = klass
+    return _attributes_class_validators(hashable_klass)
+
+
+def validate_attributes_class_instance(
+    config: Any, diagnostics: Diagnostics
+) -> None:
+    """
+    Run the validators declared on the class of `config`.
+    """
+    attributes_class_validators(type(config)).validate(config, diagnostics)
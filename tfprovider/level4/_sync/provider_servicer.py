@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from collections.abc import Sequence
-from typing import Any, Generic, TypeAlias, TypeVar
+from collections.abc import Mapping, Sequence
+from functools import cached_property
+from typing import Any, ContextManager, Generic, TypeAlias, TypeVar
 
 from tfplugin_proto.tfplugin6_4_pb2 import (
     ApplyResourceChange,
@@ -30,15 +31,24 @@ from ...level2.usable_schema import (
     Schema,
     StringKind,
 )
+from ...level2.wire_marshaling import DEFAULT_MAX_NESTING_DEPTH
+from ...level3.plan_modifiers import attributes_class_plan_modifiers
 from ...level3.statically_typed_schema import (
     attributes_class_to_usable,
+    attributes_class_to_usable_block_types,
+    deserialize_checked_attribute_class_instance,
     deserialize_dynamic_value_into_attribute_class_instance,
     deserialize_dynamic_value_into_optional_attribute_class_instance,
     deserialize_raw_state_into_optional_attribute_class_instance,
     serialize_attribute_class_instance_to_dynamic_value,
     serialize_optional_attribute_class_instance_to_dynamic_value,
+    transcode_raw_state_flatmap_to_dynamic_value,
+    transcode_raw_state_json_to_dynamic_value,
+    upgrade_raw_state_into_optional_attribute_class_instance,
 )
-from ..utils import exception_to_diagnostics
+from ...level3.validators import validate_attributes_class_instance
+from ..state_upgraders import StateUpgradeChains, StateUpgrader
+from ..utils import TracebackPolicy, exception_to_diagnostics
 
 
 class AdapterProviderServicer(L1BaseProviderServicer):
@@ -50,8 +60,8 @@ class AdapterProviderServicer(L1BaseProviderServicer):
     def GetMetadata(
         self, request: GetMetadata.Request, context: Any
     ) -> GetMetadata.Response:
-        diagnostics = Diagnostics()
-        with exception_to_diagnostics(
+        diagnostics = self._new_diagnostics()
+        with self._exception_to_diagnostics(
             diagnostics, "getting provider metadata"
         ):
             self.adapted.init(diagnostics)
@@ -60,86 +70,146 @@ class AdapterProviderServicer(L1BaseProviderServicer):
                     plan_destroy=False, get_provider_schema_optional=False
                 ),
             )
-        return GetMetadata.Response(diagnostics=diagnostics)
+        return GetMetadata.Response(diagnostics=diagnostics.to_protobuf())
 
     def GetProviderSchema(
         self, request: GetProviderSchema.Request, context: Any
     ) -> GetProviderSchema.Response:
-        diagnostics = Diagnostics()
-        with exception_to_diagnostics(diagnostics, "getting provider schema"):
+        diagnostics = self._new_diagnostics()
+        with self._exception_to_diagnostics(
+            diagnostics, "getting provider schema"
+        ):
             return self.adapted.provider_schema.to_protobuf()
-        return GetProviderSchema.Response(diagnostics=diagnostics)
+        return GetProviderSchema.Response(
+            diagnostics=diagnostics.to_protobuf()
+        )
 
     def ValidateProviderConfig(
         self, request: ValidateProviderConfig.Request, context: Any
     ) -> ValidateProviderConfig.Response:
-        diagnostics = Diagnostics()
-        with exception_to_diagnostics(
+        diagnostics = self._new_diagnostics()
+        with self._exception_to_diagnostics(
             diagnostics, "validating provider config"
         ):
-            config = deserialize_dynamic_value_into_attribute_class_instance(
-                request.config, self.adapted.config_type
+            # type errors are reported along with their paths here, as this
+            # is where Terraform first sends configs:
+            config = deserialize_checked_attribute_class_instance(
+                request.config,
+                self.adapted.config_type,
+                diagnostics,
+                max_nesting_depth=self.adapted.max_nesting_depth,
             )
-            self.adapted.validate_provider_config(config, diagnostics)
-        return ValidateProviderConfig.Response(diagnostics=diagnostics)
+            if config is not None:
+                validate_attributes_class_instance(config, diagnostics)
+                self.adapted.validate_provider_config(
+                    config, diagnostics
+                )
+        return ValidateProviderConfig.Response(
+            diagnostics=diagnostics.to_protobuf()
+        )
 
     def ValidateResourceConfig(
         self, request: ValidateResourceConfig.Request, context: Any
     ) -> ValidateResourceConfig.Response:
-        diagnostics = Diagnostics()
-        with exception_to_diagnostics(
+        diagnostics = self._new_diagnostics()
+        with self._exception_to_diagnostics(
             diagnostics, "validating resource config"
         ):
             resource = self._get_resource_by_name(request.type_name)
-            config = deserialize_dynamic_value_into_attribute_class_instance(
-                request.config, resource.config_type
+            # type errors are reported along with their paths here, as this
+            # is where Terraform first sends configs:
+            config = deserialize_checked_attribute_class_instance(
+                request.config,
+                resource.config_type,
+                diagnostics,
+                max_nesting_depth=self.adapted.max_nesting_depth,
             )
-            resource.validate_resource_config(config, diagnostics)
-        return ValidateResourceConfig.Response(diagnostics=diagnostics)
+            if config is not None:
+                validate_attributes_class_instance(config, diagnostics)
+                resource.validate_resource_config(config, diagnostics)
+        return ValidateResourceConfig.Response(
+            diagnostics=diagnostics.to_protobuf()
+        )
 
     def ConfigureProvider(
         self, request: ConfigureProvider.Request, context: Any
     ) -> ConfigureProvider.Response:
-        diagnostics = Diagnostics()
-        with exception_to_diagnostics(diagnostics, "configuring provider"):
+        diagnostics = self._new_diagnostics()
+        with self._exception_to_diagnostics(
+            diagnostics, "configuring provider"
+        ):
             config = deserialize_dynamic_value_into_attribute_class_instance(
-                request.config, self.adapted.config_type
+                request.config,
+                self.adapted.config_type,
+                max_nesting_depth=self.adapted.max_nesting_depth,
             )
             self.adapted.configure_provider(config, diagnostics)
-        return ConfigureProvider.Response(diagnostics=diagnostics)
+        return ConfigureProvider.Response(
+            diagnostics=diagnostics.to_protobuf()
+        )
 
     def PlanResourceChange(
         self, request: PlanResourceChange.Request, context: Any
     ) -> PlanResourceChange.Response:
-        diagnostics = Diagnostics()
-        with exception_to_diagnostics(diagnostics, "planning resource change"):
+        diagnostics = self._new_diagnostics()
+        with self._exception_to_diagnostics(
+            diagnostics, "planning resource change"
+        ):
             resource = self._get_resource_by_name(request.type_name)
             prior_state = deserialize_dynamic_value_into_optional_attribute_class_instance(
-                request.prior_state, resource.config_type
+                request.prior_state,
+                resource.config_type,
+                max_nesting_depth=self.adapted.max_nesting_depth,
             )
             config = deserialize_dynamic_value_into_attribute_class_instance(
-                request.config, resource.config_type
+                request.config,
+                resource.config_type,
+                max_nesting_depth=self.adapted.max_nesting_depth,
             )
             proposed_new_state = deserialize_dynamic_value_into_optional_attribute_class_instance(
-                request.proposed_new_state, resource.config_type
+                request.proposed_new_state,
+                resource.config_type,
+                max_nesting_depth=self.adapted.max_nesting_depth,
             )
-            # TODO private + provider meta
-            inner_response = resource.plan_resource_change(
-                prior_state, config, proposed_new_state, diagnostics
+            plan_modifiers = attributes_class_plan_modifiers(
+                resource.config_type
             )
-            if isinstance(inner_response, tuple):
-                planned_state, requires_replace = inner_response
+            requires_replace: Sequence[AttributePath] | None = None
+            if plan_modifiers:
+                (
+                    proposed_new_state,
+                    requires_replace,
+                ) = plan_modifiers.apply(prior_state, proposed_new_state)
+            if resource.overrides_plan_resource_change:
+                # TODO private + provider meta
+                inner_response = resource.plan_resource_change(
+                    prior_state, config, proposed_new_state, diagnostics
+                )
+                if isinstance(inner_response, tuple):
+                    planned_state, extra_requires_replace = inner_response
+                    # merged without duplicates, but keeping the order
+                    requires_replace = list(
+                        dict.fromkeys(
+                            [
+                                *(requires_replace or ()),
+                                *extra_requires_replace,
+                            ]
+                        )
+                    )
+                else:
+                    planned_state = inner_response
             else:
-                planned_state, requires_replace = inner_response, None
+                planned_state = proposed_new_state
             serialized_planned_state = (
                 serialize_optional_attribute_class_instance_to_dynamic_value(
-                    planned_state
+                    planned_state,
+                    max_nesting_depth=self.adapted.max_nesting_depth,
                 )
             )
             if requires_replace:
                 return PlanResourceChange.Response(
                     planned_state=serialized_planned_state,
-                    diagnostics=diagnostics,
+                    diagnostics=diagnostics.to_protobuf(),
                     requires_replace=[
                         attribute_path.to_protobuf()
                         for attribute_path in requires_replace
@@ -148,24 +218,34 @@ class AdapterProviderServicer(L1BaseProviderServicer):
             else:
                 return PlanResourceChange.Response(
                     planned_state=serialized_planned_state,
-                    diagnostics=diagnostics,
+                    diagnostics=diagnostics.to_protobuf(),
                 )
-        return PlanResourceChange.Response(diagnostics=diagnostics)
+        return PlanResourceChange.Response(
+            diagnostics=diagnostics.to_protobuf()
+        )
 
     def ApplyResourceChange(
         self, request: ApplyResourceChange.Request, context: Any
     ) -> ApplyResourceChange.Response:
-        diagnostics = Diagnostics()
-        with exception_to_diagnostics(diagnostics, "applying resource change"):
+        diagnostics = self._new_diagnostics()
+        with self._exception_to_diagnostics(
+            diagnostics, "applying resource change"
+        ):
             resource = self._get_resource_by_name(request.type_name)
             prior_state = deserialize_dynamic_value_into_optional_attribute_class_instance(
-                request.prior_state, resource.config_type
+                request.prior_state,
+                resource.config_type,
+                max_nesting_depth=self.adapted.max_nesting_depth,
             )
             config = deserialize_dynamic_value_into_optional_attribute_class_instance(
-                request.config, resource.config_type
+                request.config,
+                resource.config_type,
+                max_nesting_depth=self.adapted.max_nesting_depth,
             )
             planned_state = deserialize_dynamic_value_into_optional_attribute_class_instance(
-                request.planned_state, resource.config_type
+                request.planned_state,
+                resource.config_type,
+                max_nesting_depth=self.adapted.max_nesting_depth,
             )
             # TODO private + requires replace + provider meta
             new_state = resource.apply_resource_change(
@@ -173,48 +253,86 @@ class AdapterProviderServicer(L1BaseProviderServicer):
             )
             serialized_new_state = (
                 serialize_optional_attribute_class_instance_to_dynamic_value(
-                    new_state
+                    new_state, max_nesting_depth=self.adapted.max_nesting_depth
                 )
             )
             return ApplyResourceChange.Response(
-                new_state=serialized_new_state, diagnostics=diagnostics
+                new_state=serialized_new_state,
+                diagnostics=diagnostics.to_protobuf(),
             )
-        return ApplyResourceChange.Response(diagnostics=diagnostics)
+        return ApplyResourceChange.Response(
+            diagnostics=diagnostics.to_protobuf()
+        )
 
     def UpgradeResourceState(
         self, request: UpgradeResourceState.Request, context: Any
     ) -> UpgradeResourceState.Response:
-        diagnostics = Diagnostics()
-        with exception_to_diagnostics(diagnostics, "upgrading resource state"):
+        diagnostics = self._new_diagnostics()
+        with self._exception_to_diagnostics(
+            diagnostics, "upgrading resource state"
+        ):
             resource = self._get_resource_by_name(request.type_name)
-            state = (
-                deserialize_raw_state_into_optional_attribute_class_instance(
-                    request.raw_state, resource.config_type
+            # fast path: Terraform calls this for every resource instance on
+            # every plan, but most states are already at the current version
+            # and merely need to be converted to msgpack
+            if request.version == resource.schema_version:
+                raw_state = request.raw_state
+                if raw_json := raw_state.json:
+                    upgraded = transcode_raw_state_json_to_dynamic_value(
+                        raw_json, resource.config_type
+                    )
+                else:
+                    upgraded = transcode_raw_state_flatmap_to_dynamic_value(
+                        raw_state.flatmap, resource.config_type
+                    )
+                return UpgradeResourceState.Response(
+                    upgraded_state=upgraded,
+                    diagnostics=diagnostics.to_protobuf(),
+                )
+            if resource.state_upgraders:
+                state = (
+                    upgrade_raw_state_into_optional_attribute_class_instance(
+                        request.raw_state,
+                        resource.config_type,
+                        resource.state_upgrade_chains[request.version],
+                        max_nesting_depth=self.adapted.max_nesting_depth,
+                    )
+                )
+            else:
+                # legacy behavior: decode old state as if it were current
+                state = deserialize_raw_state_into_optional_attribute_class_instance(
+                    request.raw_state,
+                    resource.config_type,
+                    max_nesting_depth=self.adapted.max_nesting_depth,
                 )
-            )
             upgraded_state = resource.upgrade_resource_state(
                 state, request.version, diagnostics
             )
             serialized_upgraded_state = (
                 serialize_attribute_class_instance_to_dynamic_value(
-                    upgraded_state
+                    upgraded_state,
+                    max_nesting_depth=self.adapted.max_nesting_depth,
                 )
             )
             return UpgradeResourceState.Response(
                 upgraded_state=serialized_upgraded_state,
-                diagnostics=diagnostics,
+                diagnostics=diagnostics.to_protobuf(),
             )
-        return UpgradeResourceState.Response(diagnostics=diagnostics)
+        return UpgradeResourceState.Response(
+            diagnostics=diagnostics.to_protobuf()
+        )
 
     def ReadResource(
         self, request: ReadResource.Request, context: Any
     ) -> ReadResource.Response:
-        diagnostics = Diagnostics()
-        with exception_to_diagnostics(diagnostics, "reading resource"):
+        diagnostics = self._new_diagnostics()
+        with self._exception_to_diagnostics(diagnostics, "reading resource"):
             resource = self._get_resource_by_name(request.type_name)
             current_state = (
                 deserialize_dynamic_value_into_attribute_class_instance(
-                    request.current_state, resource.config_type
+                    request.current_state,
+                    resource.config_type,
+                    max_nesting_depth=self.adapted.max_nesting_depth,
                 )
             )
             # TODO private + provider meta
@@ -223,20 +341,20 @@ class AdapterProviderServicer(L1BaseProviderServicer):
             )
             serialized_new_state = (
                 serialize_optional_attribute_class_instance_to_dynamic_value(
-                    new_state
+                    new_state, max_nesting_depth=self.adapted.max_nesting_depth
                 )
             )
             return ReadResource.Response(
                 new_state=serialized_new_state,
-                diagnostics=diagnostics,
+                diagnostics=diagnostics.to_protobuf(),
             )
-        return ReadResource.Response(diagnostics=diagnostics)
+        return ReadResource.Response(diagnostics=diagnostics.to_protobuf())
 
     def ImportResourceState(
         self, request: ImportResourceState.Request, context: Any
     ) -> ImportResourceState.Response:
-        diagnostics = Diagnostics()
-        with exception_to_diagnostics(diagnostics, "importing resource"):
+        diagnostics = self._new_diagnostics()
+        with self._exception_to_diagnostics(diagnostics, "importing resource"):
             resource = self._get_resource_by_name(request.type_name)
             # TODO come up w/ way to allow importing multiple resources
             # TODO handle private
@@ -245,7 +363,8 @@ class AdapterProviderServicer(L1BaseProviderServicer):
             )
             serialized_resource_state = (
                 serialize_attribute_class_instance_to_dynamic_value(
-                    imported_resource_config
+                    imported_resource_config,
+                    max_nesting_depth=self.adapted.max_nesting_depth,
                 )
             )
             return ImportResourceState.Response(
@@ -255,9 +374,27 @@ class AdapterProviderServicer(L1BaseProviderServicer):
                         state=serialized_resource_state,
                     )
                 ],
-                diagnostics=diagnostics,
+                diagnostics=diagnostics.to_protobuf(),
             )
-        return ImportResourceState.Response(diagnostics=diagnostics)
+        return ImportResourceState.Response(
+            diagnostics=diagnostics.to_protobuf()
+        )
+
+    def _exception_to_diagnostics(
+        self, diagnostics: Diagnostics, action: str
+    ) -> ContextManager[None]:
+        return exception_to_diagnostics(
+            diagnostics,
+            action,
+            traceback_policy=self.adapted.traceback_policy,
+            traceback_policies=self.adapted.traceback_policies,
+        )
+
+    def _new_diagnostics(self) -> Diagnostics:
+        return Diagnostics(
+            max_per_severity=self.adapted.max_diagnostics_per_severity,
+            deduplicate=self.adapted.deduplicate_diagnostics,
+        )
 
     def _get_resource_by_name(self, type_name: str) -> "Resource[Any, Any]":
         resource = self.adapted.resources[type_name]
@@ -297,6 +434,9 @@ class DefinesSchema(Generic[C]):
                 description=self.description,
                 description_kind=self.description_kind,
                 attributes=attributes_class_to_usable(self.config_type),
+                block_types=attributes_class_to_usable_block_types(
+                    self.config_type
+                ),
             ),
         )
 
@@ -308,6 +448,50 @@ class Provider(DefinesSchema[PC], ABC, Generic[PS, PC]):
     resource_factories: list[type["Resource[PS, Any]"]]
     "*Must* be overridden by subclasses."
 
+    max_diagnostics_per_severity: int | None = 100
+    """
+    May be overridden by subclasses.
+
+    Maximum number of errors and warnings (each) returned in a single
+    response; any further ones are summarized in a single diagnostic.
+    """
+
+    deduplicate_diagnostics: bool = True
+    """
+    May be overridden by subclasses.
+
+    Whether to merge diagnostics with identical summaries and details.
+    """
+
+    traceback_policy: TracebackPolicy = TracebackPolicy.FULL
+    """
+    May be overridden by subclasses.
+
+    How much of the traceback of unexpected exceptions to include in their
+    diagnostics. Exceptions deriving from `DiagnosticError` never include
+    tracebacks.
+    """
+
+    traceback_policies: Mapping[type[BaseException], TracebackPolicy] = {}
+    """
+    May be overridden by subclasses.
+
+    Per-exception class overrides of `traceback_policy`, also applying to
+    subclasses.
+    """
+
+    max_nesting_depth: int | None = DEFAULT_MAX_NESTING_DEPTH
+    """
+    May be overridden by subclasses.
+
+    Maximum nesting depth of values of the dynamic pseudo-type (e.g. generic
+    JSON-like documents), beyond which they are rejected. `None` means no
+    limit, but note that msgpack itself can't handle values nested more than
+    1024 levels deep. Values of types given by the schema are (un)marshaled
+    recursively instead, so their depth is limited by Python's recursion
+    limit, cf. `DEFAULT_MAX_NESTING_DEPTH`.
+    """
+
     # quasi internal state
     resources: dict[str, "Resource[PS, Any]"]
 
@@ -366,6 +550,16 @@ class Resource(DefinesSchema[RC], ABC, Generic[PS, RC]):
     type_name: str
     "*Must* be overridden by subclasses."
 
+    state_upgraders: Mapping[int, StateUpgrader] = {}
+    """
+    May be overridden by subclasses.
+
+    Maps each earlier schema version to a function upgrading raw states of
+    that version to the next version (cf. `state_upgraders` module). If not
+    empty, there must be an upgrader for every version from the oldest one
+    still in use up to `schema_version - 1`.
+    """
+
     # internal shared state
     provider_state: PS
 
@@ -388,6 +582,11 @@ class Resource(DefinesSchema[RC], ABC, Generic[PS, RC]):
     ) -> PlanResourceChangeResponse[RC] | None:
         """
         To be overridden by subclasses if needed.
+
+        `proposed_new_state` has already been passed through the plan
+        modifiers declared on `RC`'s attributes. Attribute paths requiring
+        replacement that are returned here are added to those found by the
+        plan modifiers.
         """
         return proposed_new_state
 
@@ -403,17 +602,32 @@ class Resource(DefinesSchema[RC], ABC, Generic[PS, RC]):
         To be overridden by subclasses.
         """
 
-    # TODO considering this is meant to upgrade state from prev. versions, it
-    #   probably doesn't make sense to have the same RC type here as for the
-    #   other methods... => introduce ORC (old resource config) type (w/
-    #   possibility of making it a union)? or just pass the JSON?
-    @abstractmethod
     def upgrade_resource_state(
         self, state: RC, version: int, diagnostics: Diagnostics
     ) -> RC:
         """
-        To be overridden by subclasses.
+        To be overridden by subclasses if needed.
+
+        Called with states of earlier schema versions after they've been
+        passed through `state_upgraders` (if any) and unmarshaled. Prefer
+        `state_upgraders` for anything that changes the shape of the state,
+        as it's impossible to represent arbitrary old states as `RC`.
         """
+        return state
+
+    # automatically provided, not generally necessary to be overridden:
+
+    @cached_property
+    def overrides_plan_resource_change(self) -> bool:
+        # if not, planning is left entirely to the declarative plan modifiers
+        return (
+            type(self).plan_resource_change
+            is not Resource.plan_resource_change
+        )
+
+    @cached_property
+    def state_upgrade_chains(self) -> StateUpgradeChains:
+        return StateUpgradeChains(self.state_upgraders, self.schema_version)
 
     @abstractmethod
     def read_resource(
@@ -0,0 +1,77 @@
+"""
+Declarative upgrading of resource states from earlier schema versions.
+
+Each upgrader takes a raw (deserialized but not unmarshaled) state of one
+schema version and returns the corresponding raw state of the next version.
+For a state of some old version, all upgraders from there on are composed
+into a single chain so the state only has to be unmarshaled into the
+resource's current config type once, at the very end.
+"""
+from collections.abc import Callable, Mapping
+from typing import Any, TypeAlias
+
+StateUpgrader: TypeAlias = Callable[[Any], Any]
+"""
+Function upgrading a raw state of one schema version to the next version.
+
+Raw states are whatever JSON-like value Terraform stored for the resource,
+i.e. (usually) a `dict` of attribute names to values. States written by
+Terraform < 0.12 are only available as a legacy flatmap (cf. `level2.flatmap`)
+and get passed as a flat `dict[str, str]` instead.
+"""
+
+
+def compose_state_upgraders(
+    upgraders: Mapping[int, StateUpgrader], from_version: int, to_version: int
+) -> StateUpgrader:
+    """
+    Compose the upgraders needed to go from one schema version to another.
+
+    Raises `ValueError` if an upgrader for any of the intermediate versions is
+    missing.
+    """
+    if from_version > to_version:
+        raise ValueError(
+            f"can't upgrade state from version {from_version} to earlier "
+            f"version {to_version}"
+        )
+    versions = range(from_version, to_version)
+    missing = [v for v in versions if v not in upgraders]
+    if missing:
+        raise ValueError(
+            f"can't upgrade state from version {from_version} to "
+            f"{to_version}: no state upgraders for version(s) "
+            + ", ".join(str(v) for v in missing)
+        )
+    chain = tuple(upgraders[v] for v in versions)
+    if len(chain) == 1:
+        return chain[0]
+
+    def upgrade(state: Any) -> Any:
+        for upgrader in chain:
+            state = upgrader(state)
+        return state
+
+    return upgrade
+
+
+class StateUpgradeChains:
+    """
+    Cache of composed state upgrader chains, one per source version.
+    """
+
+    def __init__(
+        self, upgraders: Mapping[int, StateUpgrader], current_version: int
+    ):
+        self.upgraders = upgraders
+        self.current_version = current_version
+        self._chains: dict[int, StateUpgrader] = {}
+
+    def __getitem__(self, from_version: int) -> StateUpgrader:
+        try:
+            return self._chains[from_version]
+        except KeyError:
+            chain = self._chains[from_version] = compose_state_upgraders(
+                self.upgraders, from_version, self.current_version
+            )
+            return chain
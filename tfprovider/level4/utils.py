@@ -1,19 +1,90 @@
-from collections.abc import Generator
+from collections.abc import Generator, Mapping
 from contextlib import contextmanager
+from enum import StrEnum, auto
 from traceback import format_exc
 
-from ..level2.diagnostics import Diagnostics
+from ..level2.diagnostics import DiagnosticError, Diagnostics
+from ..level2.usable_schema import NOT_SET, NotSet
+
+
+class TracebackPolicy(StrEnum):
+    """
+    How much of an exception's traceback to put into its diagnostic.
+    """
+
+    FULL = auto()
+    "The entire formatted traceback."
+    SHORT = auto()
+    "Only the exception and the location it was raised at."
+    NONE = auto()
+    "Nothing, i.e. the diagnostic only has a summary."
+
+
+def _traceback_policy(
+    exception_type: type[BaseException],
+    default: TracebackPolicy,
+    overrides: Mapping[type[BaseException], TracebackPolicy],
+) -> TracebackPolicy:
+    if overrides:
+        for klass in exception_type.__mro__:
+            if (policy := overrides.get(klass)) is not None:
+                return policy
+    return default
+
+
+def _short_traceback(e: BaseException) -> str:
+    # unlike format_exc, this neither walks nor reads the source of all
+    # frames, which is what makes it cheap
+    tb = e.__traceback__
+    if tb is None:
+        return f"{type(e).__qualname__}: {e}"
+    while tb.tb_next is not None:
+        tb = tb.tb_next
+    code = tb.tb_frame.f_code
+    return (
+        f"{type(e).__qualname__}: {e}\n"
+        f"  raised in {code.co_name} at {code.co_filename}:{tb.tb_lineno}"
+    )
+
+
+def _traceback_detail(
+    e: BaseException, policy: TracebackPolicy
+) -> str | NotSet:
+    match policy:
+        case TracebackPolicy.FULL:
+            return format_exc()
+        case TracebackPolicy.SHORT:
+            return _short_traceback(e)
+        case _:
+            return NOT_SET
 
 
 @contextmanager
 def exception_to_diagnostics(
     diagnostics: Diagnostics,
     action: str | None = None,
+    traceback_policy: TracebackPolicy = TracebackPolicy.FULL,
+    traceback_policies: Mapping[type[BaseException], TracebackPolicy] = {},
 ) -> Generator[None, None, None]:
+    """
+    Turn exceptions raised in the managed context into error diagnostics.
+
+    `DiagnosticError`s are converted directly, using their own summary,
+    detail and attribute path. For any other exception, the detail contains
+    its traceback as prescribed by the `traceback_policies` entry of the
+    closest class in its MRO or, if there is none, by `traceback_policy`.
+    """
     try:
         yield
+    except DiagnosticError as e:
+        e.add_to(diagnostics)
     except Exception as e:
         summary = (
             f"error while {action}: {e}" if action is not None else str(e)
         )
-        diagnostics.add_error(summary=summary, detail=format_exc())
+        policy = _traceback_policy(
+            type(e), traceback_policy, traceback_policies
+        )
+        diagnostics.add_error(
+            summary=summary, detail=_traceback_detail(e, policy)
+        )